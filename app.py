@@ -1,14 +1,11 @@
+import importlib
+
 import streamlit as st
-import pandas as pd
 
 from auth import check_password
-from utils import read_file, clear_session_state
-from certo_market import render_certo_market_ui
-from ferreira import render_ferreira_ui
-from certo_market_visits import render_certo_market_visits_ui
-from donation_scheduler import render_donation_scheduler_ui
-from key_food import render_key_food_ui
-from market_place import render_market_place_ui
+from processes import PROCESSES
+from sinks import SheetsSink
+from utils import SINK, UploadSource, detect_txt_dialect, clear_session_state
 
 # Basic page configuration
 st.set_page_config(
@@ -18,12 +15,13 @@ st.set_page_config(
     initial_sidebar_state="collapsed"
 )
 
-def format_name(name):
-    """Format name to capitalize only the first letter of each word."""
-    if pd.isna(name):
-        return name
-    # Split the name into words and capitalize only the first letter
-    return ' '.join(word.lower().capitalize() for word in str(name).split())
+# Selectbox entry → process; each process's UI module is imported the first time its UI is shown
+PROCESSES_BY_LABEL = {process.label: process for process in PROCESSES.values()}
+
+def load_process_ui(process):
+    """Return the render function of a process's UI module, importing the module on first use."""
+    module = importlib.import_module(process.ui)
+    return getattr(module, f"render_{process.ui}_ui")
 
 def on_process_change():
     """Handle process selection change."""
@@ -37,72 +35,72 @@ def main():
     # Header
     st.title("🌾 Harvesting Media v2")
     st.subheader("Data Processor")
+    if not isinstance(SINK, SheetsSink):
+        st.info(f"ℹ️ Output is going to {SINK.describe()}, not Google Sheets.")
     
     # Initialize session state for process if not exists
     if 'previous_process' not in st.session_state:
         st.session_state['previous_process'] = None
     
     # Process selection
-    process = st.selectbox(
+    process_label = st.selectbox(
         "Select Process",
-        ["Certo Market", "Ferreira", "Certo Market Visits Report", "Donation Scheduler", 
-         "Key Food Valley Stream", "The Market Place"],
+        list(PROCESSES_BY_LABEL),
         help="Choose which process to run",
         key="process"
     )
     
     # Check if process changed
-    if st.session_state['previous_process'] is not None and st.session_state['previous_process'] != process:
+    if st.session_state['previous_process'] is not None and st.session_state['previous_process'] != process_label:
         clear_session_state()
-        st.session_state['process'] = process
+        st.session_state['process'] = process_label
         st.rerun()
     
     # Update previous process
-    st.session_state['previous_process'] = process
+    st.session_state['previous_process'] = process_label
+    process = PROCESSES_BY_LABEL[process_label]
     
-    # File uploader with format detection
-    file_extensions = ['csv', 'xlsx', 'txt']
+    # File uploader limited to the formats the process accepts
     file_type_message = ""
+    if len(process.file_types) == 1:
+        file_type_message = f"({process.file_types[0].upper()} format)"
     
-    # Adjust file uploader based on process
-    if process == "Key Food Valley Stream":
-        file_extensions = ['csv']
-        file_type_message = "(CSV format)"
-    elif process == "The Market Place":
-        file_extensions = ['xlsx']
-        file_type_message = "(XLSX format)"
-    
-    uploaded_file = st.file_uploader(f"Choose a file {file_type_message}", type=file_extensions)
+    uploaded_file = st.file_uploader(f"Choose a file {file_type_message}", type=process.file_types)
     
     if uploaded_file is not None:
         try:
+            # Sniff .txt uploads up front so they are parsed exactly once
+            if uploaded_file.name.endswith('.txt'):
+                dialect, dialect_description = detect_txt_dialect(uploaded_file)
+                st.caption(f"Detected format: {dialect_description}")
+                # The sniffer misses the header of all-text files, so its guess is only a hint
+                if not dialect['has_header']:
+                    st.caption("ℹ️ The first row looks like data. Untick **File has headers** if it isn't a header row.")
+            
             # Ask if file has headers
             has_headers = st.checkbox("File has headers", value=True)
             
-            # Read the file
-            df = read_file(uploaded_file, has_headers)
+            # Offer chunked streaming for large delimited files
+            streaming = False
+            if process.streaming and not uploaded_file.name.endswith('.xlsx'):
+                streaming = st.checkbox(
+                    "Stream large file in chunks",
+                    value=False,
+                    help="Reads, processes and uploads the file a chunk at a time to keep memory bounded"
+                )
             
-            # If no headers, generate column names
-            if not has_headers:
-                df.columns = [f'Column {i+1}' for i in range(len(df.columns))]
+            # Only the header and first rows are parsed here; the full read of the
+            # mapped columns happens when the data is processed
+            source = UploadSource(uploaded_file, has_headers, streaming=streaming)
+            df = source.preview()
             
             # Show the first few rows of the data
             st.markdown("### Preview of Data")
             st.dataframe(df.head())
             
             # Route to the appropriate process UI
-            if process == "Certo Market":
-                render_certo_market_ui(df)
-            elif process == "Ferreira":
-                render_ferreira_ui(df)
-            elif process == "Certo Market Visits Report":
-                render_certo_market_visits_ui(df)
-            elif process == "Donation Scheduler":
-                render_donation_scheduler_ui(df)
-            elif process == "Key Food Valley Stream":
-                render_key_food_ui(df)
-            elif process == "The Market Place":
-                render_market_place_ui(df)
+            render_process_ui = load_process_ui(process)
+            render_process_ui(process, df, source)
                 
         except Exception as e:
             st.error(f"❌ Error processing file: {str(e)}")
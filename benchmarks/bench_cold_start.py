@@ -0,0 +1,88 @@
+"""Measure the app's cold start: importing app.py, the first script run, and each process's first selection.
+
+Every measurement runs in a fresh interpreter. Streamlit and pandas are imported before
+the clock starts, as the Streamlit server has them loaded before the first session, and
+only the heavy modules a step loads itself are reported (some pandas versions load
+pyarrow on import).
+
+Run from the repository root:
+
+    python -m benchmarks.bench_cold_start --repeat 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+from processes import PROCESSES
+
+# Libraries a session should only load once it writes, reads an XLSX file or transforms text
+HEAVY_MODULES = ['gspread', 'oauth2client', 'requests', 'httpx', 'openpyxl', 'pyarrow']
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_APP = f"""
+import json, sys, time
+import streamlit, pandas
+before = set(sys.modules)
+start = time.perf_counter()
+import app
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules and m not in before]}}))
+"""
+
+# The first run of the script for a signed-in session, up to the file uploader
+FIRST_PAINT = """
+import json, time
+import streamlit, pandas
+from streamlit.testing.v1 import AppTest
+at = AppTest.from_file('app.py', default_timeout=60)
+at.session_state['password_correct'] = True
+start = time.perf_counter()
+at.run()
+seconds = time.perf_counter() - start
+assert not at.exception, at.exception
+print(json.dumps({'seconds': seconds, 'loaded': []}))
+"""
+
+# Importing a process's UI module once the app is running, as its first selection does
+SELECT_PROCESS = f"""
+import importlib, json, sys, time
+import streamlit, pandas
+import app
+before = set(sys.modules)
+start = time.perf_counter()
+importlib.import_module(sys.argv[1])
+seconds = time.perf_counter() - start
+print(json.dumps({{'seconds': seconds, 'loaded': [m for m in {HEAVY_MODULES!r} if m in sys.modules and m not in before]}}))
+"""
+
+def measure(code, repeat, *args):
+    """Run code in repeat fresh interpreters; return the median seconds and the heavy modules loaded."""
+    times = []
+    loaded = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', code, *args], cwd=ROOT, capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        times.append(result['seconds'])
+        loaded = result['loaded']
+    return statistics.median(times), loaded
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5, help="fresh interpreters per measurement; the median is kept")
+    args = parser.parse_args()
+
+    print(f"{'step':<32}{'seconds':>9}  heavy modules loaded")
+    for step, code, extra in [('import app', IMPORT_APP, []), ('first script run', FIRST_PAINT, [])] + [
+        (f"select {process.name}", SELECT_PROCESS, [process.ui]) for process in PROCESSES.values()
+    ]:
+        seconds, loaded = measure(code, args.repeat, *extra)
+        print(f"{step:<32}{seconds:>9.3f}  {', '.join(loaded) or '-'}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,89 @@
+"""Compare memory and speed of default and compact dtypes for every process's parse and transform.
+
+Each process's synthetic file is parsed (limited to the mapped columns) and transformed
+with the default object dtypes and with compact dtypes (categoricals, Arrow strings,
+nullable integers), and both runs must produce the same rows for the sheet.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_compact --rows 1000000
+"""
+import argparse
+import time
+
+from benchmarks.generators import CENTER_HOURS, GENERATORS
+from center_hours import compile_weekmasks
+from ingest import mapped_usecols, parse_bytes
+from key_index import DedupeRun
+from processes import PROCESSES
+from serialize import serialize_rows
+
+# Arguments the transforms take besides the column mapping
+TRANSFORM_OPTIONS = {'donation_scheduler': {'weekmasks': compile_weekmasks(CENTER_HOURS)}}
+
+# Processes whose XLSX file takes minutes to generate at large sizes
+SKIP_BY_DEFAULT = ['market_place']
+
+class NoIndex:
+    """A key index that has never seen any key, so dedupe only drops repeats within the file."""
+
+    def present(self, sheet, keys):
+        return set()
+
+def best_of(repeat, fn):
+    """Return the fastest wall time of repeat calls to fn and its last result."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def megabytes(df):
+    return df.memory_usage(deep=True).sum() / 2 ** 20
+
+def run(process, synthetic, compact, repeat):
+    """Parse, transform and dedupe synthetic; return the timings, the frames' memory and the sheet rows."""
+    spec = PROCESSES[process]
+    usecols = mapped_usecols(list(synthetic.columns.values()), True)
+    parse_time, df = best_of(repeat, lambda: parse_bytes(
+        synthetic.data, synthetic.name, True, usecols=usecols, compact=compact
+    ))
+    options = TRANSFORM_OPTIONS.get(process, {})
+    transform_time, processed = best_of(repeat, lambda: spec.transform(df, **synthetic.columns, **options))
+    dedupe_time = 0.0
+    if spec.dedupe:
+        dedupe_time, processed = best_of(repeat, lambda: DedupeRun(NoIndex(), process, 'Email').filter(processed))
+    return {
+        'parse': parse_time,
+        'transform': transform_time + dedupe_time,
+        'parsed_mb': megabytes(df),
+        'processed_mb': megabytes(processed),
+        'rows': serialize_rows(processed),
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=1000000)
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('--processes', default=','.join(name for name in GENERATORS if name not in SKIP_BY_DEFAULT),
+                        help="comma-separated processes (default: all but market_place)")
+    args = parser.parse_args()
+
+    print(f"{'process':<22}{'dtypes':<9}{'parsed MB':>11}{'processed MB':>14}{'parse s':>9}{'transform s':>13}")
+    for process in args.processes.split(','):
+        synthetic = GENERATORS[process](args.rows)
+        default = run(process, synthetic, False, args.repeat)
+        compact = run(process, synthetic, True, args.repeat)
+
+        # Compact dtypes only change how values are stored, never what reaches the sheet
+        assert compact['rows'] == default['rows'], process
+
+        for name, result in [('default', default), ('compact', compact)]:
+            print(f"{process:<22}{name:<9}{result['parsed_mb']:>11.1f}{result['processed_mb']:>14.1f}"
+                  f"{result['parse']:>9.3f}{result['transform']:>13.3f}")
+
+if __name__ == "__main__":
+    main()
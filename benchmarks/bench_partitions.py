@@ -0,0 +1,66 @@
+"""Compare writing Ferreira's per-store worksheets one at a time and on the partition worker pool.
+
+The synthetic Ferreira file is transformed once, split by store, and appended to fake
+worksheets that pay a simulated round trip per request. Both runs must put the same
+rows in every worksheet.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_partitions --rows 100000 --workers 8 --latency 0.2
+"""
+import argparse
+import time
+
+from benchmarks.generators import GENERATORS
+from ingest import parse_bytes
+from partitions import partition_frame, write_partitions
+from processes import PROCESSES
+from serialize import iter_row_batches
+from sinks import FakeSink
+from upload import UploadJournal, upload_rows
+
+def run(processed, workers, latency, batch_size):
+    """Write every store's rows to a fresh fake sink; return the wall time, the reports and the sheets."""
+    process = PROCESSES['ferreira']
+    partition = process.spec.partition
+    sink = FakeSink(latency=latency)
+    headers = list(processed.columns)
+
+    def write(value, rows):
+        worksheet = sink.worksheet(process.spreadsheet_key, partition.worksheet.format(value), headers=headers)
+        journal = UploadJournal.for_worksheet(worksheet)
+        journal.discard()
+        uploaded, _, _ = upload_rows(worksheet, iter_row_batches(rows), batch_size=batch_size, journal=journal)
+        return {'uploaded': uploaded}
+
+    start = time.perf_counter()
+    reports = write_partitions(partition_frame(processed, partition.column), write, workers=workers)
+    elapsed = time.perf_counter() - start
+    sheets = {title: worksheet.rows for (_, title), worksheet in sink._worksheets.items()}
+    return elapsed, reports, sheets
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=100000)
+    parser.add_argument('--workers', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.2, help="simulated seconds per Sheets request")
+    parser.add_argument('--batch-size', type=int, default=1000)
+    args = parser.parse_args()
+
+    synthetic = GENERATORS['ferreira'](args.rows)
+    df = parse_bytes(synthetic.data, synthetic.name, True)
+    processed = PROCESSES['ferreira'].transform(df, **synthetic.columns)
+
+    serial_time, serial_reports, serial_sheets = run(processed, 1, args.latency, args.batch_size)
+    pooled_time, pooled_reports, pooled_sheets = run(processed, args.workers, args.latency, args.batch_size)
+
+    assert not any(report['error'] for report in serial_reports + pooled_reports)
+    assert pooled_sheets == serial_sheets
+
+    print(f"{len(processed)} rows in {len(pooled_reports)} store worksheets, {args.latency}s per request")
+    print(f"{'workers':<10}{'seconds':>9}{'slowest store s':>17}")
+    for workers, elapsed, reports in [(1, serial_time, serial_reports), (args.workers, pooled_time, pooled_reports)]:
+        print(f"{workers:<10}{elapsed:>9.2f}{max(report['seconds'] for report in reports):>17.2f}")
+
+if __name__ == "__main__":
+    main()
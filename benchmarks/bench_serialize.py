@@ -0,0 +1,94 @@
+"""Compare per-cell row serialization with the column-wise serialization layer.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_serialize --rows 200000
+"""
+import argparse
+import itertools
+import time
+
+import numpy as np
+import pandas as pd
+
+from serialize import iter_row_batches, serialize_rows
+
+def old_donation_rows(df):
+    """The previous donation scheduler path: fillna, tolist, then check every cell for strftime."""
+    rows = df.fillna('').values.tolist()
+    for i, row in enumerate(rows):
+        for j, val in enumerate(row):
+            if hasattr(val, 'strftime'):
+                rows[i][j] = val.strftime('%Y-%m-%d')
+    return rows
+
+def old_customer_rows(df):
+    """The previous save_to_gsheets path: an object copy through fillna, then tolist."""
+    return df.fillna('').values.tolist()
+
+def make_donations(rows, seed=0):
+    """A frame shaped like the processed donation schedule, with gaps outside the date columns.
+
+    The old path raises on missing dates (NaT survives fillna('') and has no strftime),
+    so the dates are complete here to keep the comparison possible.
+    """
+    rng = np.random.default_rng(seed)
+    donated = pd.Series(pd.Timestamp('2024-01-01') + pd.to_timedelta(rng.integers(0, 365, rows), unit='D'))
+    next_date = donated + pd.Timedelta(days=3)
+    return pd.DataFrame({
+        'Donor Name': [f'Donor {i}, First{i}' for i in range(rows)],
+        'First_Name': [f'First{i}' for i in range(rows)],
+        'Donor Account': rng.integers(100000, 999999, rows),
+        'Donor Phone': np.where(rng.random(rows) < 0.1, np.nan, rng.integers(10**9, 10**10 - 1, rows).astype(float)),
+        'Facility': rng.choice(['OLX', 'OLW', None], rows),
+        'Center_Name': rng.choice(['MELROSE', 'PARKCHESTER'], rows),
+        'Donation Date': donated,
+        'Next_Donation_Date': next_date,
+        'Date_to_Send': next_date.dt.strftime('%Y-%m-%d'),
+    })
+
+def make_customers(rows, seed=0):
+    """A frame shaped like the processed customer uploads, with gaps."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Email': np.where(rng.random(rows) < 0.05, None, [f'customer{i}@example.com' for i in range(rows)]),
+        'First Name': [f'First{i}' for i in range(rows)],
+        'Phone': np.where(rng.random(rows) < 0.1, np.nan, rng.integers(10**9, 10**10 - 1, rows).astype(float)),
+    })
+
+def best_of(repeat, fn):
+    """Return the fastest wall time of repeat calls to fn and its last result."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    print(f"{'frame':<12}{'path':<26}{'seconds':>10}{'speedup':>10}")
+    for name, df, old in [
+        ('donations', make_donations(args.rows), old_donation_rows),
+        ('customers', make_customers(args.rows), old_customer_rows),
+    ]:
+        old_time, expected = best_of(args.repeat, lambda: old(df))
+        new_time, rows = best_of(args.repeat, lambda: serialize_rows(df))
+        # Batches are consumed one at a time, as the upload does
+        batched_time, _ = best_of(args.repeat, lambda: sum(len(batch) for batch in iter_row_batches(df)))
+
+        # The layer must produce exactly the rows the old paths sent
+        assert rows == expected
+        assert list(itertools.chain.from_iterable(iter_row_batches(df))) == expected
+
+        for path, elapsed in [("per cell (old)", old_time), ("serialize_rows", new_time), ("iter_row_batches", batched_time)]:
+            print(f"{name:<12}{path:<26}{elapsed:>10.3f}{old_time / elapsed:>9.1f}x")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Compare appending to a large worksheet with and without downloading it first.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sheets_append --existing-rows 200000 --rows 1000
+"""
+import argparse
+import time
+
+import pandas as pd
+
+from sinks import FakeWorksheet
+from utils import save_chunks_to_gsheets, save_to_gsheets
+
+COLUMNS = ['Email', 'First Name', 'Last Name', 'Phone', 'Store', 'Date']
+
+def old_save_to_gsheets(df, worksheet):
+    """The previous append path: count the rows with get_all_values, then append below them."""
+    last_row = len(worksheet.get_all_values())
+    worksheet.append_rows(
+        df.fillna('').values.tolist(),
+        value_input_option='RAW',
+        insert_data_option='INSERT_ROWS',
+        table_range=f'A{last_row + 1}'
+    )
+    return True
+
+def make_rows(count, offset=0):
+    """Rows shaped like the processed customer uploads."""
+    return [
+        [f'customer{i}@example.com', f'First{i}', f'Last{i}', f'555-{i % 10000:04d}', str(i % 12), '2024-01-01']
+        for i in range(offset, offset + count)
+    ]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--existing-rows', type=int, default=200000)
+    parser.add_argument('--rows', type=int, default=1000)
+    parser.add_argument('--chunks', type=int, default=5)
+    args = parser.parse_args()
+
+    existing = [COLUMNS] + make_rows(args.existing_rows)
+    chunks = [pd.DataFrame(make_rows(args.rows, offset=(i + 1) * 10**7), columns=COLUMNS) for i in range(args.chunks)]
+    print(f"Worksheet: {args.existing_rows} existing rows; appending {args.chunks} chunks of {args.rows} rows")
+
+    old_sheet = FakeWorksheet(rows=existing)
+    start = time.perf_counter()
+    for chunk in chunks:
+        old_save_to_gsheets(chunk, old_sheet)
+    old_time = time.perf_counter() - start
+
+    single_sheet = FakeWorksheet(rows=existing)
+    start = time.perf_counter()
+    for chunk in chunks:
+        save_to_gsheets(chunk, single_sheet)
+    single_time = time.perf_counter() - start
+
+    streamed_sheet = FakeWorksheet(rows=existing)
+    start = time.perf_counter()
+    save_chunks_to_gsheets(iter(chunks), streamed_sheet)
+    streamed_time = time.perf_counter() - start
+
+    # Every path must leave the sheet in the same state
+    assert single_sheet.rows == old_sheet.rows
+    assert streamed_sheet.rows == old_sheet.rows
+
+    print(f"{'path':<32}{'seconds':>10}{'speedup':>10}  calls")
+    for name, elapsed, sheet in [
+        ("get_all_values + append (old)", old_time, old_sheet),
+        ("save_to_gsheets per chunk", single_time, single_sheet),
+        ("save_chunks_to_gsheets", streamed_time, streamed_sheet),
+    ]:
+        print(f"{name:<32}{elapsed:>10.3f}{old_time / elapsed:>9.1f}x  {sheet.calls}")
+
+if __name__ == "__main__":
+    main()
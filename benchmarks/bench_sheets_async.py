@@ -0,0 +1,93 @@
+"""Compare opening and appending to many worksheets one request at a time and concurrently with the async Sheets client.
+
+A local stand-in for the Sheets API answers every request after a simulated round trip.
+Each run lists the spreadsheet's worksheets, creates the missing ones with their
+headers, and appends batches to every worksheet, each worksheet's batches in order.
+With a concurrency of 1 the requests go out one after another, as gspread sends them;
+both runs must leave the same rows in every worksheet, and the requests in flight must
+never exceed the cap.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_sheets_async --worksheets 40 --concurrency 8 --latency 0.1
+"""
+import argparse
+import asyncio
+import time
+
+from benchmarks.sheets_api import SheetsAPIStandIn
+from sheets_async import AsyncSheetsClient, open_worksheets
+from upload import next_row_after
+
+HEADERS = ['Email', 'First Name', 'Phone', 'Store Number']
+SPREADSHEET_KEY = 'bench'
+
+def worksheet_rows(worksheet, rows):
+    return [[f'user{worksheet}_{i}@example.com', f'Name{i}', f'555{i:07d}', str(worksheet)] for i in range(rows)]
+
+async def write_all(client, titles, rows_by_title, batch_size):
+    """Open every worksheet, then append each one's rows in batches, worksheets concurrently."""
+    await open_worksheets(client, SPREADSHEET_KEY, titles, headers=HEADERS)
+
+    async def append(title):
+        # Every worksheet holds just its header, so even the first batch is pinned
+        next_row = 2
+        rows = rows_by_title[title]
+        for start in range(0, len(rows), batch_size):
+            response = await client.append_rows(SPREADSHEET_KEY, title, rows[start:start + batch_size], next_row)
+            next_row = next_row_after(response, next_row)
+
+    await asyncio.gather(*(append(title) for title in titles))
+
+def run(titles, rows_by_title, concurrency, latency, batch_size, failures=None, lost_replies=None):
+    """Write everything to a fresh stand-in; return the wall time, the stand-in and the rows it holds."""
+    api = SheetsAPIStandIn(latency=latency, failures=failures, lost_replies=lost_replies)
+    # Half of the worksheets exist already
+    api.add_spreadsheet(SPREADSHEET_KEY, {title: [HEADERS] for title in titles[::2]})
+
+    async def main(url):
+        async with AsyncSheetsClient(lambda: 'token', url, concurrency, sleep=lambda delay: asyncio.sleep(0)) as client:
+            await write_all(client, titles, rows_by_title, batch_size)
+
+    with api as url:
+        start = time.perf_counter()
+        asyncio.run(main(url))
+        elapsed = time.perf_counter() - start
+    return elapsed, api, {title: api.rows(SPREADSHEET_KEY, title) for title in titles}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--worksheets', type=int, default=40)
+    parser.add_argument('--rows', type=int, default=2000, help="rows appended to each worksheet")
+    parser.add_argument('--batch-size', type=int, default=500)
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--latency', type=float, default=0.1, help="simulated seconds per request")
+    args = parser.parse_args()
+
+    titles = [f'Store_{n}' for n in range(1, args.worksheets + 1)]
+    rows_by_title = {title: worksheet_rows(n, args.rows) for n, title in enumerate(titles, 1)}
+
+    serial_time, serial_api, serial_rows = run(titles, rows_by_title, 1, args.latency, args.batch_size)
+    pooled_time, pooled_api, pooled_rows = run(titles, rows_by_title, args.concurrency, args.latency, args.batch_size)
+    # Rate limiting, server errors and a reply lost after the request was applied are
+    # retried without losing or repeating rows
+    _, retried_api, retried_rows = run(
+        titles, rows_by_title, args.concurrency, 0.0, args.batch_size, failures={2: 429, 5: 503, 30: 500},
+        lost_replies={40: 503}
+    )
+
+    expected = {title: [HEADERS] + rows for title, rows in rows_by_title.items()}
+    assert serial_rows == expected
+    assert pooled_rows == expected
+    assert retried_rows == expected
+    assert pooled_api.max_in_flight <= args.concurrency
+
+    print(f"{args.worksheets} worksheets, {args.rows} rows each in batches of {args.batch_size}, "
+          f"{args.latency}s per request")
+    print(f"{'concurrency':<13}{'seconds':>9}{'requests':>10}{'connections':>13}{'max in flight':>15}")
+    for concurrency, elapsed, api in [(1, serial_time, serial_api), (args.concurrency, pooled_time, pooled_api)]:
+        print(f"{concurrency:<13}{elapsed:>9.2f}{api.requests:>10}{api.connections:>13}{api.max_in_flight:>15}")
+    print(f"with 3 injected failures and a lost reply: {retried_api.requests} requests, same rows")
+
+if __name__ == "__main__":
+    main()
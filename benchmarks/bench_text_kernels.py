@@ -0,0 +1,78 @@
+"""Check and time the vectorized text kernels against the per-row functions.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_text_kernels --rows 200000
+"""
+import argparse
+import random
+import time
+
+import numpy as np
+import pandas as pd
+import pyarrow as pa
+
+from text_kernels import (
+    format_name, extract_first_name, normalize_email,
+    format_names, extract_first_names, normalize_emails
+)
+
+FIRST_NAMES = ['john', 'MARY', 'jose', "o'neil", 'mary-jane', 'ANNE  marie', 'li', 'DeShawn', 'kim']
+LAST_NAMES = ['SMITH', 'garcia', 'McDonald', 'van der berg', 'Nguyen', 'ZOLA', 'o brien']
+# A small share of names fall back to the per-row path
+NON_ASCII_NAMES = ['jOsÉ', 'Łukasz', 'straße', 'garcía']
+
+def make_values(rows, seed=0):
+    """Build a realistic mix of names, 'Last, First' names, emails, blanks and missing values."""
+    rng = random.Random(seed)
+    names, full_names, emails = [], [], []
+    for i in range(rows):
+        first = rng.choice(NON_ASCII_NAMES if i % 40 == 1 else FIRST_NAMES)
+        last = rng.choice(LAST_NAMES)
+        if i % 50 == 0:
+            names.append(np.nan)
+            full_names.append(np.nan)
+            emails.append(np.nan)
+            continue
+        names.append(f"  {first} {last} " if i % 7 == 0 else f"{first} {last}")
+        full_names.append(f"{last}, {first}" if i % 5 else first)
+        emails.append(f" {first}.{last}{i}@Example.COM" if i % 9 == 0 else f"{first}{i}@example.com")
+    return pd.Series(names), pd.Series(full_names), pd.Series(emails)
+
+def timed(fn):
+    """Return the wall time of fn() and its result."""
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=200000)
+    args = parser.parse_args()
+
+    names, full_names, emails = make_values(args.rows)
+    cases = [
+        ("format_name", names, format_name, format_names),
+        ("extract_first_name", full_names, extract_first_name, extract_first_names),
+        ("normalize_email", emails, normalize_email, normalize_emails),
+    ]
+
+    print(f"{'kernel':<22}{'input':<8}{'apply s':>10}{'kernel s':>10}{'speedup':>10}{'rows/s':>14}")
+    for name, series, scalar, kernel in cases:
+        apply_time, expected = timed(lambda: series.apply(scalar))
+        arrow_series = series.astype(pd.ArrowDtype(pa.string()))
+        for label, column in [("object", series), ("arrow", arrow_series)]:
+            kernel_time, result = timed(lambda: kernel(column))
+            # Output must be identical to the per-row function, value for value
+            if label == "object":
+                pd.testing.assert_series_equal(result, expected, check_exact=True)
+            else:
+                assert result.astype(object).where(result.notna(), None).tolist() == \
+                    expected.where(expected.notna(), None).tolist()
+            print(
+                f"{name:<22}{label:<8}{apply_time:>10.3f}{kernel_time:>10.3f}"
+                f"{apply_time / kernel_time:>9.1f}x{len(series) / kernel_time:>14,.0f}"
+            )
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""Exercise the batched, resumable Sheets upload against fake worksheets that inject failures.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_upload --rows 50000 --batch-size 5000
+"""
+import argparse
+import os
+import tempfile
+import time
+
+from sinks import FakeWorksheet
+from upload import MAX_ATTEMPTS, UploadJournal, upload_rows
+
+HEADER = ['Email', 'First Name', 'Phone']
+
+def make_rows(count):
+    """Rows shaped like the processed customer uploads."""
+    return [[f'customer{i}@example.com', f'First{i}', f'555-{i % 10000:04d}'] for i in range(count)]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--batch-size', type=int, default=5000)
+    parser.add_argument('--latency', type=float, default=0.02, help="seconds added to every fake request")
+    args = parser.parse_args()
+
+    rows = make_rows(args.rows)
+    blocks = [rows[i:i + 7000] for i in range(0, len(rows), 7000)]
+    expected = [HEADER] + rows
+    batches = -(-args.rows // args.batch_size)
+    journal_dir = tempfile.mkdtemp()
+    no_sleep = lambda delay: None
+
+    def journal(name):
+        return UploadJournal(os.path.join(journal_dir, f'{name}.json'))
+
+    # 1. One request for everything is rejected once it is over the request size limit
+    sheet = FakeWorksheet(rows=[HEADER], max_rows_per_request=args.batch_size * 2)
+    try:
+        sheet.append_rows(rows, value_input_option='RAW', insert_data_option='INSERT_ROWS', table_range='A1')
+        print("single request:       accepted")
+    except Exception as e:
+        print(f"single request:       rejected ({e})")
+    upload_rows(sheet, blocks, args.batch_size, journal('limit'), sleep=no_sleep)
+    assert sheet.rows == expected
+    print(f"batched:              {sheet.calls['append_rows'] - 1} requests of <= {args.batch_size} rows, sheet complete")
+
+    # 2. Rate limiting and server errors are retried without losing or repeating rows
+    retries = []
+    sheet = FakeWorksheet(rows=[HEADER], failures={('append_rows', 2): 429, ('append_rows', 3): 503})
+    upload_rows(sheet, blocks, args.batch_size, journal('transient'), sleep=no_sleep,
+                on_retry=lambda error, attempt, delay: retries.append(delay))
+    assert sheet.rows == expected
+    print(f"transient failures:   {len(retries)} retries, backoff delays {[round(d, 2) for d in retries]}, sheet complete")
+
+    # 3. A batch that keeps failing stops the run; running again resumes after the committed batches
+    failing_call = 4
+    failures = {('append_rows', failing_call + i): 500 for i in range(MAX_ATTEMPTS)}
+    sheet = FakeWorksheet(rows=[HEADER], failures=failures)
+    resumable = journal('resume')
+    try:
+        upload_rows(sheet, blocks, args.batch_size, resumable, sleep=no_sleep)
+    except Exception as e:
+        print(f"persistent failure:   run stopped after {len(resumable.batches)} of {batches} batches ({e})")
+    uploaded, skipped, _ = upload_rows(sheet, blocks, args.batch_size, journal('resume'), sleep=no_sleep)
+    assert sheet.rows == expected
+    assert not os.path.exists(resumable.path)
+    print(f"second run:           skipped {skipped} committed rows, uploaded {uploaded}, no duplicates")
+
+    # Throughput by batch size when every request pays a fixed latency
+    print(f"\n{'batch size':>10}{'requests':>10}{'seconds':>10}")
+    for batch_size in sorted({args.batch_size // 5, args.batch_size, args.batch_size * 2}):
+        sheet = FakeWorksheet(rows=[HEADER], latency=args.latency)
+        start = time.perf_counter()
+        upload_rows(sheet, blocks, batch_size, journal(f'size{batch_size}'), sleep=no_sleep)
+        elapsed = time.perf_counter() - start
+        assert sheet.rows == expected
+        print(f"{batch_size:>10}{sheet.calls['append_rows']:>10}{elapsed:>10.3f}")
+
+if __name__ == "__main__":
+    main()
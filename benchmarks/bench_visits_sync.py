@@ -0,0 +1,90 @@
+"""Compare rewriting the visits report with syncing only the rows that changed.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_visits_sync --rows 50000 --changed 0.02
+"""
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from sinks import FakeWorksheet
+from certo_market_visits import HEADERS
+from sheet_sync import SheetSnapshot, row_hashes, row_keys, sync_worksheet
+from upload import UploadJournal, upload_rows
+
+def make_report(rows, seed=0):
+    """A visits report with unique emails."""
+    rng = np.random.default_rng(seed)
+    return pd.DataFrame({
+        'Name': [f'Customer {i}' for i in range(rows)],
+        'Email': [f'customer{i}@example.com' for i in range(rows)],
+        'Phone': [f'555-{i % 10000:04d}' for i in range(rows)],
+        'Registered Date': '2024-01-01',
+        'First Order Date': '2024-02-01',
+        'Spent $': rng.integers(0, 500, rows),
+    })
+
+def next_week(report, changed, seed=1):
+    """The following week's report: some rows updated, some customers gone, some new."""
+    rng = np.random.default_rng(seed)
+    count = int(len(report) * changed)
+    report = report.copy()
+    updated = rng.choice(len(report), count, replace=False)
+    report.loc[updated, 'Spent $'] += 1
+    report = report.drop(rng.choice(len(report), count, replace=False)).reset_index(drop=True)
+    new = make_report(count, seed=2)
+    new['Email'] = [f'new{i}@example.com' for i in range(count)]
+    return pd.concat([report, new], ignore_index=True)
+
+def sheet_rows(df):
+    """Rows as the sheet holds them."""
+    return df.fillna('').values.tolist()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, default=50000)
+    parser.add_argument('--changed', type=float, default=0.02, help="share of rows updated, deleted and inserted")
+    parser.add_argument('--latency', type=float, default=0.02, help="seconds added to every fake request")
+    args = parser.parse_args()
+
+    week1 = make_report(args.rows)
+    week2 = next_week(week1, args.changed)
+    work_dir = tempfile.mkdtemp()
+    expected = sorted(map(str, sheet_rows(week2)))
+
+    # Old path: clear the sheet, write the headers and upload every row
+    sheet = FakeWorksheet(rows=[HEADERS] + sheet_rows(week1), latency=args.latency)
+    start = time.perf_counter()
+    sheet.clear()
+    sheet.append_row(HEADERS)
+    upload_rows(sheet, [sheet_rows(week2)], journal=UploadJournal(os.path.join(work_dir, 'journal.json')))
+    rewrite_time = time.perf_counter() - start
+    assert sheet.rows[0] == HEADERS and sorted(map(str, sheet.rows[1:])) == expected
+    rewrite_calls = sum(sheet.calls.values())
+
+    # Diff sync against the snapshot of week 1
+    snapshot = SheetSnapshot(os.path.join(work_dir, 'snapshot.parquet'))
+    snapshot.save(row_keys(week1['Email']), row_hashes(week1))
+    sheet = FakeWorksheet(rows=[HEADERS] + sheet_rows(week1), latency=args.latency)
+    start = time.perf_counter()
+    counts, keys, hashes = sync_worksheet(sheet, week2, snapshot.load(), 'Email')
+    sync_time = time.perf_counter() - start
+    snapshot.save(keys, hashes)
+
+    # The sheet must hold exactly the new report, and the new snapshot must describe it
+    assert sheet.rows[0] == HEADERS and sorted(map(str, sheet.rows[1:])) == expected
+    synced = pd.DataFrame(sheet.rows[1:], columns=HEADERS)
+    assert (row_keys(synced['Email']) == keys).all()
+
+    print(f"Report: {args.rows} rows; {counts}")
+    print(f"{'path':<24}{'seconds':>10}{'requests':>10}")
+    print(f"{'clear and rewrite':<24}{rewrite_time:>10.3f}{rewrite_calls:>10}")
+    print(f"{'diff sync':<24}{sync_time:>10.3f}{sum(sheet.calls.values()):>10}")
+
+if __name__ == "__main__":
+    main()
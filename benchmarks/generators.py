@@ -0,0 +1,189 @@
+"""Synthetic input files for each process, shaped like the real exports.
+
+Every generator returns a SyntheticFile: the file bytes, a file name whose extension
+selects the parser, and the column mapping a user would pick in the UI. Data is built
+with vectorized numpy/pandas operations so files of several million rows are quick to
+make. Values are deliberately untidy the way real exports are: mixed-case and padded
+emails, repeated and missing emails, names in any case, filler columns, and for the
+donation export lower-case and unknown facility codes and a share of dates written in
+a second format.
+"""
+import io
+from collections import namedtuple
+
+import numpy as np
+import pandas as pd
+
+SyntheticFile = namedtuple('SyntheticFile', ['name', 'data', 'columns'])
+
+FIRST_NAMES = np.array(['maria', 'JOSE', 'Ana', 'luis', 'CARMEN', 'Juan', 'rosa', 'Pedro', "o'neil", 'mary ann'])
+LAST_NAMES = np.array(['GARCIA', 'Rodriguez', 'martinez', 'Lopez', 'GONZALEZ', 'perez', 'Smith', 'Johnson'])
+CITIES = np.array(['Bronx', 'Brooklyn', 'Queens', 'Valley Stream', 'Newark'])
+
+# Facility codes as they appear in the exports, including spacing, case and unknown codes
+FACILITY_CODES = np.array(['OLX', 'OLW', 'OLL', 'OLK', 'OLJ', 'OLF', 'OLB', 'HPF', 'OLH', 'OLG', 'olx', ' OLW ', 'ZZZ'])
+
+# A center-hours feed in the shape the OLGAM feed serves, so nothing is fetched
+CENTER_HOURS = {
+    center: {
+        day: 'CLOSED' if day in closed else '8:00 AM - 6:00 PM'
+        for day in ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+    }
+    for center, closed in [
+        ('MELROSE', {'Sunday'}), ('PARKCHESTER', {'Saturday', 'Sunday'}), ('HOWARD_BEACH', {'Sunday'}),
+        ('BROWNSVILLE', {'Monday'}), ('JAMAICA', set()), ('FLATBUSH', {'Sunday'}), ('CLINTON_HILL', {'Sunday'}),
+        ('FT_PIERCE', {'Saturday', 'Sunday'}), ('EASTHARLEM', {'Wednesday'}), ('FORDHAM', {'Sunday'}),
+    ]
+}
+
+LETTERS = np.array(list('abcdefghijklmnopqrstuvwxyz'), dtype=object)
+
+def _names(rng, rows, pool, distinct_share=0.9):
+    """Names from pool, most made distinct with a random letter suffix, as in real exports.
+
+    Mostly unique names keep compact parsing from turning the column into a categorical.
+    """
+    names = rng.choice(pool, rows).astype(object)
+    codes = rng.integers(0, 26 ** 4, rows)
+    suffixes = LETTERS[codes % 26] + LETTERS[codes // 26 % 26] + LETTERS[codes // 676 % 26] + LETTERS[codes // 17576]
+    distinct = rng.random(rows) < distinct_share
+    names[distinct] = names[distinct] + suffixes[distinct]
+    return names
+
+def _ids(rng, rows, repeat_share):
+    """Customer ids with repeat_share of the rows repeating an earlier customer."""
+    ids = np.arange(rows)
+    repeats = rng.random(rows) < repeat_share
+    ids[repeats] = rng.integers(0, rows, repeats.sum())
+    return ids
+
+def _emails(rng, ids, missing_share=0.03):
+    """Emails in mixed case with stray whitespace, some missing."""
+    emails = pd.Series(ids).astype(str)
+    emails = np.where(rng.random(len(ids)) < 0.5, 'Customer', 'customer') + emails.to_numpy(dtype=object)
+    emails = emails + np.where(rng.random(len(ids)) < 0.3, '@Example.COM ', '@example.com')
+    emails = np.where(rng.random(len(ids)) < 0.1, ' ' + emails, emails)
+    return np.where(rng.random(len(ids)) < missing_share, None, emails)
+
+def _phones(rng, rows):
+    """Phone numbers in a few layouts, some missing."""
+    numbers = pd.Series(rng.integers(2000000000, 9999999999, rows)).astype(str)
+    dashed = numbers.str[:3] + '-' + numbers.str[3:6] + '-' + numbers.str[6:]
+    phones = np.where(rng.random(rows) < 0.5, numbers.to_numpy(dtype=object), dashed.to_numpy(dtype=object))
+    return np.where(rng.random(rows) < 0.05, None, phones)
+
+def _dates(rng, rows, date_format, start='2024-01-01', days=365):
+    """Random times within days of start, written with date_format ('<date part>[ <time part>]').
+
+    Only the distinct days and times are formatted, then picked by index.
+    """
+    day_format, _, time_format = date_format.partition(' ')
+    day_strings = pd.date_range(start, periods=days, freq='D').strftime(day_format).to_numpy(dtype=object)
+    dates = day_strings[rng.integers(0, days, rows)]
+    if time_format:
+        time_strings = pd.date_range(start, periods=86400, freq='s').strftime(time_format).to_numpy(dtype=object)
+        dates = dates + ' ' + time_strings[rng.integers(0, 86400, rows)]
+    return dates
+
+def _full_names(rng, rows, first, separator):
+    """Names built from the name lists, first name first or last name first."""
+    firsts = pd.Series(_names(rng, rows, FIRST_NAMES))
+    lasts = pd.Series(_names(rng, rows, LAST_NAMES))
+    return (firsts + separator + lasts if first else lasts + separator + firsts).to_numpy(dtype=object)
+
+def _customers(rng, rows):
+    """The columns shared by the customer exports."""
+    ids = _ids(rng, rows, 0.05)
+    return pd.DataFrame({
+        'Customer ID': ids,
+        'Email Address': _emails(rng, ids),
+        'First Name': _names(rng, rows, FIRST_NAMES),
+        'Last Name': _names(rng, rows, LAST_NAMES),
+        'Phone Number': _phones(rng, rows),
+        'City': rng.choice(CITIES, rows),
+        'Signup Date': _dates(rng, rows, '%m/%d/%Y'),
+    })
+
+def _csv(df, sep=','):
+    return df.to_csv(index=False, sep=sep).encode('utf-8')
+
+def _xlsx(df):
+    """Write df as a workbook the way spreadsheet exports store it."""
+    buffer = io.BytesIO()
+    df.to_excel(buffer, index=False, engine='openpyxl')
+    return buffer.getvalue()
+
+CUSTOMER_COLUMNS = {'email_col': 'Email Address', 'first_name_col': 'First Name', 'phone_col': 'Phone Number'}
+
+def certo_market(rows, seed=0):
+    """A Certo Market customer export (CSV)."""
+    df = _customers(np.random.default_rng(seed), rows)
+    return SyntheticFile('certo_market.csv', _csv(df), dict(CUSTOMER_COLUMNS))
+
+def ferreira(rows, seed=0):
+    """A Ferreira customer export with store numbers (CSV)."""
+    rng = np.random.default_rng(seed)
+    df = _customers(rng, rows)
+    df.insert(5, 'Store #', rng.integers(1, 40, rows))
+    return SyntheticFile('ferreira.csv', _csv(df), dict(CUSTOMER_COLUMNS, store_col='Store #'))
+
+def key_food(rows, seed=0):
+    """A Key Food Valley Stream export (tab-separated TXT)."""
+    df = _customers(np.random.default_rng(seed), rows)
+    return SyntheticFile('key_food.txt', _csv(df, sep='\t'), dict(CUSTOMER_COLUMNS))
+
+def market_place(rows, seed=0):
+    """A Market Place export (XLSX). Writing large workbooks is slow; the file is built once per size."""
+    df = _customers(np.random.default_rng(seed), rows)
+    return SyntheticFile('market_place.xlsx', _xlsx(df), dict(CUSTOMER_COLUMNS))
+
+def certo_market_visits(rows, seed=0):
+    """A Certo Market marketing report (CSV) with month-first and ISO timestamp dates."""
+    rng = np.random.default_rng(seed)
+    ids = _ids(rng, rows, 0.01)
+    df = pd.DataFrame({
+        'Customer Name': _full_names(rng, rows, True, ' '),
+        'Email': _emails(rng, ids, missing_share=0.01),
+        'Phone': _phones(rng, rows),
+        'Registered': _dates(rng, rows, '%m/%d/%Y', start='2023-01-01', days=700),
+        'First Order': _dates(rng, rows, '%Y-%m-%d %H:%M:%S'),
+        'Orders': rng.integers(0, 30, rows),
+        'Spent $': np.round(rng.gamma(2.0, 40.0, rows), 2),
+    })
+    return SyntheticFile('certo_market_visits.csv', _csv(df), {
+        'name_col': 'Customer Name', 'email_col': 'Email', 'phone_col': 'Phone',
+        'reg_date_col': 'Registered', 'first_order_col': 'First Order', 'spent_col': 'Spent $',
+    })
+
+def donations(rows, seed=0, date_format='%d/%m/%Y', other_format_share=0.02):
+    """A plasma-center donation export (CSV).
+
+    Dates are written with date_format, except other_format_share of them in ISO format,
+    as happens when exports from two systems are pasted together.
+    """
+    rng = np.random.default_rng(seed)
+    dates = _dates(rng, rows, date_format)
+    other = rng.random(rows) < other_format_share
+    dates[other] = _dates(rng, int(other.sum()), '%Y-%m-%d')
+    df = pd.DataFrame({
+        'Donor #': rng.integers(100000, 999999, rows),
+        'Donor Name': _full_names(rng, rows, False, ', '),
+        'Donor Phone': _phones(rng, rows),
+        'Donation Date': dates,
+        'Facility': rng.choice(FACILITY_CODES, rows),
+        'Donor Status': rng.choice(['NEW', 'new', 'REPEAT', 'QUALIFIED'], rows, p=[0.3, 0.05, 0.5, 0.15]),
+        'Volume (mL)': rng.integers(690, 880, rows),
+    })
+    return SyntheticFile('donations.csv', _csv(df), {
+        'donor_name_col': 'Donor Name', 'donation_date_col': 'Donation Date', 'facility_col': 'Facility',
+        'donor_account_col': 'Donor #', 'donor_phone_col': 'Donor Phone', 'donor_status_col': 'Donor Status',
+    })
+
+GENERATORS = {
+    'certo_market': certo_market,
+    'ferreira': ferreira,
+    'key_food': key_food,
+    'market_place': market_place,
+    'certo_market_visits': certo_market_visits,
+    'donation_scheduler': donations,
+}
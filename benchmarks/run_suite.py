@@ -0,0 +1,221 @@
+"""Time and memory-profile every stage of every process on synthetic files.
+
+Each process runs its own pipeline on a generated file of each size: parse (the
+two-phase reader, limited to the mapped columns), transform, dedupe (for the processes
+that skip known emails), serialize, and upload to an in-process fake worksheet
+(serializing as it goes, as the app does). Results are written as JSON for comparing
+runs; pass --baseline to print the change against an earlier results file.
+
+Run from the repository root:
+
+    python -m benchmarks.run_suite --rows 1000,100000 --processes certo_market,donation_scheduler
+    python -m benchmarks.run_suite --rows 1000000 --baseline benchmarks/results/before.json
+    python -m benchmarks.run_suite --results benchmarks/results/after.json --baseline benchmarks/results/before.json
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+# Keep the suite away from Google Sheets and from the real local cache; both are read at import
+os.environ['HARVESTING_OUTPUT_SINK'] = 'fake'
+os.environ['HARVESTING_CACHE_DIR'] = tempfile.mkdtemp(prefix='harvesting_bench_')
+
+import numpy as np
+import pandas as pd
+
+from benchmarks.generators import CENTER_HOURS, GENERATORS
+from center_hours import compile_weekmasks
+from ingest import PARSE_CACHE
+from key_index import KeyIndex
+from processes import PROCESSES
+from serialize import iter_row_batches
+from settings import CACHE_DIR, UPLOAD_BATCH_SIZE
+from sinks import FakeWorksheet
+from upload import UploadJournal, upload_rows
+from utils import UploadSource
+
+RESULTS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'results')
+
+# Slowdowns smaller than this many seconds are timer noise, whatever the ratio
+MIN_REGRESSION_SECONDS = 0.01
+
+class NamedBytes(io.BytesIO):
+    """File-like upload with a name, like Streamlit's UploadedFile."""
+
+    def __init__(self, data, name):
+        super().__init__(data)
+        self.name = name
+
+# Arguments the transforms take besides the column mapping
+TRANSFORM_OPTIONS = {'donation_scheduler': {'weekmasks': compile_weekmasks(CENTER_HOURS)}}
+
+def synthetic_file(process, rows, data_dir):
+    """Generate the file for a process and size, reusing an earlier copy from data_dir."""
+    generate = GENERATORS[process]
+    sample = generate(1)
+    path = os.path.join(data_dir, f"{rows}_{sample.name}")
+    if not os.path.exists(path):
+        with open(f"{path}.tmp", 'wb') as f:
+            f.write(generate(rows).data)
+        os.replace(f"{path}.tmp", path)
+    with open(path, 'rb') as f:
+        return sample._replace(data=f.read())
+
+def measure(stage, repeat, memory):
+    """Run stage() repeat times; return the best wall time, the traced peak in MB and the last result."""
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = stage()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    peak_mb = None
+    if memory:
+        # A separate traced run, since tracing slows allocation-heavy code down
+        tracemalloc.start()
+        stage()
+        peak_mb = tracemalloc.get_traced_memory()[1] / 2**20
+        tracemalloc.stop()
+    return best, peak_mb, result
+
+def run_process(process, rows, args, work_dir):
+    """Run one process's stages on one file size; returns the result records."""
+    file = synthetic_file(process, rows, args.data_dir)
+    columns = file.columns
+    records = []
+
+    def record(stage, seconds, peak_mb):
+        records.append({
+            'process': process, 'rows': rows, 'file': file.name, 'stage': stage,
+            'seconds': round(seconds, 6), 'rows_per_second': round(rows / seconds) if seconds else None,
+            'peak_mb': None if peak_mb is None else round(peak_mb, 2),
+        })
+        memory = '' if peak_mb is None else f"{peak_mb:>10.1f}"
+        print(f"{process:<22}{rows:>10}{stage:>12}{seconds:>10.3f}{memory}", flush=True)
+
+    def parse():
+        PARSE_CACHE.clear()
+        return UploadSource(NamedBytes(file.data, file.name), True).load(list(columns.values()))
+
+    seconds, peak_mb, df = measure(parse, args.repeat, args.memory)
+    record('parse', seconds, peak_mb)
+    PARSE_CACHE.clear()
+
+    # Transforms may add columns, so each run gets its own shallow copy
+    transform = PROCESSES[process].transform
+    options = TRANSFORM_OPTIONS.get(process, {})
+    seconds, peak_mb, processed = measure(
+        lambda: transform(df.copy(deep=False), **columns, **options), args.repeat, args.memory
+    )
+    record('transform', seconds, peak_mb)
+    del df
+
+    if PROCESSES[process].dedupe:
+        def dedupe():
+            index = KeyIndex(os.path.join(work_dir, f'{process}_{rows}_{time.perf_counter_ns()}.sqlite3'))
+            # An empty worksheet, so every row is checked against the index alone
+            return index.run(FakeWorksheet(process)).filter(processed)
+
+        seconds, peak_mb, processed = measure(dedupe, args.repeat, args.memory)
+        record('dedupe', seconds, peak_mb)
+
+    seconds, peak_mb, _ = measure(lambda: sum(len(batch) for batch in iter_row_batches(processed)), args.repeat, args.memory)
+    record('serialize', seconds, peak_mb)
+
+    def upload():
+        sheet = FakeWorksheet(rows=[list(processed.columns)])
+        journal = UploadJournal(os.path.join(work_dir, f'{process}_{rows}_{time.perf_counter_ns()}.json'))
+        upload_rows(sheet, iter_row_batches(processed), journal=journal)
+        assert len(sheet.rows) == len(processed) + 1
+        return sheet
+
+    seconds, peak_mb, _ = measure(upload, args.repeat, args.memory)
+    record('upload', seconds, peak_mb)
+    return records
+
+def run_metadata():
+    """Describe the code and machine a run was made on."""
+    try:
+        commit = subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {
+        'created': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'commit': commit,
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'numpy': np.__version__,
+        'platform': platform.platform(),
+        'upload_batch_size': UPLOAD_BATCH_SIZE,
+    }
+
+def compare(baseline, results, threshold):
+    """Print each stage's time against the baseline, flagging slowdowns beyond threshold."""
+    before = {(r['process'], r['rows'], r['stage']): r for r in baseline['results']}
+    print(f"\nAgainst {baseline['meta'].get('commit')} ({baseline['meta'].get('created')}):")
+    print(f"{'process':<22}{'rows':>10}{'stage':>12}{'before':>10}{'after':>10}{'change':>9}")
+    regressions = 0
+    for r in results['results']:
+        old = before.get((r['process'], r['rows'], r['stage']))
+        if old is None:
+            continue
+        ratio = r['seconds'] / old['seconds'] if old['seconds'] else float('inf')
+        flag = '  slower' if ratio > threshold and r['seconds'] - old['seconds'] > MIN_REGRESSION_SECONDS else ''
+        regressions += bool(flag)
+        print(f"{r['process']:<22}{r['rows']:>10}{r['stage']:>12}{old['seconds']:>10.3f}{r['seconds']:>10.3f}"
+              f"{ratio:>8.2f}x{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--processes', default=','.join(GENERATORS), help="comma-separated process names")
+    parser.add_argument('--rows', default='1000,100000', help="comma-separated file sizes, up to millions of rows")
+    parser.add_argument('--repeat', type=int, default=3, help="timed runs per stage; the fastest is kept")
+    parser.add_argument('--no-memory', dest='memory', action='store_false', help="skip the traced memory runs")
+    parser.add_argument('--data-dir', default=os.path.join(tempfile.gettempdir(), 'harvesting_bench_data'),
+                        help="where generated files are kept between runs")
+    parser.add_argument('--output', help="results file (default: benchmarks/results/suite-<time>.json)")
+    parser.add_argument('--results', help="compare this existing results file instead of running")
+    parser.add_argument('--baseline', help="earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=1.2, help="slowdown ratio reported as a regression")
+    args = parser.parse_args()
+
+    if args.results:
+        with open(args.results) as f:
+            results = json.load(f)
+    else:
+        os.makedirs(args.data_dir, exist_ok=True)
+        print(f"{'process':<22}{'rows':>10}{'stage':>12}{'seconds':>10}{'peak MB' if args.memory else ''}")
+        records = []
+        for process in args.processes.split(','):
+            for rows in map(int, args.rows.split(',')):
+                records.extend(run_process(process, rows, args, CACHE_DIR))
+        results = {'meta': run_metadata(), 'results': records}
+
+        output = args.output or os.path.join(
+            RESULTS_DIR, f"suite-{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+        )
+        os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+        with open(output, 'w') as f:
+            json.dump(results, f, indent=2)
+        print(f"\nResults written to {output}")
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(json.load(f), results, args.threshold)
+        if regressions:
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,178 @@
+"""A local HTTP stand-in for the Google Sheets REST API, for running the async Sheets client without Google.
+
+It serves the requests AsyncSheetsClient sends (listing and adding worksheets, reading
+whole worksheets or single rows, writing and appending values) on localhost, keeping
+each worksheet as a TableWorksheet so appends follow the Sheets table rules. Every request waits latency
+seconds, as a round trip to Google would, and failures maps a request's number (from 1)
+to the HTTP status to fail it with before it is applied. lost_replies does the same after
+applying it, as when Google does the work but the reply is a server error or timeout.
+It counts requests, connections opened and the most requests in flight at once.
+"""
+import json
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import unquote, urlsplit
+
+from sinks import TableWorksheet
+
+SPREADSHEET = re.compile(r'^/v4/spreadsheets/([^/:]+)(:batchUpdate)?$')
+VALUES = re.compile(r'^/v4/spreadsheets/([^/:]+)/values/([^:]+)(?::(append))?$')
+ROWS = re.compile(r'^(\d+):(\d+)$')
+
+class SheetsAPIError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+def parse_range(range_name):
+    """Split "'Title'!A1" into ('Title', 'A1'); the cells are None for a whole worksheet."""
+    title, _, cells = range_name.rpartition('!') if '!' in range_name else (range_name, '', '')
+    if title.startswith("'") and title.endswith("'"):
+        title = title[1:-1].replace("''", "'")
+    return title, cells or None
+
+class SheetsAPIStandIn:
+    """Spreadsheets held in memory and served over HTTP/1.1 with keep-alive, like the Sheets API."""
+
+    def __init__(self, latency=0.0, failures=None, lost_replies=None):
+        self.latency = latency
+        self.failures = dict(failures or {})
+        self.lost_replies = dict(lost_replies or {})
+        self.spreadsheets = {}
+        self.requests = 0
+        self.connections = 0
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self._next_sheet_id = 1
+        self._lock = threading.Lock()
+        self._server = None
+
+    def add_spreadsheet(self, key, worksheets=None):
+        """Create a spreadsheet holding worksheets, a dict of title to rows."""
+        self.spreadsheets[key] = {}
+        for title, rows in (worksheets or {}).items():
+            self._add_worksheet(key, title, rows)
+
+    def rows(self, key, title):
+        return self.spreadsheets[key][title].rows
+
+    def start(self):
+        """Serve on a free localhost port in a background thread; returns the base URL."""
+        stand_in = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            disable_nagle_algorithm = True
+
+            def setup(self):
+                super().setup()
+                with stand_in._lock:
+                    stand_in.connections += 1
+
+            def log_message(self, format, *args):
+                pass
+
+            def _respond(self):
+                length = int(self.headers.get('Content-Length') or 0)
+                body = json.loads(self.rfile.read(length)) if length else None
+                status, payload = stand_in.handle(self.command, urlsplit(self.path).path, body)
+                data = json.dumps(payload).encode('utf-8')
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            do_GET = do_POST = do_PUT = _respond
+
+        self._server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, daemon=True).start()
+        return f"http://127.0.0.1:{self._server.server_port}"
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
+
+    def handle(self, method, path, body):
+        """Answer one request; returns (HTTP status, JSON payload)."""
+        with self._lock:
+            self.requests += 1
+            number = self.requests
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+        try:
+            if self.latency:
+                time.sleep(self.latency)
+            status = self.failures.pop(number, None)
+            if status is not None:
+                raise SheetsAPIError(status, "Injected failure")
+            with self._lock:
+                payload = self._route(method, path, body)
+            status = self.lost_replies.pop(number, None)
+            if status is not None:
+                raise SheetsAPIError(status, "Injected failure after applying the request")
+            return 200, payload
+        except SheetsAPIError as e:
+            return e.status, {'error': {'code': e.status, 'message': str(e)}}
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def _route(self, method, path, body):
+        match = SPREADSHEET.match(path)
+        if match:
+            worksheets = self._spreadsheet(match.group(1))
+            if method == 'GET':
+                return {'sheets': [{'properties': self._properties(sheet)} for sheet in worksheets.values()]}
+            replies = []
+            for request in body['requests']:
+                properties = request['addSheet']['properties']
+                sheet = self._add_worksheet(match.group(1), properties['title'], [])
+                replies.append({'addSheet': {'properties': self._properties(sheet)}})
+            return {'replies': replies}
+
+        match = VALUES.match(path)
+        if not match:
+            raise SheetsAPIError(404, f"Unknown path: {path}")
+        key, range_name, action = match.groups()
+        range_name = unquote(range_name)
+        title, cells = parse_range(range_name)
+        sheet = self._spreadsheet(key).get(title)
+        if sheet is None:
+            raise SheetsAPIError(400, f"Unable to parse range: {range_name}")
+        if action == 'append':
+            return sheet.append_rows(body['values'], insert_data_option='INSERT_ROWS', table_range=cells)
+        if method == 'PUT':
+            return sheet.batch_update([{'range': cells or 'A1', 'values': body['values']}])
+        values = sheet.get_all_values()
+        rows = ROWS.match(cells or '')
+        if rows:
+            values = values[int(rows.group(1)) - 1:int(rows.group(2))]
+        return {'range': range_name, 'values': values}
+
+    def _spreadsheet(self, key):
+        if key not in self.spreadsheets:
+            raise SheetsAPIError(404, "Requested entity was not found.")
+        return self.spreadsheets[key]
+
+    def _add_worksheet(self, key, title, rows):
+        worksheets = self._spreadsheet(key)
+        if title in worksheets:
+            raise SheetsAPIError(400, f'A sheet with the name "{title}" already exists.')
+        worksheets[title] = TableWorksheet(title, rows, key, self._next_sheet_id)
+        self._next_sheet_id += 1
+        return worksheets[title]
+
+    def _properties(self, sheet):
+        index = list(self.spreadsheets[sheet.spreadsheet.id]).index(sheet.title)
+        return {'sheetId': sheet.id, 'title': sheet.title, 'index': index, 'sheetType': 'GRID',
+                'gridProperties': {'rowCount': 1000, 'columnCount': 26}}
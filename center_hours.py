@@ -0,0 +1,174 @@
+import json
+import os
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from settings import CACHE_DIR
+
+CENTER_HOURS_URL = "https://olgamlife.github.io/chatbot/hoursolgam.json"
+
+# Seconds a fetched schedule is used before it is revalidated with the server
+CENTER_HOURS_TTL = 15 * 60
+
+# After a failed fetch, serve the last known good copy for this long before trying again
+CENTER_HOURS_RETRY_AFTER = 60
+
+WEEKDAYS = ['Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday']
+
+# Follow-up appointments are never booked sooner than this many days after a donation
+MIN_DAYS_AFTER_DONATION = 2
+
+def compile_weekmasks(center_hours):
+    """Compile the center-hours JSON into a Monday-first open-day mask per center.
+
+    Centers without any open day are left out, so they get the same fallback as unknown centers.
+    """
+    weekmasks = {}
+    for center, hours in center_hours.items():
+        open_days = {day for day, day_hours in hours.items() if "CLOSED" not in day_hours.upper()}
+        mask = np.array([day in open_days for day in WEEKDAYS])
+        if mask.any():
+            weekmasks[center] = mask
+    return weekmasks
+
+def _days_until_open(weekmask):
+    """For each weekday, the number of days to wait until the center is next open."""
+    return np.array([
+        next(wait for wait in range(7) if weekmask[(weekday + wait) % 7])
+        for weekday in range(7)
+    ])
+
+def next_open_dates(donation_dates, centers, weekmasks):
+    """Get the next open date at least MIN_DAYS_AFTER_DONATION days after each donation.
+
+    donation_dates is a datetime Series and centers the matching center keys. Each center's
+    weekmask becomes a 7-entry wait table, so the whole column is resolved with one lookup;
+    centers without a weekmask fall back to exactly MIN_DAYS_AFTER_DONATION days.
+    """
+    names = list(weekmasks)
+    # One row per known center plus a final all-zero row for the fallback
+    wait_table = np.zeros((len(names) + 1, 7), dtype=np.int64)
+    for i, name in enumerate(names):
+        wait_table[i] = _days_until_open(weekmasks[name])
+
+    codes = pd.Categorical(centers, categories=names).codes
+    codes = np.where(codes < 0, len(names), codes)
+
+    earliest = donation_dates + pd.Timedelta(days=MIN_DAYS_AFTER_DONATION)
+    weekdays = earliest.dt.weekday.fillna(0).to_numpy(dtype=np.int64)
+    wait = wait_table[codes, weekdays]
+    return earliest + pd.to_timedelta(wait, unit='D').to_numpy()
+
+class CenterHoursProvider:
+    """Serve the center-hours feed from memory and disk, revalidating it with the server after a TTL.
+
+    The parsed schedule is kept in memory and persisted to disk with its ETag and
+    Last-Modified headers, so it survives restarts. Once the TTL has passed the feed is
+    revalidated with a conditional request; if that fails the last known good copy is
+    served instead of dropping the real schedule.
+    """
+
+    def __init__(self, url=CENTER_HOURS_URL, ttl=CENTER_HOURS_TTL, cache_path=None, timeout=10,
+                 retry_after=CENTER_HOURS_RETRY_AFTER):
+        self.url = url
+        self.ttl = ttl
+        self.timeout = timeout
+        self.retry_after = retry_after
+        self.cache_path = cache_path or os.path.join(CACHE_DIR, 'center_hours.json')
+        self.last_error = None
+        self._entry = None
+        self._loaded = False
+        self._retry_at = 0
+        self._lock = threading.Lock()
+
+    def get(self):
+        """Return (center_hours, status).
+
+        status is 'cached' (within the TTL), 'revalidated' (server said 304), 'fetched'
+        (new copy downloaded), 'stale' (fetch failed, last known good copy served) or
+        'unavailable' (fetch failed and no copy exists; center_hours is empty).
+        """
+        with self._lock:
+            if not self._loaded:
+                self._entry = self._load()
+                self._loaded = True
+
+            if self._entry is not None and time.time() - self._entry['fetched_at'] < self.ttl:
+                return self._entry['data'], 'cached'
+
+            # Don't wait on a feed that just failed
+            if self._entry is not None and time.time() < self._retry_at:
+                return self._entry['data'], 'stale'
+
+            # requests is slow to import, so it is only loaded once the feed is fetched
+            import requests
+            try:
+                status = self._refresh()
+            except (requests.exceptions.RequestException, ValueError) as e:
+                self.last_error = e
+                self._retry_at = time.time() + self.retry_after
+                if self._entry is None:
+                    return {}, 'unavailable'
+                return self._entry['data'], 'stale'
+
+            self.last_error = None
+            return self._entry['data'], status
+
+    def age(self):
+        """Seconds since the schedule was last fetched or revalidated, or None if there is none."""
+        if self._entry is None:
+            return None
+        return time.time() - self._entry['fetched_at']
+
+    def _refresh(self):
+        """Revalidate or download the feed, updating the memory and disk copies."""
+        import requests
+        headers = {}
+        if self._entry is not None:
+            if self._entry.get('etag'):
+                headers['If-None-Match'] = self._entry['etag']
+            if self._entry.get('last_modified'):
+                headers['If-Modified-Since'] = self._entry['last_modified']
+
+        response = requests.get(self.url, headers=headers, timeout=self.timeout)
+        if response.status_code == 304 and self._entry is not None:
+            self._entry['fetched_at'] = time.time()
+            self._save(self._entry)
+            return 'revalidated'
+
+        response.raise_for_status()
+        self._entry = {
+            'url': self.url,
+            'etag': response.headers.get('ETag'),
+            'last_modified': response.headers.get('Last-Modified'),
+            'fetched_at': time.time(),
+            'data': response.json(),
+        }
+        self._save(self._entry)
+        return 'fetched'
+
+    def _load(self):
+        """Read the persisted copy for this URL, if any."""
+        try:
+            with open(self.cache_path, encoding='utf-8') as f:
+                entry = json.load(f)
+        except (OSError, ValueError):
+            return None
+        return entry if entry.get('url') == self.url else None
+
+    def _save(self, entry):
+        """Persist the entry atomically so a crash never leaves a half-written cache."""
+        try:
+            os.makedirs(os.path.dirname(self.cache_path), exist_ok=True)
+            temp_path = f"{self.cache_path}.tmp"
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump(entry, f)
+            os.replace(temp_path, self.cache_path)
+        except OSError:
+            # The in-memory copy still works; persisting is best effort
+            pass
+
+CENTER_HOURS = CenterHoursProvider()
@@ -1,37 +1,143 @@
+import itertools
 import streamlit as st
 import pandas as pd
-from utils import format_name, save_to_gsheets, get_google_sheets_connection
+from date_inference import infer_date_format
+from transforms import transform_certo_market_visits
+from jobs import JobCancelled
+from sheets import is_stale_handle_error
+from sheet_sync import write_report
+from processes import PROCESSES
+from utils import SINK, job_running, show_job, show_stream_summary, open_worksheet, start_job, upload_callbacks
 
-SPREADSHEET_KEY = "1qWLg1vQHvJQG2hFHrUpO8y6bC8_xDdkLG2ErY_aGxkw"
-WORKSHEET_NAME = "Certo_Market_MKT_Report"
+PROCESS = PROCESSES['certo_market_visits']
+SPREADSHEET_KEY = PROCESS.spreadsheet_key
+WORKSHEET_NAME = PROCESS.worksheet_name
 
-def process_certo_market_visits(df, name_col, email_col, phone_col, reg_date_col, first_order_col, spent_col):
+HEADERS = ['Name', 'Email', 'Phone', 'Registered Date', 'First Order Date', 'Spent $']
+
+def infer_visits_date_formats(df, reg_date_col, first_order_col, job=None):
+    """Infer the registration and first order date formats, warning through job when day and month are ambiguous."""
+    date_formats = []
+    for label, col in [("Registration Date", reg_date_col), ("First Order Date", first_order_col)]:
+        date_format, ambiguous = infer_date_format(df[col])
+        if ambiguous and job is not None:
+            job.note('warning', f"⚠️ {label}: no day or month above 12 found, so dates were read as {date_format}. Please double-check them.")
+        date_formats.append(date_format)
+    return tuple(date_formats)
+
+def write_visits_report(processed_df, full_rewrite=False, job=None):
+    """Write the report, syncing only the rows that changed since the last upload when possible.
+
+    Without a trustworthy snapshot of the last upload (or with full_rewrite) the worksheet
+    is cleared and rewritten, as before. Returns the sync counts, or None after a full
+    rewrite; a failed write raises ValueError with a message for the user.
+    """
+    on_retry, on_batch = upload_callbacks(job)
+    for attempt in range(2):
+        worksheet = open_worksheet(SPREADSHEET_KEY, WORKSHEET_NAME)
+        try:
+            return write_report(
+                worksheet, processed_df, HEADERS, 'Email', full_rewrite, on_retry=on_retry, on_batch=on_batch
+            )
+        except JobCancelled:
+            raise
+        except Exception as e:
+            if is_stale_handle_error(e):
+                # The cached handle is out of date; the snapshot is dirty, so a fresh one gets a full rewrite
+                SINK.forget(SPREADSHEET_KEY, WORKSHEET_NAME)
+                if attempt == 0:
+                    continue
+            raise ValueError(f"Error saving to Google Sheets: {str(e)}. The next run will rewrite the whole report.") from e
+
+def show_sync_summary(counts):
+    """Show what an incremental sync changed."""
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Inserted", counts['inserted'])
+    with col2:
+        st.metric("Updated", counts['updated'])
+    with col3:
+        st.metric("Deleted", counts['deleted'])
+    with col4:
+        st.metric("Unchanged", counts['unchanged'])
+
+def process_certo_market_visits(df, name_col, email_col, phone_col, reg_date_col, first_order_col, spent_col, full_rewrite=False, job=None):
     """Process data for Certo Market Visits Report."""
-    # Convert dates to string format before creating DataFrame
-    processed_df = pd.DataFrame({
-        'Name': df[name_col].apply(format_name),
-        'Email': df[email_col].str.lower(),
-        'Phone': df[phone_col],
-        'Registered Date': pd.to_datetime(df[reg_date_col]).dt.strftime('%Y-%m-%d'),
-        'First Order Date': pd.to_datetime(df[first_order_col]).dt.strftime('%Y-%m-%d'),
-        'Spent $': df[spent_col]
-    })
-    
-    # Get Google Sheets connection
-    gc = get_google_sheets_connection()
-    workbook = gc.open_by_key(SPREADSHEET_KEY)
-    worksheet = workbook.worksheet(WORKSHEET_NAME)
-    
-    # Clear the worksheet and add headers
-    worksheet.clear()
-    headers = ['Name', 'Email', 'Phone', 'Registered Date', 'First Order Date', 'Spent $']
-    worksheet.append_row(headers)
+    date_formats = infer_visits_date_formats(df, reg_date_col, first_order_col, job)
+    processed_df = transform_certo_market_visits(
+        df, name_col, email_col, phone_col, reg_date_col, first_order_col, spent_col, date_formats
+    )
+    if job is not None:
+        job.advance(rows_transformed=len(processed_df))
     
     # Save to Google Sheets
-    return save_to_gsheets(processed_df, worksheet), processed_df, WORKSHEET_NAME
+    counts = write_visits_report(processed_df, full_rewrite, job)
+    return {
+        'counts': counts,
+        'total_rows': len(processed_df),
+        'unique_emails': len(processed_df['Email'].unique()),
+    }
+
+def stream_certo_market_visits(chunks, name_col, email_col, phone_col, reg_date_col, first_order_col, spent_col, full_rewrite=False, job=None):
+    """Process the Certo Market Visits Report chunk by chunk, then write it.
 
-def render_certo_market_visits_ui(df):
-    """Render UI for Certo Market Visits Report process."""
+    The upload is read and transformed one chunk at a time; only the transformed report,
+    which the sync compares as a whole, is held in memory.
+    """
+    # Infer the date formats from the first chunk so every chunk is parsed the same way
+    chunks = iter(chunks)
+    first_chunk = next(chunks, None)
+    date_formats = (None, None)
+    if first_chunk is not None:
+        date_formats = infer_visits_date_formats(first_chunk, reg_date_col, first_order_col, job)
+    
+    processed_chunks = []
+    for chunk in itertools.chain([first_chunk] if first_chunk is not None else [], chunks):
+        processed_chunks.append(transform_certo_market_visits(
+            chunk, name_col, email_col, phone_col, reg_date_col, first_order_col, spent_col, date_formats
+        ))
+        if job is not None:
+            job.advance(rows_transformed=len(chunk))
+    processed_df = pd.concat(processed_chunks, ignore_index=True) if processed_chunks else pd.DataFrame(columns=HEADERS)
+    counts = write_visits_report(processed_df, full_rewrite, job)
+    return {'counts': counts, 'total_rows': len(processed_df), 'chunk_count': len(processed_chunks)}
+
+def run_certo_market_visits(job, columns, full_rewrite, df, source=None):
+    """The job behind Process Data: read the mapped columns in full when source is given, then write the report.
+
+    columns are the name, email, phone, registration date, first order date and spent columns, in order.
+    """
+    if source is not None and source.streaming:
+        return stream_certo_market_visits(source.chunks(columns), *columns, full_rewrite, job)
+    if source is not None:
+        # Only now read every row, limited to the mapped columns
+        df = source.load(columns)
+    return process_certo_market_visits(df, *columns, full_rewrite, job)
+
+def show_certo_market_visits_result(result):
+    """Show a finished report write: what the sync changed, then the totals."""
+    if result['counts'] is not None:
+        show_sync_summary(result['counts'])
+    if 'chunk_count' in result:
+        show_stream_summary(result['total_rows'], result['chunk_count'], WORKSHEET_NAME)
+        return
+
+    st.success(f"✅ Data successfully processed and saved to {WORKSHEET_NAME}!")
+
+    # Display statistics
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Total Records", result['total_rows'])
+    with col2:
+        st.metric("Unique Emails", result['unique_emails'])
+
+def render_certo_market_visits_ui(process, df, source=None):
+    """Render UI for Certo Market Visits Report process.
+
+    When source is given, df is only a preview and the mapped columns are read in full
+    from source (in chunks when streaming) once the data is processed. Processing runs
+    as a background job that the page follows until it finishes.
+    """
     st.markdown("### Map Columns")
     st.markdown("Please select which columns contain the required information:")
     
@@ -49,20 +155,16 @@ def render_certo_market_visits_ui(df):
         first_order_col = st.selectbox("First Order Date Column", df.columns.tolist())
         spent_col = st.selectbox("Spent Amount Column", df.columns.tolist())
     
-    if st.button("Process Data"):
-        with st.spinner("Processing data and updating Google Sheets..."):
-            success, processed_df, worksheet_name = process_certo_market_visits(
-                df, name_col, email_col, phone_col, reg_date_col, first_order_col, spent_col
-            )
-            
-            if success:
-                st.success(f"✅ Data successfully processed and saved to {worksheet_name}!")
-                
-                # Display statistics
-                col1, col2 = st.columns(2)
-                with col1:
-                    st.metric("Total Records", len(processed_df))
-                with col2:
-                    st.metric("Unique Emails", len(processed_df['Email'].unique()))
-            else:
-                st.error("❌ Failed to save data to Google Sheets.") 
\ No newline at end of file
+    full_rewrite = st.checkbox(
+        "Rewrite the whole report",
+        help="By default only rows that changed since the last upload are written. "
+             "Rewrite the whole report if the sheet was edited by hand."
+    )
+    
+    mapped_columns = [name_col, email_col, phone_col, reg_date_col, first_order_col, spent_col]
+    # Started from the click callback, so reruns while the job runs don't start it again
+    st.button(
+        "Process Data", disabled=job_running(),
+        on_click=start_job, args=(process, run_certo_market_visits, mapped_columns, full_rewrite, df, source)
+    )
+    show_job(show_certo_market_visits_result)
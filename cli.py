@@ -0,0 +1,289 @@
+"""Run a process over many files from the command line, without the Streamlit app.
+
+Files are parsed and transformed in parallel on a process pool, and the results are
+written in the order the files were given, through one writer. Columns are mapped by
+name, or as 'Column N' with --no-headers. Run from the repository root, for example:
+
+    python cli.py certo_market exports/ --email "Email Address" --first-name "First Name" --phone "Phone Number"
+    python cli.py donation_scheduler donations.csv --donor-name "Donor Name" --donation-date "Donation Date" \\
+        --facility Facility --donor-status "Donor Status" --sink csv:out
+"""
+import argparse
+import itertools
+import os
+import sys
+import tomllib
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+
+import pandas as pd
+
+from center_hours import CENTER_HOURS, compile_weekmasks
+from ingest import mapped_usecols, name_headerless_columns, parse_bytes
+from key_index import KeyIndex, key_index_path
+from metrics import span, track_run
+from partitions import partition_frame, write_partitions
+from processes import PROCESSES, worksheet_headers
+from serialize import iter_row_batches
+from settings import COMPACT_FRAMES, OUTPUT_SINK
+from sheet_sync import write_report
+from sheets import SheetsPool, authorize
+from sinks import make_sink
+from upload import upload_rows
+
+EXTENSIONS = ('.csv', '.txt', '.xlsx')
+
+# The app's Streamlit secrets; without the file the key is read from the environment
+SECRETS_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), '.streamlit', 'secrets.toml')
+
+def column_option(column):
+    """The option for one of a transform's column arguments: first_name_col becomes --first-name."""
+    return '--' + column.removesuffix('_col').replace('_', '-')
+
+def find_files(paths):
+    """Expand directories into the CSV, TXT and XLSX files directly inside them, by name."""
+    files = []
+    for path in paths:
+        if os.path.isdir(path):
+            files.extend(sorted(
+                os.path.join(path, name) for name in os.listdir(path) if name.endswith(EXTENSIONS)
+            ))
+        else:
+            files.append(path)
+    return files
+
+def load_credentials(path):
+    """Return the service account's private key id and key from the secrets file or the environment."""
+    if os.path.exists(path):
+        with open(path, 'rb') as f:
+            secrets = tomllib.load(f)
+        return secrets['private_key_id'], secrets['google_credentials']
+    try:
+        return os.environ['HARVESTING_PRIVATE_KEY_ID'], os.environ['HARVESTING_GOOGLE_CREDENTIALS']
+    except KeyError:
+        raise ValueError(
+            f"No Google credentials: {path} doesn't exist and HARVESTING_PRIVATE_KEY_ID and "
+            "HARVESTING_GOOGLE_CREDENTIALS are not set"
+        )
+
+def transform_options(process):
+    """Arguments a process's transform takes besides the column mapping."""
+    if process.name != 'donation_scheduler':
+        return {}
+    # Fetched once here rather than in every worker
+    with span('center_hours'):
+        center_hours, status = CENTER_HOURS.get()
+    if status == 'stale':
+        warn(f"couldn't fetch center hours ({CENTER_HOURS.last_error}); using the last known schedule")
+    elif status == 'unavailable':
+        warn(f"couldn't fetch center hours ({CENTER_HOURS.last_error}); "
+             "scheduling every follow-up 2 days after the donation")
+    return {'weekmasks': compile_weekmasks(center_hours)}
+
+def process_file(process_name, columns, has_headers, delimiter, compact, options, path):
+    """Parse and transform one file; returns (rows read, processed frame, spans recorded)."""
+    process = PROCESSES[process_name]
+    with track_run(process.label, report=False) as run:
+        with open(path, 'rb') as f:
+            data = f.read()
+        try:
+            with span('read_file') as parse_span:
+                usecols = mapped_usecols([column for column in columns.values() if column], has_headers)
+                df = parse_bytes(
+                    data, os.path.basename(path), has_headers, delimiter, usecols=usecols, compact=compact
+                )
+                parse_span.rows = len(df)
+            if not has_headers:
+                df = name_headerless_columns(df)
+            processed = process.transform(df, **columns, **options)
+        except Exception as e:
+            raise ValueError(f"{path}: {e}") from e
+    return len(df), processed, run.spans
+
+def ordered_map(pool, work, items, window):
+    """Like pool.map, but with at most window items in flight, so results don't pile up behind the writer."""
+    pending = deque()
+    try:
+        for item in items:
+            pending.append(pool.submit(work, item))
+            if len(pending) >= window:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for future in pending:
+            future.cancel()
+
+def warn(message):
+    print(f"warning: {message}", file=sys.stderr)
+
+def report_retry(error, attempt, delay):
+    warn(f"a request was refused ({error}); retrying in {delay:.1f}s (attempt {attempt})")
+
+def collect(files, results, run):
+    """Yield each file's processed frame in file order, reporting it and keeping its spans."""
+    for path, (rows, processed, spans) in zip(files, results):
+        run.spans.extend(spans)
+        print(f"{path}: {rows} rows read, {len(processed)} processed")
+        yield processed
+
+def write_appended(process, sink, sink_spec, frames, reread=False):
+    """Append every file's rows to the process's worksheet as one resumable upload."""
+    frames = iter(frames)
+    first = next(frames)
+    headers = worksheet_headers(first) if process.creates_worksheet else None
+    with span('open_worksheet'):
+        worksheet = sink.worksheet(process.spreadsheet_key, process.worksheet_name, headers=headers)
+    dedupe = None
+    if process.dedupe:
+        dedupe = KeyIndex(key_index_path(sink_spec)).run(worksheet, reread=reread)
+
+    def blocks():
+        for df in itertools.chain([first], frames):
+            if dedupe is not None:
+                df = dedupe.filter(df)
+            yield from iter_row_batches(df)
+
+    uploaded, skipped, batch_count = upload_rows(worksheet, blocks(), on_retry=report_retry)
+    if dedupe is not None:
+        dedupe.commit()
+        print(f"{dedupe.new} new rows, {dedupe.duplicate_in_file} repeated in the files, "
+              f"{dedupe.already_present} already in the sheet")
+    if skipped:
+        print(f"Resumed an interrupted upload: {skipped} rows were already saved and skipped")
+    print(f"Appended {uploaded} rows to {process.worksheet_name} in {batch_count} batches")
+
+def write_partitioned(process, sink, sink_spec, frames, reread=False):
+    """Append every file's rows split across the process's partition worksheets, several at a time."""
+    df = pd.concat(list(frames), ignore_index=True)
+    partition = process.spec.partition
+    headers = worksheet_headers(df)
+    index = KeyIndex(key_index_path(sink_spec))
+    partitions = partition_frame(df, partition.column)
+    titles = [partition.worksheet.format(value) for value, _ in partitions]
+    with span('open_worksheets'):
+        worksheets = dict(zip(titles, sink.worksheets(process.spreadsheet_key, titles, headers=headers)))
+
+    def write(value, rows):
+        title = partition.worksheet.format(value)
+        dedupe = index.run(worksheets[title], reread=reread)
+        uploaded, skipped, _ = upload_rows(
+            worksheets[title], iter_row_batches(dedupe.filter(rows)), on_retry=report_retry
+        )
+        dedupe.commit()
+        return {'uploaded': uploaded, 'skipped': skipped, 'new': dedupe.new,
+                'duplicate_in_file': dedupe.duplicate_in_file, 'already_present': dedupe.already_present}
+
+    reports = write_partitions(partitions, write)
+    for report in reports:
+        title = partition.worksheet.format(report['value'])
+        if report['error']:
+            print(f"{title}: failed after {report['seconds']:.2f}s: {report['error']}")
+            continue
+        result = report['result']
+        resumed = f", {result['skipped']} saved by an earlier run" if result['skipped'] else ""
+        print(f"{title}: {result['uploaded']} rows appended ({result['new']} new, "
+              f"{result['duplicate_in_file']} repeated in the files, {result['already_present']} already in the sheet"
+              f"{resumed}) in {report['seconds']:.2f}s")
+    failed = [report for report in reports if report['error']]
+    if failed:
+        raise ValueError(f"{len(failed)} of {len(reports)} {partition.label} worksheets failed; "
+                         "run again to retry them")
+    print(f"Wrote {len(df)} rows to {len(reports)} {partition.label} worksheets")
+
+def write_whole_report(process, sink, frames, full_rewrite):
+    """Write all files together as the process's report, syncing only the rows that changed."""
+    df = pd.concat(list(frames), ignore_index=True)
+    with span('open_worksheet'):
+        worksheet = sink.worksheet(process.spreadsheet_key, process.worksheet_name)
+    counts = write_report(
+        worksheet, df, list(df.columns), process.report_key, full_rewrite, on_retry=report_retry
+    )
+    if counts is None:
+        print(f"Rewrote {process.worksheet_name} with {len(df)} rows")
+    else:
+        print(f"Synced {process.worksheet_name}: {counts['inserted']} inserted, {counts['updated']} updated, "
+              f"{counts['deleted']} deleted, {counts['unchanged']} unchanged")
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='process', required=True, metavar='process')
+    for process in PROCESSES.values():
+        command = commands.add_parser(process.name, help=process.label, description=f"Run {process.label}.")
+        command.add_argument('inputs', nargs='+', help="files, or directories of .csv, .txt and .xlsx files")
+        for column in process.columns:
+            optional = column in process.optional_columns
+            command.add_argument(
+                column_option(column), dest=column, required=not optional, metavar='COLUMN',
+                help=f"{'optional ' if optional else ''}{column.removesuffix('_col').replace('_', ' ')} column"
+            )
+        command.add_argument('--no-headers', action='store_true',
+                             help="files have no header row; map columns as 'Column 1', 'Column 2', ...")
+        command.add_argument('--delimiter', help="CSV/TXT delimiter (default: ',' for CSV, sniffed for TXT)")
+        command.add_argument('--compact', action=argparse.BooleanOptionalAction, default=COMPACT_FRAMES,
+                             help="parse files into compact dtypes to cut memory "
+                                  "(default: on when HARVESTING_COMPACT_FRAMES=1)")
+        command.add_argument('--workers', type=int, default=os.cpu_count() or 1,
+                             help="parallel parse/transform processes (default: one per CPU)")
+        command.add_argument('--sink', default=OUTPUT_SINK,
+                             help="'sheets', 'fake' or '<csv|parquet|sqlite>[:<directory>]' "
+                                  "(default: HARVESTING_OUTPUT_SINK or 'sheets')")
+        command.add_argument('--secrets', default=SECRETS_PATH, help="Streamlit secrets file with the Google credentials")
+        command.add_argument('--dry-run', action='store_true', help="parse and transform only; write nothing")
+        if process.spec is not None and process.spec.partition is not None:
+            partition = process.spec.partition
+            command.add_argument('--partition', action='store_true',
+                                 help=f"write each {partition.label} to its own worksheet "
+                                      f"({partition.worksheet.format('N')}), several at a time")
+        if process.dedupe:
+            command.add_argument('--reread-sheet', action='store_true',
+                                 help="read the worksheet again for emails already in it, "
+                                      "e.g. after rows were removed by hand")
+        if process.report_key:
+            command.add_argument('--full-rewrite', action='store_true',
+                                 help="rewrite the whole report instead of syncing the rows that changed")
+    return parser
+
+def run_writer(process, args, frames):
+    """Send the processed frames to the writer for the process, or only count them on a dry run."""
+    if args.dry_run:
+        print(f"Dry run: {sum(len(df) for df in frames)} rows processed, nothing written")
+        return
+    sink = make_sink(args.sink, SheetsPool(lambda: authorize(*load_credentials(args.secrets))))
+    reread = getattr(args, 'reread_sheet', False)
+    if process.report_key:
+        write_whole_report(process, sink, frames, args.full_rewrite)
+    elif getattr(args, 'partition', False):
+        write_partitioned(process, sink, args.sink, frames, reread)
+    else:
+        write_appended(process, sink, args.sink, frames, reread)
+
+def main(argv=None):
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    process = PROCESSES[args.process]
+    files = find_files(args.inputs)
+    if not files:
+        parser.error("no .csv, .txt or .xlsx files found")
+
+    columns = {column: getattr(args, column) for column in process.columns}
+    workers = max(1, min(args.workers, len(files)))
+    try:
+        with track_run(process.label) as run:
+            work = partial(process_file, process.name, columns, not args.no_headers, args.delimiter,
+                           args.compact, transform_options(process))
+            if workers == 1:
+                results = map(work, files)
+                run_writer(process, args, collect(files, results, run))
+            else:
+                with ProcessPoolExecutor(workers) as pool:
+                    results = ordered_map(pool, work, files, 2 * workers)
+                    run_writer(process, args, collect(files, results, run))
+    except Exception as e:
+        print(f"error: {e}", file=sys.stderr)
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,193 @@
+import pandas as pd
+import streamlit as st
+from key_index import KEY_INDEX
+from partitions import partition_frame, write_partitions
+from utils import (
+    find_column_by_pattern, save_to_gsheets, save_chunks_to_gsheets, show_dedupe_summary, show_job,
+    show_stream_summary, job_running, open_worksheet, open_worksheets, start_job
+)
+
+FILE_TYPE_NAMES = {'csv': "CSV", 'xlsx': "Excel (XLSX)", 'txt': "TXT"}
+
+def open_export_worksheet(process):
+    """Open a customer export's worksheet, creating it with the spec's headers when the process does."""
+    headers = [header for header, _, _ in process.spec.outputs] if process.creates_worksheet else None
+    return open_worksheet(process.spreadsheet_key, process.worksheet_name, headers=headers)
+
+def process_customer_export(process, df, columns, job=None, reread=False):
+    """Process a whole customer export and append it, skipping emails already uploaded or repeated in the file.
+
+    With reread, the worksheet is read again for the emails it holds instead of trusting the index.
+    """
+    processed_df = process.transform(df, **columns)
+    worksheet = open_export_worksheet(process)
+    dedupe = KEY_INDEX.run(worksheet, reread=reread)
+    summary = save_to_gsheets(processed_df, worksheet, dedupe, job)
+    # Only what the page shows is kept, not the processed frame
+    summary.update(unique_emails=len(processed_df['Email'].unique()), preview=processed_df.head(10))
+    return summary
+
+def stream_customer_export(process, chunks, columns, job=None, reread=False):
+    """Process a customer export chunk by chunk, appending each chunk before reading the next."""
+    worksheet = open_export_worksheet(process)
+    processed_chunks = (process.transform(chunk, **columns) for chunk in chunks)
+    dedupe = KEY_INDEX.run(worksheet, reread=reread)
+    return save_chunks_to_gsheets(processed_chunks, worksheet, dedupe, job)
+
+def process_partitioned_export(process, df, columns, job=None, reread=False):
+    """Process a whole customer export and append each partition (e.g. each store) to its own worksheet.
+
+    The processed rows are grouped by the spec's partition column in one pass, the
+    worksheets are opened together (missing ones created) and the partitions are written
+    concurrently, each deduplicated on its own. Returns the per-partition reports with the totals.
+    """
+    processed_df = process.transform(df, **columns)
+    partition = process.spec.partition
+    headers = [header for header, _, _ in process.spec.outputs]
+
+    partitions = partition_frame(processed_df, partition.column)
+    titles = [partition.worksheet.format(value) for value, _ in partitions]
+    worksheets = dict(zip(titles, open_worksheets(process.spreadsheet_key, titles, headers=headers)))
+
+    def write(value, rows):
+        title = partition.worksheet.format(value)
+        dedupe = KEY_INDEX.run(worksheets[title], reread=reread)
+        return save_to_gsheets(rows, worksheets[title], dedupe, job)
+
+    reports = write_partitions(partitions, write)
+    for report in reports:
+        report['worksheet_name'] = partition.worksheet.format(report['value'])
+    return {
+        'partitions': reports,
+        'total_rows': len(processed_df),
+        'unique_emails': len(processed_df['Email'].unique()),
+        'preview': processed_df.head(10),
+    }
+
+def run_customer_export(job, process, columns, df, source=None, partitioned=False, reread=False):
+    """The job behind Process Data: read the mapped columns in full when source is given, then process them.
+
+    Partitioned runs group the whole file, so they read it at once even when streaming.
+    """
+    mapped_columns = list(columns.values())
+    if partitioned:
+        if source is not None:
+            df = source.load(mapped_columns)
+        return process_partitioned_export(process, df, columns, job, reread)
+    if source is not None and source.streaming:
+        summary = stream_customer_export(process, source.chunks(mapped_columns), columns, job, reread)
+    else:
+        if source is not None:
+            # Only now read every row, limited to the mapped columns
+            df = source.load(mapped_columns)
+        summary = process_customer_export(process, df, columns, job, reread)
+    summary['worksheet_name'] = process.worksheet_name
+    return summary
+
+def show_partitioned_result(result):
+    """Show a finished partitioned export: each worksheet's counts and write time, then the totals."""
+    reports = result['partitions']
+    failed = [report for report in reports if report['error']]
+    for report in failed:
+        st.error(f"❌ {report['worksheet_name']}: {report['error']}")
+    written = [report['result'] for report in reports if report['result']]
+    show_dedupe_summary({
+        name: sum(summary['dedupe'][name] for summary in written)
+        for name in ['new', 'duplicate_in_file', 'already_present']
+    })
+    if not failed:
+        st.success(f"✅ Data successfully processed and saved to {len(reports)} worksheets!")
+
+    st.dataframe(pd.DataFrame([{
+        'Worksheet': report['worksheet_name'],
+        'Rows': report['rows'],
+        'New': report['result']['dedupe']['new'] if report['result'] else None,
+        'Duplicates in File': report['result']['dedupe']['duplicate_in_file'] if report['result'] else None,
+        'Already in Sheet': report['result']['dedupe']['already_present'] if report['result'] else None,
+        'Seconds': round(report['seconds'], 2),
+    } for report in reports]), hide_index=True)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Total Records", result['total_rows'])
+    with col2:
+        st.metric("Unique Emails", result['unique_emails'])
+
+def show_customer_export_result(result):
+    """Show a finished customer export: the dedupe counts, then the totals and a preview."""
+    if 'partitions' in result:
+        show_partitioned_result(result)
+        st.markdown("### Preview of Processed Data")
+        st.dataframe(result['preview'])
+        return
+    show_dedupe_summary(result['dedupe'])
+    if 'preview' not in result:
+        show_stream_summary(result['total_rows'], result['chunk_count'], result['worksheet_name'])
+        return
+
+    st.success(f"✅ Data successfully processed and saved to {result['worksheet_name']}!")
+
+    # Display statistics
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Total Records", result['total_rows'])
+    with col2:
+        st.metric("Unique Emails", result['unique_emails'])
+
+    # Show preview of processed data
+    st.markdown("### Preview of Processed Data")
+    st.dataframe(result['preview'])
+
+def render_customer_export_ui(process, df, source=None):
+    """Render the column mapping and processing UI for a process described by a spec.
+
+    When source is given, df is only a preview and the mapped columns are read in full
+    from source (in chunks when streaming) once the data is processed. Processing runs
+    as a background job that the page follows until it finishes.
+    """
+    st.markdown("### Map Columns")
+    st.markdown("Please select which columns contain the required information:")
+
+    # Get column names from dataframe
+    columns = df.columns.tolist()
+
+    # One selector per role, defaulting to the column whose name matches the role best
+    roles = process.spec.roles
+    split = (len(roles) + 1) // 2
+    mapping = {}
+    col1, col2 = st.columns(2)
+    for role_columns, layout_column in [(roles[:split], col1), (roles[split:], col2)]:
+        with layout_column:
+            for role in role_columns:
+                mapping[role.column] = st.selectbox(
+                    role.label,
+                    columns,
+                    index=find_column_by_pattern(columns, role.patterns)
+                )
+
+    if len(process.file_types) == 1:
+        with col2:
+            st.markdown("#### File Type")
+            st.success(f"✓ {FILE_TYPE_NAMES[process.file_types[0]]} Format Detected")
+
+    partitioned = False
+    partition = process.spec.partition
+    if partition is not None:
+        partitioned = st.checkbox(
+            f"Write each {partition.label} to its own worksheet",
+            help=f"Rows go to one worksheet per {partition.label}, e.g. {partition.worksheet.format(1)}, "
+                 f"created when missing and written several at a time. The whole file is read at once."
+        )
+
+    reread = st.checkbox(
+        "Read the worksheet again for emails already in it",
+        help="Emails already uploaded are skipped without reading the sheet. "
+             "Read it again if rows were removed from the sheet by hand, so they can be uploaded again."
+    )
+
+    # Started from the click callback, so reruns while the job runs don't start it again
+    st.button(
+        "Process Data", disabled=job_running(),
+        on_click=start_job, args=(process, run_customer_export, process, mapping, df, source, partitioned, reread)
+    )
+    show_job(show_customer_export_result)
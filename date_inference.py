@@ -0,0 +1,107 @@
+import numpy as np
+import pandas as pd
+
+# Candidate date formats, in order of preference when the data can't tell them apart
+DATE_PATTERNS = [
+    # YYYY-MM-DD (without time)
+    (r'\d{4}-\d{2}-\d{2}', '%Y-%m-%d'),
+    # YYYY-MM-DD HH:MM:SS
+    (r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}', '%Y-%m-%d %H:%M:%S'),
+    # MM/DD/YYYY
+    (r'\d{1,2}/\d{1,2}/\d{4}', '%m/%d/%Y'),
+    # DD/MM/YYYY
+    (r'\d{1,2}/\d{1,2}/\d{4}', '%d/%m/%Y'),
+    # MM-DD-YYYY
+    (r'\d{1,2}-\d{1,2}-\d{4}', '%m-%d-%Y'),
+    # YYYY/MM/DD
+    (r'\d{4}/\d{1,2}/\d{1,2}', '%Y/%m/%d'),
+]
+
+# Number of values scored against each candidate format
+DATE_SAMPLE_SIZE = 1000
+
+def _date_strings(values):
+    """Return the non-empty values of a Series as stripped strings."""
+    strings = values.astype(str).str.strip()
+    return strings[strings != '']
+
+def _score(strings, pattern, date_format):
+    """Count the strings that match pattern and parse with date_format."""
+    matched = strings[strings.str.fullmatch(pattern)]
+    if matched.empty:
+        return 0
+    return int(pd.to_datetime(matched, format=date_format, errors='coerce').notna().sum())
+
+def _break_day_month_tie(strings, date_formats):
+    """Pick between day-first and month-first formats using values above 12 anywhere in the column.
+
+    Returns the remaining formats and whether they are still ambiguous.
+    """
+    parts = strings.str.extract(r'^\s*(\d{1,2})[/-](\d{1,2})[/-]').dropna().astype(int)
+    day_first = bool((parts[0] > 12).any())
+    month_first = bool((parts[1] > 12).any())
+    if day_first != month_first:
+        lead = '%d' if day_first else '%m'
+        preferred = [date_format for date_format in date_formats if date_format.startswith(lead)]
+        if preferred:
+            return preferred, False
+    return date_formats, True
+
+def infer_date_format(values, sample_size=DATE_SAMPLE_SIZE, random_state=0):
+    """Infer the date format of a Series of date strings.
+
+    Every format in DATE_PATTERNS is scored against a random sample and the one that
+    parses the most values wins. When day-first and month-first formats tie on the sample,
+    the whole column is checked for a day or month above 12. Returns (date_format, ambiguous);
+    date_format is None when no candidate fits, and ambiguous is True when the data
+    can't tell the tied formats apart and the first one in DATE_PATTERNS was picked.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return None, False
+
+    present = values.dropna()
+    # Only the sample is cleaned up; the full column is touched again only to break a tie
+    sample = _date_strings(present.sample(min(sample_size, len(present)), random_state=random_state))
+    if sample.empty:
+        return None, False
+
+    scores = [(_score(sample, pattern, date_format), date_format) for pattern, date_format in DATE_PATTERNS]
+    best = max(score for score, _ in scores)
+    if best == 0:
+        return None, False
+
+    tied = [date_format for score, date_format in scores if score == best]
+    if len(tied) == 1:
+        return tied[0], False
+    tied, ambiguous = _break_day_month_tie(present.astype(str), tied)
+    return tied[0], ambiguous and len(tied) > 1
+
+def parse_dates(values, date_format=None, sample_size=DATE_SAMPLE_SIZE):
+    """Parse a Series of dates with one explicit format, inferred when date_format is None.
+
+    Returns (dates, date_format, ambiguous). Columns that already hold datetimes are
+    passed through, and values that don't fit the format become NaT. Only when no
+    candidate format fits is pandas left to guess the format itself.
+    """
+    if pd.api.types.is_datetime64_any_dtype(values):
+        return values, None, False
+
+    ambiguous = False
+    if date_format is None:
+        date_format, ambiguous = infer_date_format(values, sample_size)
+    if date_format is None:
+        return pd.to_datetime(values, errors='coerce'), None, False
+
+    if isinstance(values.dtype, pd.CategoricalDtype):
+        # Parse each distinct value once and spread the dates over the rows by category code
+        categories = parse_dates(pd.Series(values.cat.categories.to_numpy(dtype=object)), date_format)[0]
+        dates = np.append(categories.to_numpy(dtype='datetime64[ns]'), np.datetime64('NaT', 'ns'))
+        dates = pd.Series(dates[values.cat.codes.to_numpy()], index=values.index, name=values.name)
+        return dates, date_format, ambiguous
+
+    dates = pd.to_datetime(values, format=date_format, errors='coerce')
+    # Retry values that failed only because of surrounding whitespace
+    failed = dates.isna() & values.notna()
+    if failed.any():
+        dates[failed] = pd.to_datetime(values[failed].astype(str).str.strip(), format=date_format, errors='coerce')
+    return dates, date_format, ambiguous
@@ -1,297 +1,215 @@
 import streamlit as st
 import pandas as pd
-import requests
-from datetime import timedelta
-import re
-from utils import save_to_gsheets, get_google_sheets_connection
+from date_inference import infer_date_format, parse_dates
+from center_hours import CENTER_HOURS, compile_weekmasks
+from transforms import filter_new_donors, get_center_name, schedule_donations
+from jobs import JobCancelled
+from metrics import span
+from sheets import is_stale_handle_error
+from serialize import iter_row_batches
+from upload import upload_rows
+from processes import PROCESSES
+from utils import (
+    SINK, find_column_by_pattern, job_running, open_worksheet, show_job, start_job, upload_callbacks
+)
 
-SPREADSHEET_KEY = "1mlOhXY4aITLXXGS7IDrQfaZcg3MwxvI0vm3hDgswsB0"
-WORKSHEET_NAME = "Donation_Schedule"
+PROCESS = PROCESSES['donation_scheduler']
+SPREADSHEET_KEY = PROCESS.spreadsheet_key
+WORKSHEET_NAME = PROCESS.worksheet_name
 
-# Facility code → full center name mapping
-FACILITY_MAPPING = {
-    'OLX': 'MELROSE',
-    'OLW': 'PARKCHESTER',
-    'OLL': 'HOWARD_BEACH',
-    'OLK': 'BROWNSVILLE',
-    'OLJ': 'JAMAICA',
-    'OLF': 'FLATBUSH',
-    'OLB': 'CLINTON_HILL',
-    'HPF': 'FT_PIERCE',
-    'OLH': 'EASTHARLEM',
-    'OLG': 'FORDHAM',
-}
-
-# Date format patterns for automatic detection
-DATE_PATTERNS = [
-    # YYYY-MM-DD (without time)
-    (r'^\d{4}-\d{2}-\d{2}$', '%Y-%m-%d'),
-    # YYYY-MM-DD HH:MM:SS
-    (r'\d{4}-\d{2}-\d{2} \d{2}:\d{2}:\d{2}', '%Y-%m-%d %H:%M:%S'),
-    # MM/DD/YYYY
-    (r'\d{1,2}/\d{1,2}/\d{4}', '%m/%d/%Y'),
-    # DD/MM/YYYY
-    (r'\d{1,2}/\d{1,2}/\d{4}', '%d/%m/%Y'),
-    # MM-DD-YYYY
-    (r'\d{1,2}-\d{1,2}-\d{4}', '%m-%d-%Y'),
-    # YYYY/MM/DD
-    (r'\d{4}/\d{1,2}/\d{1,2}', '%Y/%m/%d'),
-]
-
-def extract_first_name(full_name):
-    """Extract first name from 'Last, First' format or return the name if it's a single name."""
-    if isinstance(full_name, str):
-        if ',' in full_name:
-            return full_name.split(',')[1].strip().title()
-        else:
-            # Handle single name (no comma)
-            return full_name.strip().title()
-    return ""
-
-def get_center_name(facility_code):
-    """Get full center name from facility code."""
-    if pd.isna(facility_code):
-        return "UNKNOWN"
-    return FACILITY_MAPPING.get(facility_code.strip().upper(), "UNKNOWN")
-
-def get_next_open_date(donation_date, facility_code, center_hours):
-    """Get next open date for donation based on center hours."""
-    center = get_center_name(facility_code).replace(" ", "_").upper()
-    if center not in center_hours:
-        return donation_date + timedelta(days=2)  # fallback if unknown
-    
-    open_days = [day for day, hours in center_hours[center].items() if "CLOSED" not in hours.upper()]
-    check_date = donation_date + timedelta(days=2)
-    while check_date.strftime('%A') not in open_days:
-        check_date += timedelta(days=1)
-    
-    return check_date
-
-def detect_date_format(date_sample):
-    """Auto-detect date format from sample."""
-    if pd.isna(date_sample):
-        return None
-    
-    date_str = str(date_sample).strip()
-    
-    # Check each pattern
-    for pattern, date_format in DATE_PATTERNS:
-        if re.match(pattern, date_str):
-            # Try to parse with this format
-            try:
-                pd.to_datetime(date_str, format=date_format)
-                return date_format
-            except:
-                continue
-    
-    # Default fallback
-    return None
-
-def save_to_gsheets_with_error_handling(df, worksheet, sheet_key, sheet_name):
+def save_to_gsheets_with_error_handling(job, df, worksheet, sheet_key, sheet_name):
     """Save to Google Sheets with detailed error handling."""
+    on_retry, on_batch = upload_callbacks(job)
     try:
-        # Replace NaN values with empty strings
-        df_clean = df.fillna('')
-        
-        # We need to convert the dataframe to a list of lists before converting date objects
-        rows = df_clean.values.tolist()
-        
-        # Convert all date/datetime objects to strings in the rows
-        for i, row in enumerate(rows):
-            for j, val in enumerate(row):
-                # Check if the value is a date or datetime object
-                if hasattr(val, 'strftime'):  # Both date and datetime have strftime
-                    rows[i][j] = val.strftime('%Y-%m-%d')
-        
-        # Get the last row with data
-        last_row = len(worksheet.get_all_values())
-        
         # Check worksheet access
-        st.write(f"Preparing to write {len(df_clean)} rows to {sheet_name} worksheet...")
+        job.note('write', f"Preparing to write {len(df)} rows to {sheet_name} worksheet...")
         
-        # Append new records starting from the next row
-        worksheet.append_rows(
-            rows,
-            value_input_option='RAW',
-            insert_data_option='INSERT_ROWS',
-            table_range=f'A{last_row + 1}'
+        # Serialize in batches (blank NaNs, dates as YYYY-MM-DD) and append them below the
+        # existing data, resuming an interrupted upload
+        uploaded, skipped, batch_count = upload_rows(
+            worksheet, iter_row_batches(df), on_retry=on_retry, on_batch=on_batch
         )
+        if skipped:
+            job.note('info', f"ℹ️ Resumed an interrupted upload: {skipped} rows were already saved and skipped.")
         
-        st.success(f"✅ Successfully saved data to Google Sheet: {sheet_key}, worksheet: {sheet_name}")
+        job.note('success', f"✅ Successfully saved data to Google Sheet: {sheet_key}, worksheet: {sheet_name}")
         return True
+    except JobCancelled:
+        raise
     except Exception as e:
-        st.error(f"❌ Error saving to Google Sheets: {str(e)}")
+        if is_stale_handle_error(e):
+            # The worksheet was deleted or renamed; look it up again on the next run
+            SINK.forget_worksheet(worksheet)
+        job.note('error', f"❌ Error saving to Google Sheets: {str(e)}")
         # Include more detailed error information
         import traceback
-        st.code(traceback.format_exc())
+        job.note('code', traceback.format_exc())
         return False
 
-def process_donation_data(df, donor_name_col, donation_date_col, facility_col, donor_account_col=None, donor_phone_col=None, donor_status_col=None):
-    """Process donation data for scheduling.""" 
+def process_donation_data(job, df, donor_name_col, donation_date_col, facility_col, donor_account_col=None, donor_phone_col=None, donor_status_col=None):
+    """Process donation data for scheduling, reporting each step through job."""
     try:
         # Filter for NEW donors if status column is provided
         if donor_status_col:
             original_count = len(df)
-            df = df[df[donor_status_col].str.upper() == 'NEW']
+            df = filter_new_donors(df, donor_status_col)
             filtered_count = len(df)
-            st.info(f"📊 Filtered {filtered_count} NEW donors from {original_count} total records")
+            job.note('info', f"📊 Filtered {filtered_count} NEW donors from {original_count} total records")
             
             if filtered_count == 0:
-                st.error("❌ No NEW donors found in the data. Please check your donor status column.")
+                job.note('error', "❌ No NEW donors found in the data. Please check your donor status column.")
                 return False, None, None
 
-        # Fetch center hours from GitHub
-        try:
-            st.info("📅 Fetching center hours from OLGAM API...")
-            response = requests.get("https://olgamlife.github.io/chatbot/hoursolgam.json", timeout=10)
-            response.raise_for_status()  # Raise error for bad responses
-            center_hours = response.json()
-            st.success("✅ Successfully fetched center hours")
-        except requests.exceptions.RequestException as e:
-            st.error(f"❌ Error fetching center hours: {str(e)}")
-            st.warning("⚠️ Will use fallback scheduling (2 days after donation)")
-            # Create empty dict as fallback
-            center_hours = {}
+        # Get center hours, hitting the OLGAM feed only when the cached copy has expired
+        with span('center_hours'):
+            center_hours, hours_status = CENTER_HOURS.get()
+        if hours_status == 'cached':
+            job.note('success', "✅ Using cached center hours")
+        elif hours_status == 'revalidated':
+            job.note('success', "✅ Center hours are up to date")
+        elif hours_status == 'fetched':
+            job.note('success', "✅ Successfully fetched center hours")
+        elif hours_status == 'stale':
+            job.note(
+                'warning',
+                f"⚠️ Error fetching center hours: {str(CENTER_HOURS.last_error)}. "
+                f"Using the last known schedule from {CENTER_HOURS.age() / 3600:.1f} hours ago."
+            )
+        else:
+            job.note('error', f"❌ Error fetching center hours: {str(CENTER_HOURS.last_error)}")
+            job.note('warning', "⚠️ Will use fallback scheduling (2 days after donation)")
             
         # Show the facility codes in the data vs. known centers
         unique_facilities = df[facility_col].dropna().unique().tolist()
-        st.write(f"Facility codes in data: {', '.join(unique_facilities)}")
+        job.note('write', f"Facility codes in data: {', '.join(unique_facilities)}")
         mapped_centers = [f"{code} → {get_center_name(code)}" for code in unique_facilities]
-        st.write(f"Mapped to centers: {', '.join(mapped_centers)}")
+        job.note('write', f"Mapped to centers: {', '.join(mapped_centers)}")
         
-        # Auto-detect date format from the first non-null value
-        date_format = None
-        for date_val in df[donation_date_col]:
-            if not pd.isna(date_val):
-                date_format = detect_date_format(str(date_val).strip())
-                if date_format:
-                    break
-        
-        # Process DataFrame
+        # Infer the date format from a sample of the column, then parse it in one pass
+        with span('parse_dates', rows=len(df)):
+            donation_dates, date_format, ambiguous = parse_dates(df[donation_date_col])
+        df['Donation Date'] = donation_dates
         if date_format:
-            st.info(f"📅 Detected date format: {date_format}")
-            try:
-                df['Donation Date'] = pd.to_datetime(df[donation_date_col], format=date_format, errors='coerce')
-                
-                # Show helpful information for debugging
-                if df['Donation Date'].isna().all():
-                    st.error("❌ Failed to parse any dates with the detected format. Trying alternative formats...")
-                    # Try without a specific format as fallback
-                    df['Donation Date'] = pd.to_datetime(df[donation_date_col], errors='coerce')
-            except Exception as e:
-                st.error(f"❌ Error parsing dates: {str(e)}. Trying alternative approach...")
-                # Fallback to pandas auto-detection
-                df['Donation Date'] = pd.to_datetime(df[donation_date_col], errors='coerce')
-        else:
-            # Fallback to pandas auto-detection
-            st.warning("⚠️ Could not detect date format. Trying pandas auto-detection...")
-            df['Donation Date'] = pd.to_datetime(df[donation_date_col], errors='coerce')
+            job.note('info', f"📅 Detected date format: {date_format}")
+            if ambiguous:
+                job.note('warning', f"⚠️ No day or month above 12 found, so dates were read as {date_format}. Please double-check them.")
+        elif not pd.api.types.is_datetime64_any_dtype(df[donation_date_col]):
+            job.note('warning', "⚠️ Could not detect date format. Trying pandas auto-detection...")
         
         # Check for invalid dates and notify user
         invalid_dates = df['Donation Date'].isna().sum()
         if invalid_dates > 0:
-            st.warning(f"⚠️ {invalid_dates} dates could not be parsed. Please check your data.")
+            job.note('warning', f"⚠️ {invalid_dates} dates could not be parsed. Please check your data.")
             
             # If all dates failed, show sample data to help debugging
             if invalid_dates == len(df):
-                st.error("❌ All dates failed to parse! Sample of your data:")
-                st.write(df[donation_date_col].head(3).tolist())
+                job.note('error', "❌ All dates failed to parse! Sample of your data:")
+                job.note('write', df[donation_date_col].head(3).tolist())
                 return False, None, None
         
-        # Continue with processing
-        df['Donor Name'] = df[donor_name_col]
-        df['Facility'] = df[facility_col]
-        # Add donor account and phone if provided
-        if donor_account_col:
-            df['Donor Account'] = df[donor_account_col]
-        if donor_phone_col:
-            df['Donor Phone'] = df[donor_phone_col]
-        df['First_Name'] = df['Donor Name'].apply(extract_first_name)
-        df['Center_Name'] = df['Facility'].apply(get_center_name)
-        
         # Show more debugging information
-        st.write("Processing center data and calculating next donation dates...")
-        
-        df['Next_Donation_Date'] = df.apply(
-            lambda row: get_next_open_date(row['Donation Date'], row['Facility'], center_hours) 
-            if not pd.isna(row['Donation Date']) else pd.NaT, 
-            axis=1
-        )
+        job.note('write', "Processing center data and calculating next donation dates...")
         
-        # Convert date.date to string to avoid serialization issues
-        df['Date_to_Send'] = df['Next_Donation_Date'].dt.strftime('%Y-%m-%d')
-        
-        # Create the output dataframe with all necessary columns
-        output_columns = ['Donor Name', 'First_Name']
-        
-        # Add optional columns if they exist
-        if 'Donor Account' in df.columns:
-            output_columns.append('Donor Account')
-        if 'Donor Phone' in df.columns:
-            output_columns.append('Donor Phone')
-            
-        # Add remaining columns
-        output_columns.extend(['Facility', 'Center_Name', 'Donation Date', 
-                              'Next_Donation_Date', 'Date_to_Send'])
+        # Compile the center hours once, then schedule the whole column in one pass
+        with span('schedule', rows=len(df)):
+            processed_df = schedule_donations(
+                df, donor_name_col, facility_col, compile_weekmasks(center_hours),
+                donor_account_col, donor_phone_col
+            )
         
-        # Output for Google Sheet
-        processed_df = df[output_columns]
+        job.advance(rows_transformed=len(processed_df))
         
         # Show summary of processed data
         valid_donations = processed_df['Donation Date'].notna().sum()
         valid_next_dates = processed_df['Next_Donation_Date'].notna().sum()
         
-        st.write(f"Successfully processed {valid_donations} donations")
-        st.write(f"Scheduled {valid_next_dates} next donation dates")
+        job.note('write', f"Successfully processed {valid_donations} donations")
+        job.note('write', f"Scheduled {valid_next_dates} next donation dates")
         
         # Get Google Sheets connection
         try:
-            st.info("📊 Connecting to Google Sheets...")
-            gc = get_google_sheets_connection()
-            workbook = gc.open_by_key(SPREADSHEET_KEY)
-            st.success("✅ Successfully connected to Google Sheets")
+            job.note('info', "📊 Connecting to Google Sheets...")
             
-            # Try to get the worksheet, if it doesn't exist, create it
-            try:
-                worksheet = workbook.worksheet(WORKSHEET_NAME)
-                st.write(f"Found existing worksheet: {WORKSHEET_NAME}")
-            except:
-                st.write(f"Creating new worksheet: {WORKSHEET_NAME}")
-                worksheet = workbook.add_worksheet(WORKSHEET_NAME, rows=1000, cols=10)
-                
-                # Add headers that include the new columns
-                headers = ['Donor Name', 'First Name']
-                if 'Donor Account' in df.columns:
-                    headers.append('Donor Account')
-                if 'Donor Phone' in df.columns:
-                    headers.append('Donor Phone')
-                
-                headers.extend(['Facility', 'Center Name', 'Donation Date',
-                              'Next Donation Date', 'Date to Send'])
-                
-                worksheet.append_row(headers)
+            # Headers for the columns being written, used if the worksheet has to be created
+            headers = [column.replace('_', ' ') for column in processed_df.columns]
+            
+            # Get the worksheet through the shared client, creating it if it doesn't exist
+            worksheet = open_worksheet(SPREADSHEET_KEY, WORKSHEET_NAME, headers=headers)
+            job.note('success', f"✅ Connected to Google Sheets worksheet: {WORKSHEET_NAME}")
             
             # Save to Google Sheets using enhanced error handling
-            if save_to_gsheets_with_error_handling(processed_df, worksheet, SPREADSHEET_KEY, WORKSHEET_NAME):
+            if save_to_gsheets_with_error_handling(job, processed_df, worksheet, SPREADSHEET_KEY, WORKSHEET_NAME):
                 return True, processed_df, WORKSHEET_NAME
             else:
                 return False, processed_df, WORKSHEET_NAME
                 
+        except JobCancelled:
+            raise
         except Exception as e:
-            st.error(f"❌ Error connecting to Google Sheets: {str(e)}")
+            job.note('error', f"❌ Error connecting to Google Sheets: {str(e)}")
             import traceback
-            st.code(traceback.format_exc())
+            job.note('code', traceback.format_exc())
             return False, processed_df, WORKSHEET_NAME
         
+    except JobCancelled:
+        raise
     except Exception as e:
-        st.error(f"Error processing donation data: {str(e)}")
+        job.note('error', f"Error processing donation data: {str(e)}")
         # Show more detailed error for debugging
         import traceback
-        st.code(traceback.format_exc())
+        job.note('code', traceback.format_exc())
         return False, None, None
 
-def render_donation_scheduler_ui(df):
-    """Render UI for donation scheduler process."""
+def run_donation_scheduler(job, columns, df, source=None):
+    """The job behind Process Donation Data: read the mapped columns in full when source is given, then schedule them.
+
+    columns are the donor name, donation date, facility, donor account, donor phone and
+    donor status columns, in order.
+    """
+    if source is not None:
+        # Only now read every row, limited to the mapped columns
+        df = source.load(columns)
+    success, processed_df, worksheet_name = process_donation_data(job, df, *columns)
+    if not success or processed_df is None:
+        return {'success': False}
+    # Only what the page shows is kept, not the processed frame
+    return {
+        'success': True,
+        'worksheet_name': worksheet_name,
+        'total': len(processed_df),
+        'unique_donors': len(processed_df['Donor Name'].unique()),
+        'centers': len(processed_df['Center_Name'].unique()),
+        'preview': processed_df.head(10),
+    }
+
+def show_donation_scheduler_result(result):
+    """Show a finished donation schedule: the totals and a preview."""
+    if not result['success']:
+        st.error("❌ Failed to process donation data.")
+        return
+
+    st.success(f"✅ Donation data successfully processed and saved to {result['worksheet_name']}!")
+
+    # Display statistics
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("Total NEW Donations", result['total'])
+    with col2:
+        st.metric("Unique NEW Donors", result['unique_donors'])
+    with col3:
+        st.metric("Centers", result['centers'])
+
+    # Show preview of processed data
+    st.markdown("### Preview of Processed Data")
+    st.dataframe(result['preview'])
+
+def render_donation_scheduler_ui(process, df, source=None):
+    """Render UI for donation scheduler process.
+
+    When source is given, df is only a preview and the mapped columns are read in full
+    from source once the data is processed. Processing runs as a background job that
+    the page follows until it finishes.
+    """
     st.markdown("### Map Columns")
     
     # Add helpful instructions
@@ -381,58 +299,26 @@ def render_donation_scheduler_ui(df):
             st.text(f"Example dates from your file:\n{date_samples}")
             
             # Try to detect and show the format
-            for date_val in df[donation_date_col]:
-                if not pd.isna(date_val):
-                    detected_format = detect_date_format(str(date_val).strip())
-                    if detected_format:
-                        st.success(f"✅ Date format will be auto-detected")
-                        break
-    
-    if st.button("Process Donation Data"):
-        with st.spinner("Processing donation data and updating Google Sheets..."):
-            success, processed_df, worksheet_name = process_donation_data(
-                df, donor_name_col, donation_date_col, facility_col, 
-                donor_account_col, donor_phone_col, donor_status_col
-            )
-            
-            if success and processed_df is not None:
-                st.success(f"✅ Donation data successfully processed and saved to {worksheet_name}!")
-                
-                # Display statistics
-                col1, col2, col3 = st.columns(3)
-                with col1:
-                    st.metric("Total NEW Donations", len(processed_df))
-                with col2:
-                    st.metric("Unique NEW Donors", len(processed_df['Donor Name'].unique()))
-                with col3:
-                    st.metric("Centers", len(processed_df['Center_Name'].unique()))
-                
-                # Show preview of processed data
-                st.markdown("### Preview of Processed Data")
-                st.dataframe(processed_df.head(10))
-            else:
-                st.error("❌ Failed to process donation data.")
-
-def find_column_by_pattern(columns, patterns):
-    """Find the index of a column that best matches the given patterns."""
-    # Try exact match first
-    for pattern in patterns:
-        for i, col in enumerate(columns):
-            if str(col).lower() == pattern:
-                return i
-    
-    # Then try contains match
-    for pattern in patterns:
-        for i, col in enumerate(columns):
-            if pattern in str(col).lower():
-                return i
+            detected_format, ambiguous = infer_date_format(df[donation_date_col])
+            if detected_format:
+                st.success(f"✅ Date format will be auto-detected ({detected_format})")
+                if ambiguous:
+                    st.warning("⚠️ The preview rows can't tell day and month apart; the full file will be checked.")
     
-    # Return first column as default
-    return 0
+    mapped_columns = [
+        donor_name_col, donation_date_col, facility_col,
+        donor_account_col, donor_phone_col, donor_status_col
+    ]
+    # Started from the click callback, so reruns while the job runs don't start it again
+    st.button(
+        "Process Donation Data", disabled=job_running(),
+        on_click=start_job, args=(process, run_donation_scheduler, mapped_columns, df, source)
+    )
+    show_job(show_donation_scheduler_result)
 
 # Example usage
 if __name__ == "__main__":
-    render_donation_scheduler_ui(pd.DataFrame({
+    render_donation_scheduler_ui(PROCESS, pd.DataFrame({
         'Donor Name': ['John Doe', 'Jane Smith'],
         'Donor Account': ['123456789', '987654321'],
         'Donor Phone': ['555-1234', '555-5678'],
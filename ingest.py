@@ -0,0 +1,226 @@
+import csv
+import hashlib
+import io
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+# Number of parsed uploads kept in memory across Streamlit reruns
+PARSE_CACHE_SIZE = 8
+
+# Rows per chunk when streaming large CSV/TXT uploads
+CHUNK_SIZE = 50000
+
+# Bytes of a .txt upload inspected to detect its dialect
+SNIFF_BYTES = 64 * 1024
+DELIMITER_NAMES = {',': 'Comma', '\t': 'Tab', ';': 'Semicolon', '|': 'Pipe'}
+
+# In compact mode, columns with at most this share of distinct values are stored as categoricals
+CATEGORY_MAX_SHARE = 0.5
+
+# Leading rows checked first, so clearly high-cardinality columns (emails, phones) are never hashed in full
+CARDINALITY_SAMPLE_ROWS = 10000
+
+class ParseCache:
+    """Bounded LRU cache of parsed uploads with hit/miss counters."""
+
+    def __init__(self, max_entries=PARSE_CACHE_SIZE):
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value for key (marking it recently used) or None."""
+        with self._lock:
+            if key not in self._entries:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return self._entries[key]
+
+    def put(self, key, value):
+        """Store value under key, evicting the least recently used entries."""
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop every entry and reset the counters."""
+        with self._lock:
+            self._entries.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def stats(self):
+        """Return the current hit/miss counters and occupancy."""
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'size': len(self._entries),
+                'max_entries': self.max_entries,
+            }
+
+PARSE_CACHE = ParseCache()
+
+def file_bytes(file):
+    """Return the raw bytes of an uploaded file without moving its read position."""
+    if hasattr(file, 'getvalue'):
+        return file.getvalue()
+    position = file.tell()
+    data = file.read()
+    file.seek(position)
+    return data
+
+def content_hash(data):
+    """Hash file contents for use as a cache key."""
+    return hashlib.blake2b(data, digest_size=16).hexdigest()
+
+def _categorical(series, max_share, sample_rows=CARDINALITY_SAMPLE_ROWS):
+    """Return series as a Categorical if at most max_share of its values are distinct, else None."""
+    head = series.iloc[:sample_rows]
+    if head.nunique() > max_share * len(head):
+        return None
+    codes, uniques = pd.factorize(series)
+    if len(uniques) > max_share * len(series):
+        return None
+    return pd.Categorical.from_codes(codes, uniques)
+
+def compact_frame(df, category_max_share=CATEGORY_MAX_SHARE):
+    """Store a parsed frame's columns in compact dtypes, in place; the values don't change.
+
+    Text and integer columns with few distinct values (facility codes, statuses, store
+    numbers, dates) become categoricals, other text becomes Arrow-backed strings, and
+    float columns holding only whole numbers (integers with gaps) become nullable integers.
+    """
+    for column in df.columns:
+        series = df[column]
+        kind = series.dtype.kind
+        if kind == 'f':
+            values = series.dropna().to_numpy()
+            if len(values) and np.array_equal(values, np.trunc(values)) and np.abs(values).max() < 2 ** 53:
+                df[column] = series.astype('Int64')
+            continue
+        if kind == 'O':
+            if pd.api.types.infer_dtype(series, skipna=True) not in ('string', 'empty'):
+                continue
+        elif kind not in 'iu':
+            continue
+        categorical = _categorical(series, category_max_share)
+        if categorical is not None:
+            df[column] = categorical
+        elif kind == 'O':
+            df[column] = series.astype('string[pyarrow]')
+    return df
+
+def parse_bytes(data, file_name, has_headers, delimiter=None, usecols=None, nrows=None, compact=False):
+    """Parse raw file bytes into a DataFrame based on the file extension.
+
+    usecols limits parsing to the given columns and nrows to the first data rows;
+    compact stores the result in compact dtypes (see compact_frame).
+    """
+    header = 0 if has_headers else None
+    if file_name.endswith('.csv'):
+        df = pd.read_csv(
+            io.BytesIO(data), sep=delimiter or ',', header=header, usecols=usecols, nrows=nrows
+        )
+    elif file_name.endswith('.xlsx'):
+        # The XLSX reader pulls in openpyxl, so it is only imported for XLSX files
+        from xlsx_reader import read_xlsx
+        df = read_xlsx(data, has_headers, usecols=usecols, nrows=nrows)
+    elif file_name.endswith('.txt'):
+        dialect = sniff_dialect(data)
+        df = pd.read_csv(
+            io.BytesIO(data),
+            sep=delimiter or dialect['delimiter'],
+            quotechar=dialect['quotechar'],
+            header=header,
+            usecols=usecols,
+            nrows=nrows
+        )
+    else:
+        raise ValueError("Unsupported file format. Please upload CSV, XLSX, or TXT file.")
+    return compact_frame(df) if compact else df
+
+def guess_txt_delimiter(data):
+    """Pick comma or tab for a .txt upload by looking at its first line."""
+    end = data.find(b'\n')
+    first_line = data if end == -1 else data[:end]
+    return ',' if b',' in first_line else '\t'
+
+def sniff_dialect(data, sample_size=SNIFF_BYTES):
+    """Detect delimiter, quote character and header presence from a prefix of a delimited file.
+
+    The header guess is unreliable for files whose rows are all text, so callers should
+    use it as a hint rather than a default.
+    """
+    sample = data[:sample_size].decode('utf-8', errors='replace')
+    # Drop a trailing partial line so the sniffer only sees whole records
+    if len(data) > sample_size and '\n' in sample:
+        sample = sample[:sample.rindex('\n')]
+
+    sniffer = csv.Sniffer()
+    try:
+        dialect = sniffer.sniff(sample, delimiters=''.join(DELIMITER_NAMES))
+        delimiter, quotechar = dialect.delimiter, dialect.quotechar
+    except csv.Error:
+        # Single-column or irregular files: fall back to the first-line check
+        delimiter, quotechar = guess_txt_delimiter(data), '"'
+
+    try:
+        has_header = sniffer.has_header(sample)
+    except csv.Error:
+        has_header = True
+
+    return {'delimiter': delimiter, 'quotechar': quotechar, 'has_header': has_header}
+
+def describe_dialect(dialect):
+    """Describe a sniffed dialect's delimiter and quote character for display.
+
+    has_header is left out: csv.Sniffer misses the header of all-text files, so it is
+    only a hint, not a fact about the file.
+    """
+    name = DELIMITER_NAMES.get(dialect['delimiter'], repr(dialect['delimiter']))
+    return f"{name}-delimited, quote character {dialect['quotechar']}"
+
+def iter_chunks(data, file_name, has_headers, delimiter=None, chunksize=CHUNK_SIZE, usecols=None, compact=False):
+    """Yield a CSV/TXT upload as DataFrames of at most chunksize rows, in compact dtypes with compact."""
+    if file_name.endswith('.csv'):
+        sep, quotechar = delimiter or ',', '"'
+    elif file_name.endswith('.txt'):
+        dialect = sniff_dialect(data)
+        sep, quotechar = delimiter or dialect['delimiter'], dialect['quotechar']
+    else:
+        raise ValueError("Streaming is only supported for CSV and TXT files.")
+
+    reader = pd.read_csv(
+        io.BytesIO(data),
+        sep=sep,
+        quotechar=quotechar,
+        header=0 if has_headers else None,
+        usecols=usecols,
+        chunksize=chunksize
+    )
+    with reader:
+        for chunk in reader:
+            yield compact_frame(chunk) if compact else chunk
+
+def name_headerless_columns(df):
+    """Name the columns of a header-less file 'Column 1', 'Column 2', ... by file position."""
+    df.columns = [f'Column {i+1}' for i in df.columns]
+    return df
+
+def mapped_usecols(columns, has_headers):
+    """Translate mapped column names into read_csv/read_xlsx usecols."""
+    if has_headers:
+        return list(dict.fromkeys(columns))
+    # Header-less files are mapped by 'Column N' names, i.e. by position
+    return sorted({int(str(column).rsplit(' ', 1)[-1]) - 1 for column in columns})
@@ -0,0 +1,154 @@
+import logging
+import threading
+import time
+import uuid
+from collections import OrderedDict, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import track_run
+from settings import JOB_WORKERS
+
+logger = logging.getLogger(__name__)
+
+# Finished jobs kept for their sessions to show; older ones are dropped first
+MAX_FINISHED_JOBS = 50
+
+# Seconds between checks for cancellation while a job waits for its worksheet
+WAIT_POLL_SECONDS = 0.5
+
+class JobCancelled(Exception):
+    """Raised inside a job's work at the first checkpoint after the job was cancelled."""
+
+class Job:
+    """One processing run on the job runner: its status, progress counters, messages and result.
+
+    The work reports through the job: advance() adds to the progress counters (and is
+    where a cancelled job stops), note() records a message for the page to show. Messages
+    are (level, text) pairs, where level names the Streamlit function that shows them
+    (info, success, warning, error, write, code).
+    """
+
+    def __init__(self, label):
+        self.id = uuid.uuid4().hex
+        self.label = label
+        self.status = 'queued'
+        self.progress = {}
+        self.notes = []
+        self.result = None
+        self.error = None
+        self.run = None
+        self.submitted = time.time()
+        self.finished_at = None
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def finished(self):
+        return self.status in ('done', 'failed', 'cancelled')
+
+    @property
+    def cancel_requested(self):
+        return self._cancel.is_set()
+
+    def cancel(self):
+        """Ask the job to stop at its next checkpoint; a queued job doesn't start."""
+        self._cancel.set()
+
+    def check_cancelled(self):
+        """Stop the work here if the job was cancelled."""
+        if self._cancel.is_set():
+            raise JobCancelled(f"{self.label} was cancelled")
+
+    def advance(self, **counts):
+        """Add counts to the progress counters, then stop if the job was cancelled."""
+        with self._lock:
+            for name, count in counts.items():
+                self.progress[name] = self.progress.get(name, 0) + count
+        self.check_cancelled()
+
+    def note(self, level, text):
+        """Record a message for the page to show."""
+        with self._lock:
+            self.notes.append((level, text))
+
+    def snapshot(self):
+        """Return (status, progress, notes) as of now, safe to read while the job runs."""
+        with self._lock:
+            return self.status, dict(self.progress), list(self.notes)
+
+class JobRunner:
+    """Runs processing jobs on a thread pool, off the Streamlit script threads.
+
+    submit() returns at once with a job id; pages poll get(job_id) for progress and the
+    result. Jobs sharing an exclusive key (a worksheet) run one at a time, in order, so
+    two sessions never interleave appends or upload journals on the same worksheet.
+    """
+
+    def __init__(self, workers=JOB_WORKERS, max_finished=MAX_FINISHED_JOBS):
+        self.max_finished = max_finished
+        self._pool = ThreadPoolExecutor(workers, thread_name_prefix='job')
+        self._jobs = OrderedDict()
+        self._exclusive = defaultdict(threading.Lock)
+        self._lock = threading.Lock()
+
+    def submit(self, label, work, *args, exclusive=None, **kwargs):
+        """Queue work(job, *args, **kwargs) and return the new job's id."""
+        job = Job(label)
+        with self._lock:
+            self._jobs[job.id] = job
+            self._prune()
+        self._pool.submit(self._run, job, exclusive, work, args, kwargs)
+        return job.id
+
+    def get(self, job_id):
+        """Return the job with job_id, or None if there is none (or it was dropped)."""
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def cancel(self, job_id):
+        job = self.get(job_id)
+        if job is not None:
+            job.cancel()
+
+    def active(self):
+        """Jobs queued or running, oldest first."""
+        with self._lock:
+            return [job for job in self._jobs.values() if not job.finished]
+
+    def _prune(self):
+        finished = [job_id for job_id, job in self._jobs.items() if job.finished]
+        for job_id in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job_id]
+
+    def _wait_for(self, job, exclusive):
+        """Acquire the job's exclusive lock, giving up if the job is cancelled while it waits."""
+        lock = self._exclusive[exclusive]
+        while not lock.acquire(timeout=WAIT_POLL_SECONDS):
+            job.check_cancelled()
+        return lock
+
+    def _run(self, job, exclusive, work, args, kwargs):
+        lock = None
+        try:
+            job.check_cancelled()
+            if exclusive is not None:
+                lock = self._wait_for(job, exclusive)
+                job.check_cancelled()
+            job.status = 'running'
+            with track_run(job.label) as run:
+                job.run = run
+                job.result = work(job, *args, **kwargs)
+            job.status = 'done'
+        except JobCancelled:
+            job.status = 'cancelled'
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job.id, job.label)
+            job.error = e
+            job.status = 'failed'
+        finally:
+            if lock is not None:
+                lock.release()
+            job.finished_at = time.time()
+
+# Shared by every session, so all uploads in the app draw on the same workers
+JOBS = JobRunner()
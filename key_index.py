@@ -0,0 +1,200 @@
+import os
+import re
+import sqlite3
+import tempfile
+import threading
+
+import pandas as pd
+
+from metrics import span
+from settings import CACHE_DIR, OUTPUT_SINK
+
+def key_index_path(sink_spec):
+    """Where the index for an output sink lives; local sinks never share the Sheets index."""
+    if sink_spec == 'sheets':
+        return os.path.join(CACHE_DIR, 'key_index.sqlite3')
+    if sink_spec == 'fake':
+        # The fake sink keeps nothing between runs, so neither does its index
+        return os.path.join(tempfile.gettempdir(), f'harvesting_fake_key_index_{os.getpid()}.sqlite3')
+    return os.path.join(CACHE_DIR, f"key_index_{re.sub(r'[^A-Za-z0-9]+', '_', sink_spec)}.sqlite3")
+
+KEY_INDEX_PATH = key_index_path(OUTPUT_SINK)
+
+def worksheet_key(worksheet):
+    """The index's name for a worksheet, 'spreadsheet id/worksheet id', as upload journals are keyed."""
+    spreadsheet_id = getattr(getattr(worksheet, 'spreadsheet', None), 'id', 'local')
+    return f"{spreadsheet_id}/{worksheet.id}"
+
+class KeyIndex:
+    """SQLite index of the keys (normalized emails) already uploaded to each worksheet.
+
+    Lets an upload skip rows whose key is already in the sheet without reading the sheet
+    back on every run. A worksheet is read once, the first time the index sees it, so rows
+    written before the index existed (or by hand) count as present too. Sheets are
+    identified by worksheet_key, so a worksheet deleted and created again under the same
+    title is read afresh.
+    """
+
+    def __init__(self, path=KEY_INDEX_PATH):
+        self.path = path
+        self._lock = threading.Lock()
+        self._ready = False
+
+    def _connect(self):
+        """Open a connection, creating the database on first use."""
+        if not self._ready:
+            with self._lock:
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+                with sqlite3.connect(self.path) as conn:
+                    conn.execute(
+                        "CREATE TABLE IF NOT EXISTS uploaded_keys ("
+                        "sheet TEXT NOT NULL, key TEXT NOT NULL, PRIMARY KEY (sheet, key)"
+                        ") WITHOUT ROWID"
+                    )
+                    # Sheets whose existing rows have been read into the index
+                    conn.execute("CREATE TABLE IF NOT EXISTS seeded_sheets (sheet TEXT PRIMARY KEY) WITHOUT ROWID")
+                self._ready = True
+        return sqlite3.connect(self.path, timeout=30)
+
+    def present(self, sheet, keys):
+        """Return the subset of keys already uploaded to sheet."""
+        keys = list(keys)
+        if not keys:
+            return set()
+        conn = self._connect()
+        try:
+            # Join against a temporary table rather than building a huge IN (...) list
+            conn.execute("CREATE TEMP TABLE batch (key TEXT PRIMARY KEY) WITHOUT ROWID")
+            conn.executemany("INSERT OR IGNORE INTO batch VALUES (?)", ((key,) for key in keys))
+            rows = conn.execute(
+                "SELECT batch.key FROM batch JOIN uploaded_keys "
+                "ON uploaded_keys.sheet = ? AND uploaded_keys.key = batch.key",
+                (sheet,)
+            )
+            return {key for key, in rows}
+        finally:
+            conn.close()
+
+    def add(self, sheet, keys):
+        """Record keys as uploaded to sheet."""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT OR IGNORE INTO uploaded_keys VALUES (?, ?)", ((sheet, key) for key in keys)
+                )
+        finally:
+            conn.close()
+
+    def count(self, sheet):
+        """Number of keys recorded for sheet."""
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT COUNT(*) FROM uploaded_keys WHERE sheet = ?", (sheet,)).fetchone()[0]
+        finally:
+            conn.close()
+
+    def clear(self, sheet):
+        """Forget every key recorded for sheet, e.g. after rows were removed by hand.
+
+        The next upload to the sheet reads its remaining rows into the index again.
+        """
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute("DELETE FROM uploaded_keys WHERE sheet = ?", (sheet,))
+                conn.execute("DELETE FROM seeded_sheets WHERE sheet = ?", (sheet,))
+        finally:
+            conn.close()
+
+    def is_seeded(self, sheet):
+        """Whether sheet's existing rows have been read into the index."""
+        conn = self._connect()
+        try:
+            return conn.execute("SELECT 1 FROM seeded_sheets WHERE sheet = ?", (sheet,)).fetchone() is not None
+        finally:
+            conn.close()
+
+    def seed(self, sheet, worksheet, key_column):
+        """Record the keys in worksheet's key_column as uploaded to sheet, and mark sheet as seeded.
+
+        The key column is found by its header in the first row; a worksheet without it
+        (empty, or laid out differently) has no keys to record.
+        """
+        from text_kernels import normalize_emails
+        with span('seed_key_index') as seed_span:
+            rows = worksheet.get_all_values()
+            keys = []
+            if rows and key_column in rows[0]:
+                column = rows[0].index(key_column)
+                values = pd.Series([row[column] if column < len(row) else '' for row in rows[1:]], dtype=object)
+                keys = normalize_emails(values).dropna()
+                keys = keys[keys != ''].unique().tolist()
+            seed_span.rows = len(keys)
+            conn = self._connect()
+            try:
+                with conn:
+                    conn.executemany(
+                        "INSERT OR IGNORE INTO uploaded_keys VALUES (?, ?)", ((sheet, key) for key in keys)
+                    )
+                    conn.execute("INSERT OR IGNORE INTO seeded_sheets VALUES (?)", (sheet,))
+            finally:
+                conn.close()
+
+    def run(self, worksheet, key_column='Email', reread=False):
+        """Start deduplicating one upload to a worksheet.
+
+        A worksheet the index hasn't seen before is read once first, so rows it already
+        holds count as already present. reread forgets what the index holds for it and
+        reads it again, e.g. after rows were removed from the sheet by hand.
+        """
+        sheet = worksheet_key(worksheet)
+        if reread:
+            self.clear(sheet)
+        if not self.is_seeded(sheet):
+            self.seed(sheet, worksheet, key_column)
+        return DedupeRun(self, sheet, key_column)
+
+class DedupeRun:
+    """Deduplication state for one upload: the keys kept so far and the row counts.
+
+    Rows whose key is already in the index are 'already present', repeats of a key kept
+    earlier in the same run are 'duplicate in file', and the rest are new. Rows without
+    a key can't be matched and are always kept. The kept keys only go into the index
+    on commit(), once the upload has succeeded.
+    """
+
+    def __init__(self, index, sheet, key_column):
+        self.index = index
+        self.sheet = sheet
+        self.key_column = key_column
+        self.seen = set()
+        self.new = 0
+        self.duplicate_in_file = 0
+        self.already_present = 0
+
+    def filter(self, df):
+        """Return the rows of df that should be uploaded, updating the counts."""
+        with span('dedupe', rows=len(df)):
+            # Plain Python strings: set and index lookups iterate the keys one by one
+            keys = df[self.key_column].astype(object)
+            has_key = keys.notna() & (keys != '')
+            candidates = keys[has_key].unique()
+            present = self.index.present(self.sheet, (key for key in candidates if key not in self.seen))
+
+            already = has_key & keys.isin(present)
+            repeated = has_key & ~already & (keys.duplicated() | keys.isin(self.seen))
+            keep = ~already & ~repeated
+
+            self.seen.update(keys[keep & has_key])
+            self.new += int(keep.sum())
+            self.duplicate_in_file += int(repeated.sum())
+            self.already_present += int(already.sum())
+            return df[keep]
+
+    def commit(self):
+        """Record the kept keys as uploaded."""
+        with span('dedupe_commit', rows=len(self.seen)):
+            self.index.add(self.sheet, self.seen)
+
+KEY_INDEX = KeyIndex()
@@ -0,0 +1,158 @@
+import contextvars
+import json
+import logging
+import os
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from settings import METRICS_FILE, TRACE_MEMORY
+
+logger = logging.getLogger(__name__)
+
+# The run being recorded in this thread (each Streamlit session runs in its own thread)
+_CURRENT_RUN = contextvars.ContextVar('harvesting_run', default=None)
+
+def _max_rss_mb():
+    """The process's resident memory high-water mark in MB, where the platform reports it."""
+    if resource is None:
+        return None
+    max_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes
+    return max_rss / (2**20 if os.uname().sysname == 'Darwin' else 2**10)
+
+class Span:
+    """One timed stage: wall time, rows handled and memory."""
+
+    def __init__(self, name, rows=None):
+        self.name = name
+        self.rows = rows
+        self.seconds = 0.0
+        self.peak_mb = None
+        self.max_rss_mb = None
+        self.failed = False
+        self._child_peak = 0
+
+class RunMetrics:
+    """The spans recorded during one run of a process, in the order they finished."""
+
+    def __init__(self, process):
+        self.process = process
+        self.started = datetime.now(timezone.utc)
+        self.seconds = None
+        self.spans = []
+        self._open = []
+
+    def stages(self):
+        """Merge spans by name, in order of first appearance (a chunked run repeats each stage)."""
+        stages = {}
+        for span in self.spans:
+            stage = stages.setdefault(span.name, {
+                'stage': span.name, 'calls': 0, 'seconds': 0.0, 'rows': None,
+                'peak_mb': None, 'max_rss_mb': None, 'failed': False,
+            })
+            stage['calls'] += 1
+            stage['seconds'] += span.seconds
+            if span.rows is not None:
+                stage['rows'] = (stage['rows'] or 0) + span.rows
+            if span.peak_mb is not None:
+                stage['peak_mb'] = max(stage['peak_mb'] or 0, span.peak_mb)
+            if span.max_rss_mb is not None:
+                stage['max_rss_mb'] = max(stage['max_rss_mb'] or 0, span.max_rss_mb)
+            stage['failed'] = stage['failed'] or span.failed
+        for stage in stages.values():
+            rows, seconds = stage['rows'], stage['seconds']
+            stage['rows_per_second'] = round(rows / seconds) if rows and seconds else None
+        return list(stages.values())
+
+    def as_dict(self):
+        return {
+            'process': self.process,
+            'started': self.started.isoformat(timespec='seconds'),
+            'seconds': self.seconds,
+            'max_rss_mb': _max_rss_mb(),
+            'stages': self.stages(),
+        }
+
+def _report(run):
+    """Log the run as one JSON line and append it to the metrics file."""
+    line = json.dumps(run.as_dict(), default=str)
+    logger.info(line)
+    if not METRICS_FILE:
+        return
+    try:
+        os.makedirs(os.path.dirname(METRICS_FILE) or '.', exist_ok=True)
+        with open(METRICS_FILE, 'a', encoding='utf-8') as f:
+            f.write(line + '\n')
+    except OSError as e:
+        logger.warning("Could not write metrics to %s: %s", METRICS_FILE, e)
+
+@contextmanager
+def track_run(process, trace_memory=TRACE_MEMORY, report=True):
+    """Record the spans of one run of a process; the run is logged when it ends.
+
+    With trace_memory, tracemalloc follows the run so each span reports the peak Python
+    memory it allocated. Tracing slows allocation-heavy code and is process-wide, so it
+    is off by default; the process's resident memory high-water mark is always recorded.
+    With report=False the run is collected but not logged, e.g. in a worker process
+    whose spans are handed back to the run that started it.
+    """
+    run = RunMetrics(process)
+    token = _CURRENT_RUN.set(run)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    start = time.perf_counter()
+    try:
+        yield run
+    finally:
+        run.seconds = time.perf_counter() - start
+        if started_tracing:
+            tracemalloc.stop()
+        _CURRENT_RUN.reset(token)
+        if report and run.spans:
+            _report(run)
+
+@contextmanager
+def span(name, rows=None):
+    """Time a stage of the current run; does nothing outside a run.
+
+    Yields the Span so the body can set rows once it knows them.
+    """
+    run = _CURRENT_RUN.get()
+    if run is None:
+        yield Span(name, rows)
+        return
+    record = Span(name, rows)
+    tracing = tracemalloc.is_tracing()
+    if tracing:
+        # Keep the enclosing span's peak so far before measuring this one from scratch
+        if run._open:
+            parent = run._open[-1]
+            parent._child_peak = max(parent._child_peak, tracemalloc.get_traced_memory()[1])
+        baseline = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+    run._open.append(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException:
+        record.failed = True
+        raise
+    finally:
+        record.seconds = time.perf_counter() - start
+        # Spans from other threads of the run may have opened since
+        run._open.remove(record)
+        if tracing:
+            peak = max(tracemalloc.get_traced_memory()[1], record._child_peak)
+            record.peak_mb = max(peak - baseline, 0) / 2**20
+            if run._open:
+                run._open[-1]._child_peak = max(run._open[-1]._child_peak, peak)
+        record.max_rss_mb = _max_rss_mb()
+        run.spans.append(record)
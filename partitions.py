@@ -0,0 +1,60 @@
+import contextvars
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from jobs import JobCancelled
+from metrics import span
+from settings import PARTITION_WORKERS
+
+# Worksheet title part for rows without a partition value
+MISSING_PARTITION = "Unknown"
+
+def partition_value(value):
+    """The text a partition value shows in its worksheet title: store 12.0 (read as a float) becomes '12'."""
+    if pd.isna(value):
+        return MISSING_PARTITION
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return str(value).strip() or MISSING_PARTITION
+
+def partition_frame(df, column):
+    """Split df by the values of column in one pass; returns [(value text, rows)] in order of first appearance.
+
+    Values that show the same in a title (12 and 12.0, missing and blank) share a partition.
+    """
+    with span('partition', rows=len(df)):
+        keys = df[column].map(partition_value).astype(object)
+        return [(value, rows) for value, rows in df.groupby(keys, sort=False)]
+
+def write_partitions(partitions, write, workers=PARTITION_WORKERS):
+    """Write each partition through write(value, rows) on a pool of at most workers threads.
+
+    Returns one report per partition, in partition order: its value, rows, seconds and
+    either write's result or the error that stopped it. A failed partition doesn't stop
+    the others; a cancelled job stops them all, as soon as each reaches a checkpoint.
+    Each write runs in a copy of the caller's context, so its metrics spans join the run.
+    """
+    def timed_write(value, rows):
+        start = time.perf_counter()
+        report = {'value': value, 'rows': len(rows), 'result': None, 'error': None}
+        try:
+            report['result'] = write(value, rows)
+        except JobCancelled:
+            raise
+        except Exception as e:
+            report['error'] = str(e)
+        report['seconds'] = time.perf_counter() - start
+        return report
+
+    with span('write_partitions', rows=sum(len(rows) for _, rows in partitions)):
+        with ThreadPoolExecutor(max(1, min(workers, len(partitions)))) as pool:
+            futures = [pool.submit(contextvars.copy_context().run, timed_write, value, rows)
+                       for value, rows in partitions]
+            try:
+                return [future.result() for future in futures]
+            except JobCancelled:
+                for future in futures:
+                    future.cancel()
+                raise
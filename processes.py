@@ -0,0 +1,96 @@
+from collections import namedtuple
+
+from text_kernels import format_names, normalize_emails
+from transforms import compile_transform, transform_certo_market_visits, transform_donations
+
+# Everything needed to run a process without its UI. columns are the transform's
+# column-mapping arguments, in order; optional_columns may be left unmapped. Processes
+# with dedupe skip emails already uploaded; with report_key the worksheet holds one
+# report, synced on that key, instead of an appended log. creates_worksheet processes
+# create a missing worksheet, with their output columns as headers. ui names the module
+# rendering the process's page, file_types the uploads it accepts and streaming whether
+# CSV/TXT uploads can be streamed in chunks. Processes built from a declarative spec
+# keep it, for the shared page that renders them.
+Process = namedtuple('Process', [
+    'name', 'label', 'spreadsheet_key', 'worksheet_name', 'columns', 'optional_columns',
+    'transform', 'dedupe', 'report_key', 'creates_worksheet', 'ui', 'file_types', 'streaming', 'spec',
+])
+
+# A process described as data: the roles it maps and its outputs, a list of (sheet
+# column, role, kernel) where the kernel is applied to the role's column (None copies
+# it as is). With a partition the rows can instead be split across worksheets.
+Spec = namedtuple('Spec', ['roles', 'outputs', 'partition'], defaults=[None])
+
+# Splitting a customer export across worksheets by one output column: label names a
+# partition in the UI ("store") and worksheet is the title template for a value, e.g.
+# 'Ferreira_Store_{}'
+Partition = namedtuple('Partition', ['column', 'label', 'worksheet'])
+
+# An input column a process maps: its transform argument, its label in the UI and the
+# header names that select it by default
+Role = namedtuple('Role', ['column', 'label', 'patterns'])
+
+EMAIL = Role('email_col', "Email Column", ['email', 'e-mail', 'mail'])
+FIRST_NAME = Role('first_name_col', "First Name Column", ['first name', 'first', 'name', 'customer name', 'customer'])
+PHONE = Role('phone_col', "Phone Column", ['phone', 'phone number', 'contact', 'telephone', 'cell', 'mobile'])
+STORE = Role('store_col', "Store Number Column", ['store number', 'store #', 'store', 'location'])
+
+# The outputs every customer export shares
+CUSTOMER_OUTPUTS = [
+    ('Email', EMAIL, normalize_emails),
+    ('First Name', FIRST_NAME, format_names),
+    ('Phone', PHONE, None),
+]
+
+ALL_FILE_TYPES = ['csv', 'xlsx', 'txt']
+
+def customer_export(name, label, spreadsheet_key, worksheet_name, outputs, creates_worksheet=False,
+                    file_types=ALL_FILE_TYPES, streaming=True, partition=None):
+    """Describe a store's customer export: its rows are built from outputs and appended, deduplicated on email."""
+    spec = Spec(list({role.column: role for _, role, _ in outputs}.values()), outputs, partition)
+    return Process(
+        name, label, spreadsheet_key, worksheet_name, [role.column for role in spec.roles], [],
+        compile_transform([(header, role.column, kernel) for header, role, kernel in outputs]),
+        dedupe=True, report_key=None, creates_worksheet=creates_worksheet, ui='customer_export',
+        file_types=file_types, streaming=streaming, spec=spec,
+    )
+
+PROCESSES = {process.name: process for process in [
+    customer_export(
+        'certo_market', "Certo Market", "1qWLg1vQHvJQG2hFHrUpO8y6bC8_xDdkLG2ErY_aGxkw", "Certo_Market",
+        CUSTOMER_OUTPUTS,
+    ),
+    customer_export(
+        'ferreira', "Ferreira", "1qWLg1vQHvJQG2hFHrUpO8y6bC8_xDdkLG2ErY_aGxkw", "Ferreira",
+        CUSTOMER_OUTPUTS + [('Store Number', STORE, None)],
+        partition=Partition('Store Number', "store", "Ferreira_Store_{}"),
+    ),
+    Process(
+        'certo_market_visits', "Certo Market Visits Report", "1qWLg1vQHvJQG2hFHrUpO8y6bC8_xDdkLG2ErY_aGxkw",
+        "Certo_Market_MKT_Report",
+        ['name_col', 'email_col', 'phone_col', 'reg_date_col', 'first_order_col', 'spent_col'], [],
+        transform_certo_market_visits, dedupe=False, report_key='Email', creates_worksheet=False,
+        ui='certo_market_visits', file_types=ALL_FILE_TYPES, streaming=True, spec=None,
+    ),
+    Process(
+        'donation_scheduler', "Donation Scheduler", "1mlOhXY4aITLXXGS7IDrQfaZcg3MwxvI0vm3hDgswsB0",
+        "Donation_Schedule",
+        ['donor_name_col', 'donation_date_col', 'facility_col', 'donor_account_col', 'donor_phone_col',
+         'donor_status_col'],
+        ['donor_account_col', 'donor_phone_col', 'donor_status_col'],
+        transform_donations, dedupe=False, report_key=None, creates_worksheet=True,
+        ui='donation_scheduler', file_types=ALL_FILE_TYPES, streaming=False, spec=None,
+    ),
+    customer_export(
+        'key_food', "Key Food Valley Stream", "1xsDEfSg2qv-3-hVyOWbhyWz3TuxNBnIEnweZ54iExv8",
+        "Key_Food_Valley_Stream", CUSTOMER_OUTPUTS, creates_worksheet=True, file_types=['csv'],
+    ),
+    customer_export(
+        'market_place', "The Market Place", "1xsDEfSg2qv-3-hVyOWbhyWz3TuxNBnIEnweZ54iExv8", "The_Market_Place",
+        CUSTOMER_OUTPUTS, creates_worksheet=True, file_types=['xlsx'], streaming=False,
+    ),
+]}
+
+def worksheet_headers(processed_df):
+    """Headers for a newly created worksheet: the output columns, with spaces for underscores."""
+    return [column.replace('_', ' ') for column in processed_df.columns]
@@ -0,0 +1,65 @@
+import numpy as np
+import pandas as pd
+
+from metrics import span
+from settings import UPLOAD_BATCH_SIZE
+
+# Dates and datetimes are written to Sheets as plain dates
+SHEETS_DATE_FORMAT = '%Y-%m-%d'
+
+def _blank_missing(values, missing):
+    """Set the missing entries of a freshly built object array to ''."""
+    if missing.any():
+        values[missing] = ''
+    return values
+
+def _format_datetimes(series, date_format):
+    """Format a datetime64 column, using numpy's C formatter for plain dates."""
+    if date_format == SHEETS_DATE_FORMAT and series.dtype == 'datetime64[ns]':
+        return np.datetime_as_string(series.to_numpy(), unit='D').astype(object)
+    return series.dt.strftime(date_format).to_numpy(dtype=object)
+
+def serialize_column(series, date_format=SHEETS_DATE_FORMAT):
+    """Convert a column into an object array of Sheets-ready Python values.
+
+    Missing values become '', datetimes (and date/datetime objects) are formatted with
+    date_format, and numbers, booleans and strings become the matching Python types.
+    The work is done per column; only object columns that mix dates with other values
+    fall back to checking each value.
+    """
+    missing = series.isna().to_numpy()
+    dtype = series.dtype
+
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return _blank_missing(_format_datetimes(series, date_format), missing)
+    if pd.api.types.is_extension_array_dtype(dtype):
+        # Nullable, categorical and Arrow-backed columns: let pandas produce Python scalars
+        return _blank_missing(series.astype(object).to_numpy(), missing)
+    if dtype.kind in 'iubf':
+        # Assigning into an object array turns numpy scalars into Python ones
+        return _blank_missing(series.to_numpy().astype(object), missing)
+
+    values = series.to_numpy(dtype=object)
+    inferred = pd.api.types.infer_dtype(values, skipna=True)
+    if inferred in ('date', 'datetime', 'datetime64'):
+        formatted = pd.to_datetime(series, errors='coerce')
+        return _blank_missing(_format_datetimes(formatted, date_format), missing)
+    if inferred.startswith('mixed'):
+        mixed = np.empty(len(values), dtype=object)
+        for i, (value, is_missing) in enumerate(zip(values, missing)):
+            mixed[i] = '' if is_missing else value.strftime(date_format) if hasattr(value, 'strftime') else value
+        return mixed
+    return _blank_missing(values.copy(), missing)
+
+def serialize_rows(df, date_format=SHEETS_DATE_FORMAT):
+    """Convert a DataFrame into Sheets rows (a list of lists), column by column."""
+    with span('serialize', rows=len(df)):
+        grid = np.empty(df.shape, dtype=object)
+        for i in range(df.shape[1]):
+            grid[:, i] = serialize_column(df.iloc[:, i], date_format)
+        return grid.tolist()
+
+def iter_row_batches(df, batch_size=UPLOAD_BATCH_SIZE, date_format=SHEETS_DATE_FORMAT):
+    """Yield Sheets rows in batches of batch_size, so no full list-of-lists copy is held."""
+    for start in range(0, len(df), batch_size):
+        yield serialize_rows(df.iloc[start:start + batch_size], date_format)
@@ -0,0 +1,34 @@
+import os
+
+# Local state (center-hours cache and other on-disk caches) lives here unless overridden
+CACHE_DIR = os.environ.get(
+    'HARVESTING_CACHE_DIR',
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), '.cache')
+)
+
+# Rows sent per Google Sheets append request
+UPLOAD_BATCH_SIZE = int(os.environ.get('HARVESTING_UPLOAD_BATCH_SIZE', 5000))
+
+# Where processed rows are written: 'sheets', 'fake', or '<csv|parquet|sqlite>[:<directory>]'
+OUTPUT_SINK = os.environ.get('HARVESTING_OUTPUT_SINK', 'sheets')
+
+# Each processing run's per-stage timings are appended here as JSON lines; set to '' to disable
+METRICS_FILE = os.environ.get('HARVESTING_METRICS_FILE', os.path.join(CACHE_DIR, 'metrics.jsonl'))
+
+# Trace Python allocations during runs to report each stage's peak memory (slows processing)
+TRACE_MEMORY = os.environ.get('HARVESTING_TRACE_MEMORY', '') == '1'
+
+# Parse uploads into compact dtypes (categoricals, Arrow strings, nullable integers) to cut memory
+COMPACT_FRAMES = os.environ.get('HARVESTING_COMPACT_FRAMES', '') == '1'
+
+# Processing jobs run at once across all sessions; more wait in a queue
+JOB_WORKERS = int(os.environ.get('HARVESTING_JOB_WORKERS', 4))
+
+# Worksheets written at once when a run is split across worksheets (e.g. one per store)
+PARTITION_WORKERS = int(os.environ.get('HARVESTING_PARTITION_WORKERS', 4))
+
+# Requests the async Sheets client has in flight at once, across all sessions
+SHEETS_CONCURRENCY = int(os.environ.get('HARVESTING_SHEETS_CONCURRENCY', 8))
+
+# Base URL of the Sheets REST API; point it at a local stand-in to test without Google
+SHEETS_API_URL = os.environ.get('HARVESTING_SHEETS_API_URL', 'https://sheets.googleapis.com')
@@ -0,0 +1,232 @@
+import os
+from collections import deque
+
+import numpy as np
+import pandas as pd
+
+from metrics import span
+from settings import CACHE_DIR, UPLOAD_BATCH_SIZE
+from serialize import iter_row_batches, serialize_rows
+from upload import UploadJournal, upload_rows, with_retries
+
+SNAPSHOT_DIR = os.path.join(CACHE_DIR, 'snapshots')
+
+def as_plain_values(values):
+    """Cast categorical, nullable and Arrow-backed columns to object so missing values can be filled with ''."""
+    if isinstance(values, pd.DataFrame):
+        return values.astype({
+            column: object for column, dtype in values.dtypes.items() if pd.api.types.is_extension_array_dtype(dtype)
+        })
+    return values.astype(object) if pd.api.types.is_extension_array_dtype(values.dtype) else values
+
+def row_keys(keys):
+    """Make row keys unique by numbering repeats of the same key (and rows without one)."""
+    keys = as_plain_values(keys).fillna('').astype(str)
+    occurrence = keys.groupby(keys, sort=False).cumcount()
+    return (keys + '\x00' + occurrence.astype(str)).to_numpy()
+
+def row_hashes(df):
+    """Hash each row's values as the sheet shows them."""
+    return pd.util.hash_pandas_object(as_plain_values(df).fillna('').astype(str), index=False).to_numpy()
+
+class SheetSnapshot:
+    """Local record of the row keys and row hashes last written to a worksheet, in sheet order.
+
+    A dirty marker is set while a sync is being applied; if a run dies halfway, the
+    snapshot no longer describes the sheet and the next run rewrites it in full.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.dirty_path = f"{path}.dirty"
+
+    @classmethod
+    def for_worksheet(cls, worksheet):
+        """Open the snapshot for a worksheet, keyed by spreadsheet and worksheet id."""
+        spreadsheet_id = getattr(getattr(worksheet, 'spreadsheet', None), 'id', 'local')
+        return cls(os.path.join(SNAPSHOT_DIR, f"{spreadsheet_id}_{worksheet.id}.parquet"))
+
+    def load(self):
+        """Return the snapshot frame (key, hash), or None if there is no trustworthy snapshot."""
+        if os.path.exists(self.dirty_path):
+            return None
+        try:
+            return pd.read_parquet(self.path)
+        except (OSError, ValueError):
+            return None
+
+    def mark_dirty(self):
+        """Flag that the sheet is about to diverge from the snapshot."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        open(self.dirty_path, 'w').close()
+
+    def save(self, keys, hashes):
+        """Store the keys and hashes now in the sheet and clear the dirty marker."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        pd.DataFrame({'key': keys, 'hash': hashes}).to_parquet(temp_path, index=False)
+        os.replace(temp_path, self.path)
+        if os.path.exists(self.dirty_path):
+            os.remove(self.dirty_path)
+
+    def discard(self):
+        """Forget the snapshot, so the next run rewrites the sheet."""
+        for path in (self.path, self.dirty_path):
+            if os.path.exists(path):
+                os.remove(path)
+
+def plan_sync(snapshot, keys, hashes):
+    """Work out which sheet positions to write so the sheet holds exactly the new rows.
+
+    Rows are matched on key. Updated rows are rewritten in place, inserted rows first
+    fill the slots of deleted rows and then go below the last row, and any slots still
+    empty are filled by moving rows up from the bottom. Returns (writes, layout, counts):
+    writes maps a zero-based position to the new row index to write there, layout lists
+    the new row index at every position, and positions from len(layout) up to
+    len(snapshot) are left over and must be cleared.
+    """
+    old_count = len(snapshot)
+    old_index = pd.Index(snapshot['key']).get_indexer(keys)
+    matched = old_index >= 0
+    changed = np.zeros(len(keys), dtype=bool)
+    changed[matched] = snapshot['hash'].to_numpy()[old_index[matched]] != hashes[matched]
+    updated = np.flatnonzero(changed)
+    inserted = np.flatnonzero(~matched)
+
+    layout = np.full(old_count + len(inserted), -1, dtype=np.int64)
+    layout[old_index[matched]] = np.flatnonzero(matched)
+    writes = {int(old_index[i]): int(i) for i in updated}
+
+    holes = deque(np.flatnonzero(layout[:old_count] < 0).tolist())
+    deleted = len(holes)
+    end = old_count
+    for i in inserted:
+        position = holes.popleft() if holes else end
+        if position == end:
+            end += 1
+        layout[position] = i
+        writes[int(position)] = int(i)
+
+    # Fill the remaining holes with rows from the bottom so the data stays contiguous
+    while holes:
+        last = end - 1
+        # Holes stay sorted and below end, so a hole at the bottom is always the last one
+        if holes[-1] == last:
+            holes.pop()
+        else:
+            position = holes.popleft()
+            layout[position] = layout[last]
+            writes[position] = int(layout[last])
+            writes.pop(last, None)
+        end -= 1
+
+    counts = {
+        'inserted': len(inserted),
+        'updated': len(updated),
+        'deleted': deleted,
+        'unchanged': int(matched.sum()) - len(updated),
+    }
+    return writes, layout[:end], counts
+
+def _ranges(positions):
+    """Group sorted positions into (first, last) runs of consecutive positions."""
+    runs = []
+    for position in positions:
+        if runs and position == runs[-1][1] + 1:
+            runs[-1][1] = position
+        else:
+            runs.append([position, position])
+    return runs
+
+def sync_worksheet(worksheet, df, snapshot, key_column, header_rows=1, batch_size=UPLOAD_BATCH_SIZE, on_retry=None,
+                   on_batch=None):
+    """Bring a worksheet in line with df by writing only the rows that changed.
+
+    snapshot must describe what the sheet holds (see SheetSnapshot.load). Changed rows
+    are written with batched range updates of at most batch_size rows per request, and
+    leftover rows at the bottom are cleared; on_batch(row_count) is called after each
+    update request. Returns (counts, keys, hashes), where keys
+    and hashes describe the sheet afterwards and become the next snapshot.
+    """
+    from gspread.utils import rowcol_to_a1
+    keys = row_keys(df[key_column])
+    hashes = row_hashes(df)
+    with span('plan_sync', rows=len(df)):
+        writes, layout, counts = plan_sync(snapshot, keys, hashes)
+    # Only the rows being written are converted to lists
+    needed = sorted(set(writes.values()))
+    rows = dict(zip(needed, serialize_rows(df.iloc[needed])))
+    width = df.shape[1]
+    first_row = header_rows + 1
+
+    data = []
+    pending = 0
+    requests = []
+    for start, stop in _ranges(sorted(writes)):
+        for block_start in range(start, stop + 1, batch_size):
+            block_stop = min(stop, block_start + batch_size - 1)
+            data.append({
+                'range': f"{rowcol_to_a1(first_row + block_start, 1)}:{rowcol_to_a1(first_row + block_stop, width)}",
+                'values': [rows[writes[position]] for position in range(block_start, block_stop + 1)],
+            })
+            pending += block_stop - block_start + 1
+            if pending >= batch_size:
+                requests.append(data)
+                data, pending = [], 0
+    if data:
+        requests.append(data)
+
+    stale_rows = []
+    if len(layout) < len(snapshot):
+        stale_rows.append(
+            f"{rowcol_to_a1(first_row + len(layout), 1)}:{rowcol_to_a1(first_row + len(snapshot) - 1, width)}"
+        )
+
+    for data in requests:
+        # Writes go to fixed ranges, so a retried request can't duplicate rows
+        with span('batch_update', rows=sum(len(update['values']) for update in data)):
+            with_retries(lambda: worksheet.batch_update(data, value_input_option='RAW'), on_retry=on_retry)
+        if on_batch is not None:
+            on_batch(sum(len(update['values']) for update in data))
+    if stale_rows:
+        with span('batch_clear'):
+            with_retries(lambda: worksheet.batch_clear(stale_rows), on_retry=on_retry)
+
+    counts['requests'] = len(requests) + (1 if stale_rows else 0)
+    return counts, keys[layout], hashes[layout]
+
+def write_report(worksheet, df, headers, key_column, full_rewrite=False, batch_size=UPLOAD_BATCH_SIZE, on_retry=None,
+                 on_batch=None):
+    """Make a report worksheet hold exactly headers and df, writing only changed rows when possible.
+
+    Without a trustworthy snapshot of the last write (or with full_rewrite) the worksheet
+    is cleared and rewritten. Returns the sync counts, or None after a full rewrite. If
+    writing fails (or on_batch raises) the snapshot stays dirty, so the next run
+    rewrites the report.
+    """
+    snapshot = SheetSnapshot.for_worksheet(worksheet)
+    previous = None if full_rewrite else snapshot.load()
+    # Until the new snapshot is saved the old one no longer describes the sheet
+    snapshot.mark_dirty()
+
+    if previous is None:
+        with span('clear_worksheet'):
+            with_retries(worksheet.clear, on_retry=on_retry)
+        # The report is rewritten from scratch, so an interrupted earlier upload has nothing to resume
+        UploadJournal.for_worksheet(worksheet).discard()
+        # Written over A1 rather than appended, so a retry can't add the header twice
+        with_retries(
+            lambda: worksheet.batch_update([{'range': 'A1', 'values': [list(headers)]}], value_input_option='RAW'),
+            on_retry=on_retry
+        )
+        # The data starts right below the header, so even the first batch can be checked before a resend
+        upload_rows(worksheet, iter_row_batches(df, batch_size), batch_size, on_retry=on_retry, on_batch=on_batch,
+                    start_row=2)
+        snapshot.save(row_keys(df[key_column]), row_hashes(df))
+        return None
+
+    counts, keys, hashes = sync_worksheet(
+        worksheet, df, previous, key_column, batch_size=batch_size, on_retry=on_retry, on_batch=on_batch
+    )
+    snapshot.save(keys, hashes)
+    return counts
@@ -0,0 +1,218 @@
+import asyncio
+import threading
+
+from settings import SHEETS_API_URL, SHEETS_CONCURRENCY
+
+SCOPES = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+
+def authorize(private_key_id, private_key):
+    """Authorize a gspread client as the app's service account, given its private key."""
+    # gspread and oauth2client are slow to import, so they are loaded on the first write
+    import gspread
+    from oauth2client.service_account import ServiceAccountCredentials
+
+    credentials_dict = {
+        "type": "service_account",
+        "project_id": "third-hangout-387516",
+        "private_key_id": private_key_id,
+        "private_key": private_key,
+        "client_email": "apollo-miner@third-hangout-387516.iam.gserviceaccount.com",
+        "client_id": "114223947184571105588",
+        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
+        "token_uri": "https://oauth2.googleapis.com/token",
+        "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
+        "client_x509_cert_url": "https://www.googleapis.com/robot/v1/metadata/x509/apollo-miner%40third-hangout-387516.iam.gserviceaccount.com",
+        "universe_domain": "googleapis.com"
+    }
+    credentials = ServiceAccountCredentials.from_json_keyfile_dict(credentials_dict, SCOPES)
+    return gspread.authorize(credentials)
+
+def is_stale_handle_error(error):
+    """Whether an error means a cached worksheet handle no longer points at a worksheet.
+
+    Worksheet ranges are addressed by title, so a deleted or renamed worksheet makes
+    the API reject the range rather than report a missing sheet.
+    """
+    from gspread.exceptions import APIError, SpreadsheetNotFound, WorksheetNotFound
+    if isinstance(error, (WorksheetNotFound, SpreadsheetNotFound)):
+        return True
+    if isinstance(error, APIError):
+        message = str(error)
+        return 'Unable to parse range' in message or 'No grid with id' in message
+    return False
+
+class PooledWorksheet:
+    """A gspread Worksheet whose appends and row reads go out through the pool's async client.
+
+    Partition writes run on several threads; routed this way their requests share the
+    pool's connections and its cap on requests in flight. Each request is sent once and
+    fails as gspread would, so upload_rows keeps deciding what is safe to retry. Every
+    other attribute is the wrapped Worksheet's.
+    """
+
+    def __init__(self, pool, worksheet):
+        self._pool = pool
+        self._worksheet = worksheet
+
+    def __getattr__(self, name):
+        return getattr(self._worksheet, name)
+
+    def append_rows(self, values, value_input_option='RAW', insert_data_option=None, table_range=None):
+        from sheets_async import a1_range, values_path
+        params = {'valueInputOption': value_input_option}
+        if insert_data_option:
+            params['insertDataOption'] = insert_data_option
+        path = values_path(self.spreadsheet.id, a1_range(self.title, table_range or 'A1')) + ':append'
+        return self._send(lambda client: client.request('POST', path, params=params, body={'values': values},
+                                                        attempts=1))
+
+    def row_values(self, row):
+        return self._send(lambda client: client.row_values(self.spreadsheet.id, self.title, row))
+
+    def _send(self, work):
+        """Run work(async_client) on the pool, raising its failures as gspread and requests do."""
+        import requests
+        from sheets_async import SheetsRequestError
+        from sinks import api_error
+        try:
+            return self._pool.run_async(work)
+        except SheetsRequestError as e:
+            if e.status is None:
+                raise requests.exceptions.ConnectionError(str(e)) from e
+            raise api_error(e.status, str(e)) from e
+
+class SheetsPool:
+    """One authorized gspread client per process plus cached Spreadsheet and Worksheet handles.
+
+    The client's AuthorizedSession keeps HTTP connections alive and refreshes the access
+    token by itself, so it is built once instead of on every click. Handles are cached per
+    (spreadsheet key, worksheet name); forget() drops them when a worksheet turns out to
+    be deleted or renamed. Requests that can go out together are sent through an
+    AsyncSheetsClient on the pool's own event loop, authorized with the same credentials.
+    """
+
+    def __init__(self, connect, api_url=SHEETS_API_URL, max_concurrency=SHEETS_CONCURRENCY):
+        self._connect = connect
+        self.api_url = api_url
+        self.max_concurrency = max_concurrency
+        self._client = None
+        self._spreadsheets = {}
+        self._worksheets = {}
+        self._loop = None
+        self._async_client = None
+        self._lock = threading.Lock()
+
+    def client(self):
+        """Return the shared client, authorizing it on first use."""
+        with self._lock:
+            if self._client is None:
+                self._client = self._connect()
+            return self._client
+
+    def access_token(self):
+        """Return the shared client's access token, refreshing it first when it has expired."""
+        client = self.client()
+        with self._lock:
+            if not client.auth.valid:
+                client.login()
+            return client.auth.token
+
+    def run_async(self, work):
+        """Run the coroutine work(async_client) on the pool's event loop and return its result.
+
+        The loop runs on its own thread and is shared by every caller, so requests from
+        concurrent jobs share one connection pool and one cap on requests in flight.
+        """
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='sheets-async', daemon=True).start()
+            if self._async_client is None:
+                from sheets_async import AsyncSheetsClient
+                self._async_client = AsyncSheetsClient(self.access_token, self.api_url, self.max_concurrency)
+            async_client = self._async_client
+        return asyncio.run_coroutine_threadsafe(work(async_client), self._loop).result()
+
+    def spreadsheet(self, key):
+        """Return the cached Spreadsheet handle for key, opening it on first use."""
+        spreadsheet = self._spreadsheets.get(key)
+        if spreadsheet is None:
+            spreadsheet = self.client().open_by_key(key)
+            with self._lock:
+                self._spreadsheets[key] = spreadsheet
+        return spreadsheet
+
+    def worksheet(self, key, name, headers=None, rows=1000, cols=10):
+        """Return the cached Worksheet handle for (key, name).
+
+        With headers, a missing worksheet is created and the headers written to it;
+        without, WorksheetNotFound is raised as by gspread.
+        """
+        worksheet = self._worksheets.get((key, name))
+        if worksheet is not None:
+            return worksheet
+
+        from gspread.exceptions import WorksheetNotFound
+        spreadsheet = self.spreadsheet(key)
+        try:
+            worksheet = spreadsheet.worksheet(name)
+        except WorksheetNotFound:
+            if headers is None:
+                raise
+            worksheet = spreadsheet.add_worksheet(name, rows=rows, cols=cols)
+            worksheet.append_row(headers)
+
+        with self._lock:
+            self._worksheets[(key, name)] = worksheet
+        return worksheet
+
+    def worksheets(self, key, names, headers=None, rows=1000, cols=10):
+        """Return Worksheet handles for names, as worksheet() would for each, opening the uncached ones together.
+
+        One request lists the spreadsheet's worksheets; the missing ones are then created
+        and their headers written concurrently. The handles are PooledWorksheets, so
+        appends to them from several threads go out together over the async client.
+        """
+        import gspread
+        from gspread.exceptions import WorksheetNotFound
+        from sheets_async import open_worksheets
+
+        handles = {name: self._worksheets.get((key, name)) for name in names}
+        missing = [name for name, worksheet in handles.items() if worksheet is None]
+        if missing:
+            properties = self.run_async(lambda client: open_worksheets(client, key, missing, headers, rows, cols))
+            spreadsheet = self.spreadsheet(key)
+            for name in missing:
+                if name not in properties:
+                    raise WorksheetNotFound(name)
+                handles[name] = PooledWorksheet(self, gspread.Worksheet(spreadsheet, properties[name]))
+            with self._lock:
+                for name in missing:
+                    self._worksheets[(key, name)] = handles[name]
+        return [handles[name] for name in names]
+
+    def forget(self, key, name=None):
+        """Drop the cached handle for one worksheet, or for the whole spreadsheet when name is None."""
+        with self._lock:
+            if name is None:
+                self._spreadsheets.pop(key, None)
+                for cached in [cached for cached in self._worksheets if cached[0] == key]:
+                    del self._worksheets[cached]
+            else:
+                self._worksheets.pop((key, name), None)
+
+    def forget_worksheet(self, worksheet):
+        """Drop the cached handle for a Worksheet object."""
+        for cached, handle in list(self._worksheets.items()):
+            if handle is worksheet:
+                self.forget(*cached)
+
+    def reset(self):
+        """Drop the client and every cached handle, e.g. after the credentials change."""
+        with self._lock:
+            if self._async_client is not None:
+                asyncio.run_coroutine_threadsafe(self._async_client.aclose(), self._loop)
+                self._async_client = None
+            self._client = None
+            self._spreadsheets.clear()
+            self._worksheets.clear()
@@ -0,0 +1,171 @@
+import asyncio
+from urllib.parse import quote
+
+from settings import SHEETS_API_URL, SHEETS_CONCURRENCY
+from upload import MAX_ATTEMPTS, REJECTED_STATUSES, RETRYABLE_STATUSES, backoff_delay
+
+class SheetsRequestError(Exception):
+    """A Sheets API request that failed; status is the HTTP status, or None if no response came back."""
+
+    def __init__(self, message, status=None):
+        super().__init__(message)
+        self.status = status
+
+def a1_range(title, cells=None):
+    """An A1 range on a worksheet by title, e.g. "'Ferreira_Store_12'!A1"; the whole worksheet without cells."""
+    quoted = "'" + title.replace("'", "''") + "'"
+    return f"{quoted}!{cells}" if cells else quoted
+
+def values_path(key, range_name):
+    return f"/v4/spreadsheets/{key}/values/{quote(range_name, safe='')}"
+
+class AsyncSheetsClient:
+    """Google Sheets REST client for asyncio, with one connection pool and a cap on requests in flight.
+
+    Independent requests (listing a spreadsheet's worksheets, creating worksheets and
+    writing their headers, appends to different worksheets) can be awaited together with
+    asyncio.gather; they share the pool's kept-alive connections and at most
+    max_concurrency are sent at once. token() returns a current OAuth access token and may
+    block to refresh it, so it runs in a worker thread. Transient failures are retried
+    with the same backoff as uploads; a request that adds something is only sent again
+    once it is known not to have been applied.
+    """
+
+    def __init__(self, token, base_url=SHEETS_API_URL, max_concurrency=SHEETS_CONCURRENCY, timeout=60.0,
+                 on_retry=None, sleep=asyncio.sleep):
+        # Imported here so the app starts without the HTTP client library
+        import httpx
+        self._httpx = httpx
+        self._token = token
+        self.on_retry = on_retry
+        self.sleep = sleep
+        self._slots = asyncio.Semaphore(max_concurrency)
+        self._http = httpx.AsyncClient(
+            base_url=base_url, timeout=timeout,
+            limits=httpx.Limits(max_connections=max_concurrency, max_keepalive_connections=max_concurrency),
+        )
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        await self.aclose()
+
+    async def aclose(self):
+        await self._http.aclose()
+
+    async def request(self, method, path, params=None, body=None, idempotent=None, applied=None,
+                      attempts=MAX_ATTEMPTS):
+        """Send one request, retrying rate limiting, server errors and dropped connections; returns the JSON reply.
+
+        A POST isn't idempotent unless said otherwise: after a server error or a dropped
+        connection it may have been applied, so it is only sent again after a 429 or once
+        applied() returns None. If applied() returns anything else, the request went through
+        and that is returned instead. With attempts=1 the caller handles retries itself.
+        """
+        if idempotent is None:
+            idempotent = method != 'POST'
+        check = False
+        for attempt in range(attempts):
+            if check:
+                result = await applied()
+                if result is not None:
+                    return result
+            try:
+                return await self._send(method, path, params, body)
+            except SheetsRequestError as e:
+                transient = e.status is None or e.status in RETRYABLE_STATUSES
+                rejected = e.status in REJECTED_STATUSES
+                if attempt == attempts - 1 or not transient or not (idempotent or rejected or applied):
+                    raise
+                check = not idempotent and not rejected
+                delay = backoff_delay(attempt)
+                if self.on_retry is not None:
+                    self.on_retry(e, attempt + 1, delay)
+                await self.sleep(delay)
+
+    async def _send(self, method, path, params, body):
+        token = await asyncio.to_thread(self._token)
+        async with self._slots:
+            try:
+                response = await self._http.request(
+                    method, path, params=params, json=body, headers={'Authorization': f'Bearer {token}'}
+                )
+            except self._httpx.TransportError as e:
+                raise SheetsRequestError(f"{method} {path}: {e!r}") from e
+        if response.is_error:
+            try:
+                message = response.json()['error']['message']
+            except (ValueError, KeyError, TypeError):
+                message = response.text
+            raise SheetsRequestError(f"{method} {path}: {response.status_code} {message}", response.status_code)
+        return response.json() if response.content else {}
+
+    async def worksheet_properties(self, key):
+        """Return {title: properties} for every worksheet of a spreadsheet, in one request."""
+        response = await self.request('GET', f'/v4/spreadsheets/{key}', params={'fields': 'sheets.properties'})
+        return {sheet['properties']['title']: sheet['properties'] for sheet in response.get('sheets', [])}
+
+    async def add_worksheet(self, key, title, rows=1000, cols=10):
+        """Create a worksheet and return its properties.
+
+        After a failure that may have created it, the worksheets are listed again before
+        the request is resent, and an existing one is returned.
+        """
+        async def created():
+            properties = (await self.worksheet_properties(key)).get(title)
+            return properties and {'replies': [{'addSheet': {'properties': properties}}]}
+
+        response = await self.request('POST', f'/v4/spreadsheets/{key}:batchUpdate', body={'requests': [{
+            'addSheet': {'properties': {'title': title, 'gridProperties': {'rowCount': rows, 'columnCount': cols}}}
+        }]}, applied=created)
+        return response['replies'][0]['addSheet']['properties']
+
+    async def row_values(self, key, title, row):
+        """Return the cells of one row of a worksheet, [] for an empty row."""
+        response = await self.request('GET', values_path(key, a1_range(title, f'{row}:{row}')))
+        return (response.get('values') or [[]])[0]
+
+    async def update_values(self, key, range_name, rows):
+        """Write rows over the cells starting at range_name."""
+        await self.request('PUT', values_path(key, range_name), params={'valueInputOption': 'RAW'},
+                           body={'values': rows})
+
+    async def append_rows(self, key, title, rows, start_row=None):
+        """Append rows below a worksheet's table, as upload.append_rows_to_sheet does; returns the API's reply.
+
+        Appending twice would repeat the rows, so after a failure that may have appended
+        them the request is only resent if start_row is known and that row is still
+        empty. Without start_row only a 429 is retried.
+        """
+        async def appended():
+            if not any(cell != '' for cell in await self.row_values(key, title, start_row)):
+                return None
+            return {'updates': {'updatedRange': a1_range(title, f'A{start_row}:A{start_row + len(rows) - 1}')}}
+
+        range_name = a1_range(title, f'A{start_row}' if start_row else 'A1')
+        return await self.request(
+            'POST', values_path(key, range_name) + ':append',
+            params={'valueInputOption': 'RAW', 'insertDataOption': 'INSERT_ROWS'}, body={'values': rows},
+            applied=appended if start_row else None
+        )
+
+async def open_worksheets(client, key, titles, headers=None, rows=1000, cols=10):
+    """List a spreadsheet's worksheets once, then create the missing titles concurrently.
+
+    Each created worksheet gets headers as its first row. Returns {title: properties};
+    without headers nothing is created and missing titles are left out.
+    """
+    existing = await client.worksheet_properties(key)
+    found = {title: existing[title] for title in titles if title in existing}
+    if headers is None:
+        return found
+
+    async def create(title):
+        properties = await client.add_worksheet(key, title, rows, cols)
+        await client.update_values(key, a1_range(title, 'A1'), [list(headers)])
+        return properties
+
+    missing = [title for title in dict.fromkeys(titles) if title not in existing]
+    found.update(zip(missing, await asyncio.gather(*(create(title) for title in missing))))
+    return found
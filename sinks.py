@@ -0,0 +1,338 @@
+import csv
+import hashlib
+import json
+import os
+import re
+import sqlite3
+import time
+from collections import deque
+from types import SimpleNamespace
+
+import pandas as pd
+
+from settings import CACHE_DIR
+
+def api_error(status, message="Injected failure"):
+    """Build a gspread APIError as raised for an HTTP error response."""
+    # gspread and requests are slow to import, so the local sinks load them only when needed
+    import requests
+    from gspread.exceptions import APIError
+    response = requests.Response()
+    response.status_code = status
+    response._content = json.dumps({'error': {'code': status, 'message': message}}).encode('utf-8')
+    return APIError(response)
+
+def title_sheet_id(title):
+    """A stable worksheet id for a local worksheet, so each title gets its own upload journal."""
+    return int(hashlib.blake2b(title.encode('utf-8'), digest_size=4).hexdigest(), 16)
+
+class TableWorksheet:
+    """Worksheet stand-in holding rows as a list of lists.
+
+    Implements the parts of gspread.Worksheet the app uses (append_rows, append_row,
+    batch_update, batch_clear, clear, get_all_values, row_values) with the Sheets
+    semantics, so the upload, dedupe and sync code runs unchanged against it. Subclasses
+    hook _call to model the wire and _write to persist.
+    """
+
+    def __init__(self, title="Sheet1", rows=None, spreadsheet_id="local", sheet_id=0):
+        self.title = title
+        self.id = sheet_id
+        self.spreadsheet = SimpleNamespace(id=spreadsheet_id)
+        self.rows = [list(row) for row in rows or []]
+
+    def _call(self, name, payload):
+        """Hook run for every API call; returns the payload as the server would receive it."""
+        return payload
+
+    def _write(self):
+        """Hook run after every call that changes the rows."""
+
+    def _append(self, values):
+        """Hook run after rows are added at the bottom; the rows are already in self.rows."""
+        self._write()
+
+    def get_all_values(self):
+        return [list(row) for row in self._call('get_all_values', self.rows)]
+
+    def row_values(self, row):
+        values = self.rows[row - 1] if row <= len(self.rows) else []
+        return list(self._call('row_values', values))
+
+    def clear(self):
+        self._call('clear', None)
+        self.rows = []
+        self._write()
+
+    def append_row(self, values, **kwargs):
+        return self.append_rows([values], **kwargs)
+
+    def append_rows(self, values, value_input_option='RAW', insert_data_option=None, table_range=None):
+        values = self._call('append_rows', values)
+        start = int(re.search(r'(\d+)', table_range).group(1)) - 1 if table_range else 0
+        # The table is the block of non-empty rows starting at table_range; append after it
+        if start > len(self.rows):
+            self.rows.extend([] for _ in range(start - len(self.rows)))
+        end = start
+        while end < len(self.rows) and any(cell != '' for cell in self.rows[end]):
+            end += 1
+        if end == len(self.rows):
+            self.rows.extend(values)
+            self._append(values)
+        else:
+            if insert_data_option == 'INSERT_ROWS':
+                self.rows[end:end] = values
+            else:
+                self.rows[end:end + len(values)] = values
+            self._write()
+        width = max((len(row) for row in values), default=0)
+        last_column = chr(ord('A') + max(width - 1, 0))
+        return {
+            'tableRange': f"'{self.title}'!A{start + 1}:{last_column}{end}",
+            'updates': {
+                'updatedRange': f"'{self.title}'!A{end + 1}:{last_column}{end + len(values)}",
+                'updatedRows': len(values),
+            },
+        }
+
+    def batch_update(self, data, value_input_option='RAW'):
+        from gspread.utils import a1_range_to_grid_range
+        data = self._call('batch_update', data)
+        for update in data:
+            grid = a1_range_to_grid_range(update['range'])
+            for offset, values in enumerate(update['values']):
+                row = grid['startRowIndex'] + offset
+                while len(self.rows) <= row:
+                    self.rows.append([])
+                cells = self.rows[row]
+                cells.extend([''] * (grid['startColumnIndex'] + len(values) - len(cells)))
+                cells[grid['startColumnIndex']:grid['startColumnIndex'] + len(values)] = values
+        self._write()
+        return {'totalUpdatedRows': sum(len(update['values']) for update in data)}
+
+    def batch_clear(self, ranges):
+        from gspread.utils import a1_range_to_grid_range
+        self._call('batch_clear', ranges)
+        for cleared in ranges:
+            grid = a1_range_to_grid_range(cleared)
+            for row in self.rows[grid['startRowIndex']:grid['endRowIndex']]:
+                for col in range(grid['startColumnIndex'], min(grid['endColumnIndex'], len(row))):
+                    row[col] = ''
+        # Trailing empty rows aren't part of the sheet's data
+        while self.rows and not any(cell != '' for cell in self.rows[-1]):
+            self.rows.pop()
+        self._write()
+
+class FakeWorksheet(TableWorksheet):
+    """In-process worksheet that models the Sheets API's costs and failures.
+
+    Every call pays the JSON encode/decode of its payload, latency seconds and
+    row_latency seconds per row sent (appends and range updates). failures maps (method name, call number from 1) to the HTTP status to fail that call
+    with, and lost_replies does the same for appends after their rows are written, as
+    when Google applies a request but the reply is an error. Appends of more than
+    max_rows_per_request rows are rejected like an oversized request, and more than quota_per_minute calls in a minute fail with 429. clock and
+    sleep can be replaced with a simulated clock to load-test without waiting.
+    """
+
+    def __init__(self, title="Sheet1", rows=None, latency=0.0, row_latency=0.0, failures=None,
+                 max_rows_per_request=None, quota_per_minute=None, spreadsheet_id="fake", sheet_id=0,
+                 clock=time.monotonic, sleep=time.sleep, lost_replies=None):
+        super().__init__(title, rows, spreadsheet_id, sheet_id)
+        self.latency = latency
+        self.row_latency = row_latency
+        self.failures = dict(failures or {})
+        self.lost_replies = dict(lost_replies or {})
+        self.max_rows_per_request = max_rows_per_request
+        self.quota_per_minute = quota_per_minute
+        self.clock = clock
+        self.sleep = sleep
+        self.calls = {}
+        self._recent = deque()
+
+    def append_rows(self, values, **kwargs):
+        response = super().append_rows(values, **kwargs)
+        status = self.lost_replies.pop(('append_rows', self.calls['append_rows']), None)
+        if status is not None:
+            raise api_error(status)
+        return response
+
+    def _call(self, name, payload):
+        """Count the call, apply quota and injected failures, and pay for the transfer."""
+        self.calls[name] = self.calls.get(name, 0) + 1
+        sent = 0
+        if name == 'append_rows':
+            sent = len(payload)
+        elif name == 'batch_update':
+            sent = sum(len(update['values']) for update in payload)
+        if self.latency or self.row_latency:
+            self.sleep(self.latency + self.row_latency * sent)
+        if self.quota_per_minute is not None:
+            now = self.clock()
+            while self._recent and now - self._recent[0] >= 60:
+                self._recent.popleft()
+            if len(self._recent) >= self.quota_per_minute:
+                raise api_error(429, "Quota exceeded for quota metric 'Write requests' per minute")
+            self._recent.append(now)
+        status = self.failures.pop((name, self.calls[name]), None)
+        if status is not None:
+            raise api_error(status)
+        if name == 'append_rows' and self.max_rows_per_request is not None and sent > self.max_rows_per_request:
+            raise api_error(400, "Request payload size exceeds the limit")
+        return json.loads(json.dumps(payload))
+
+class FileWorksheet(TableWorksheet):
+    """Worksheet kept in a local CSV, Parquet or SQLite file.
+
+    Appends at the bottom are added to CSV and SQLite files in place; any other change
+    rewrites the file.
+    """
+
+    def __init__(self, path, fmt, title, spreadsheet_id):
+        super().__init__(title, self._read(path, fmt), spreadsheet_id, title_sheet_id(title))
+        self.path = path
+        self.fmt = fmt
+
+    @staticmethod
+    def _read(path, fmt):
+        """Load the rows stored at path, if any."""
+        if not os.path.exists(path):
+            return []
+        if fmt == 'csv':
+            with open(path, newline='', encoding='utf-8') as f:
+                return list(csv.reader(f))
+        if fmt == 'parquet':
+            return pd.read_parquet(path).fillna('').values.tolist()
+        with sqlite3.connect(path) as conn:
+            return [json.loads(row) for row, in conn.execute("SELECT cells FROM sheet_rows ORDER BY position")]
+
+    def _append(self, values):
+        if self.fmt == 'csv' and os.path.exists(self.path):
+            with open(self.path, 'a', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows(values)
+        elif self.fmt == 'sqlite' and os.path.exists(self.path):
+            first = len(self.rows) - len(values)
+            with sqlite3.connect(self.path) as conn:
+                conn.executemany(
+                    "INSERT INTO sheet_rows VALUES (?, ?)",
+                    ((first + i, json.dumps(row, default=str)) for i, row in enumerate(values))
+                )
+            conn.close()
+        else:
+            self._write()
+
+    def _write(self):
+        os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        if self.fmt == 'csv':
+            with open(temp_path, 'w', newline='', encoding='utf-8') as f:
+                csv.writer(f).writerows(self.rows)
+        elif self.fmt == 'parquet':
+            width = max((len(row) for row in self.rows), default=0)
+            # Parquet needs one type per column, so cells are stored as text
+            table = [[str(cell) for cell in row] + [''] * (width - len(row)) for row in self.rows]
+            pd.DataFrame(table, columns=[f'c{i}' for i in range(width)]).to_parquet(temp_path, index=False)
+        else:
+            with sqlite3.connect(temp_path) as conn:
+                conn.execute("CREATE TABLE sheet_rows (position INTEGER PRIMARY KEY, cells TEXT)")
+                conn.executemany(
+                    "INSERT INTO sheet_rows VALUES (?, ?)",
+                    ((i, json.dumps(row, default=str)) for i, row in enumerate(self.rows))
+                )
+            conn.close()
+        os.replace(temp_path, self.path)
+
+class SheetsSink:
+    """Google Sheets, through the shared client pool."""
+
+    def __init__(self, pool):
+        self.pool = pool
+
+    def worksheet(self, spreadsheet_key, worksheet_name, headers=None):
+        return self.pool.worksheet(spreadsheet_key, worksheet_name, headers=headers)
+
+    def worksheets(self, spreadsheet_key, worksheet_names, headers=None):
+        return self.pool.worksheets(spreadsheet_key, worksheet_names, headers=headers)
+
+    def forget(self, spreadsheet_key, worksheet_name=None):
+        self.pool.forget(spreadsheet_key, worksheet_name)
+
+    def forget_worksheet(self, worksheet):
+        self.pool.forget_worksheet(worksheet)
+
+    def describe(self):
+        return "Google Sheets"
+
+class _LocalSink:
+    """Handle caching shared by the local sinks; worksheets are created on first use."""
+
+    def __init__(self):
+        self._worksheets = {}
+
+    def worksheet(self, spreadsheet_key, worksheet_name, headers=None):
+        worksheet = self._worksheets.get((spreadsheet_key, worksheet_name))
+        if worksheet is None:
+            worksheet = self._open(spreadsheet_key, worksheet_name)
+            if not worksheet.rows and headers is not None:
+                worksheet.append_row(headers)
+            self._worksheets[(spreadsheet_key, worksheet_name)] = worksheet
+        return worksheet
+
+    def worksheets(self, spreadsheet_key, worksheet_names, headers=None):
+        return [self.worksheet(spreadsheet_key, name, headers=headers) for name in worksheet_names]
+
+    def forget(self, spreadsheet_key, worksheet_name=None):
+        for cached in list(self._worksheets):
+            if cached[0] == spreadsheet_key and worksheet_name in (None, cached[1]):
+                del self._worksheets[cached]
+
+    def forget_worksheet(self, worksheet):
+        for cached, handle in list(self._worksheets.items()):
+            if handle is worksheet:
+                del self._worksheets[cached]
+
+class FileSink(_LocalSink):
+    """Write each worksheet to a CSV, Parquet or SQLite file in a local directory."""
+
+    EXTENSIONS = {'csv': 'csv', 'parquet': 'parquet', 'sqlite': 'sqlite3'}
+
+    def __init__(self, directory, fmt='csv'):
+        super().__init__()
+        if fmt not in self.EXTENSIONS:
+            raise ValueError(f"Unsupported sink format: {fmt}")
+        self.directory = directory
+        self.fmt = fmt
+
+    def _open(self, spreadsheet_key, worksheet_name):
+        safe_name = re.sub(r'[^A-Za-z0-9_.-]', '_', worksheet_name)
+        path = os.path.join(self.directory, f"{spreadsheet_key[:12]}_{safe_name}.{self.EXTENSIONS[self.fmt]}")
+        return FileWorksheet(path, self.fmt, worksheet_name, f"{self.fmt}-{spreadsheet_key}")
+
+    def describe(self):
+        return f"local {self.fmt.upper()} files in {self.directory}"
+
+class FakeSink(_LocalSink):
+    """In-process fake Sheets: every worksheet is a FakeWorksheet built with the given options."""
+
+    def __init__(self, **options):
+        super().__init__()
+        self.options = options
+
+    def _open(self, spreadsheet_key, worksheet_name):
+        return FakeWorksheet(
+            worksheet_name, spreadsheet_id=f"fake-{spreadsheet_key}", sheet_id=title_sheet_id(worksheet_name),
+            **self.options
+        )
+
+    def describe(self):
+        return "an in-process fake of Google Sheets (nothing is saved)"
+
+def make_sink(spec, pool):
+    """Build the sink named by spec: 'sheets', 'fake', or '<csv|parquet|sqlite>[:<directory>]'."""
+    if spec == 'sheets':
+        return SheetsSink(pool)
+    if spec == 'fake':
+        return FakeSink()
+    fmt, _, directory = spec.partition(':')
+    return FileSink(directory or os.path.join(CACHE_DIR, 'sink'), fmt)
@@ -0,0 +1,124 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from types import SimpleNamespace
+
+import pytest
+
+import center_hours
+from center_hours import CenterHoursProvider
+
+SCHEDULE = {'MELROSE': {'Monday': '8:00 AM - 6:00 PM', 'Sunday': 'CLOSED'}}
+
+class Feed:
+    """A local stand-in for the center-hours feed that answers conditional requests with 304."""
+
+    def __init__(self):
+        self.data = SCHEDULE
+        self.etag = '"v1"'
+        self.fail_with = None
+        self.requests = []
+
+    def serve(self):
+        feed = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                feed.requests.append(dict(self.headers))
+                if feed.fail_with is not None:
+                    self.send_response(feed.fail_with)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                if self.headers.get('If-None-Match') == feed.etag:
+                    self.send_response(304)
+                    self.end_headers()
+                    return
+                body = json.dumps(feed.data).encode('utf-8')
+                self.send_response(200)
+                self.send_header('ETag', feed.etag)
+                self.send_header('Last-Modified', 'Mon, 06 May 2024 10:00:00 GMT')
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+        server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        return server
+
+@pytest.fixture
+def feed():
+    feed = Feed()
+    server = feed.serve()
+    feed.url = f"http://127.0.0.1:{server.server_port}/hours.json"
+    yield feed
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def clock(monkeypatch):
+    """A clock the provider reads instead of the real one; advance it by adding to clock.now."""
+    clock = SimpleNamespace(now=1_000_000.0)
+    monkeypatch.setattr(center_hours, 'time', SimpleNamespace(time=lambda: clock.now))
+    return clock
+
+def provider(feed, tmp_path, **options):
+    return CenterHoursProvider(url=feed.url, ttl=60, cache_path=str(tmp_path / 'center_hours.json'), **options)
+
+def test_first_fetch_then_reuse_within_ttl(feed, tmp_path, clock):
+    hours = provider(feed, tmp_path)
+    assert hours.get() == (SCHEDULE, 'fetched')
+    clock.now += 59
+    assert hours.get() == (SCHEDULE, 'cached')
+    assert len(feed.requests) == 1
+
+def test_revalidates_with_etag_after_ttl(feed, tmp_path, clock):
+    hours = provider(feed, tmp_path)
+    hours.get()
+    clock.now += 61
+    assert hours.get() == (SCHEDULE, 'revalidated')
+    assert feed.requests[-1]['If-None-Match'] == '"v1"'
+    assert feed.requests[-1]['If-Modified-Since'] == 'Mon, 06 May 2024 10:00:00 GMT'
+    # A 304 restarts the TTL
+    clock.now += 59
+    assert hours.get() == (SCHEDULE, 'cached')
+    assert len(feed.requests) == 2
+
+def test_downloads_a_changed_feed(feed, tmp_path, clock):
+    hours = provider(feed, tmp_path)
+    hours.get()
+    feed.data, feed.etag = {'JAMAICA': {'Monday': '9:00 AM - 5:00 PM'}}, '"v2"'
+    clock.now += 61
+    assert hours.get() == (feed.data, 'fetched')
+
+def test_persisted_copy_survives_a_restart(feed, tmp_path, clock):
+    provider(feed, tmp_path).get()
+    restarted = provider(feed, tmp_path)
+    assert restarted.get() == (SCHEDULE, 'cached')
+    assert len(feed.requests) == 1
+    clock.now += 61
+    assert restarted.get() == (SCHEDULE, 'revalidated')
+
+def test_serves_last_known_copy_when_the_feed_fails(feed, tmp_path, clock):
+    hours = provider(feed, tmp_path, retry_after=30)
+    hours.get()
+    feed.fail_with = 500
+    clock.now += 61
+    assert hours.get() == (SCHEDULE, 'stale')
+    assert hours.last_error is not None
+    # A failed feed isn't asked again until retry_after has passed
+    clock.now += 29
+    assert hours.get() == (SCHEDULE, 'stale')
+    assert len(feed.requests) == 2
+    feed.fail_with = None
+    clock.now += 2
+    assert hours.get() == (SCHEDULE, 'revalidated')
+    assert hours.last_error is None
+
+def test_unavailable_without_any_copy(feed, tmp_path, clock):
+    feed.fail_with = 503
+    assert provider(feed, tmp_path).get() == ({}, 'unavailable')
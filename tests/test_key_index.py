@@ -0,0 +1,74 @@
+import pandas as pd
+
+from key_index import KeyIndex, worksheet_key
+from sinks import FakeWorksheet
+
+HEADER = ['Email', 'First Name']
+
+def frame(*emails):
+    return pd.DataFrame({'Email': list(emails), 'First Name': ['Ann'] * len(emails)})
+
+def test_counts_new_repeated_and_present_rows(tmp_path):
+    index = KeyIndex(str(tmp_path / 'keys.sqlite3'))
+    sheet = FakeWorksheet(rows=[HEADER])
+    first = index.run(sheet)
+    kept = first.filter(frame('a@x.com', 'b@x.com', 'a@x.com', None, ''))
+    assert kept['Email'].tolist() == ['a@x.com', 'b@x.com', None, '']
+    assert (first.new, first.duplicate_in_file, first.already_present) == (4, 1, 0)
+    first.commit()
+
+    second = index.run(sheet)
+    assert second.filter(frame('b@x.com', 'c@x.com'))['Email'].tolist() == ['c@x.com']
+    assert (second.new, second.duplicate_in_file, second.already_present) == (1, 0, 1)
+
+def test_keys_are_only_recorded_on_commit(tmp_path):
+    index = KeyIndex(str(tmp_path / 'keys.sqlite3'))
+    sheet = FakeWorksheet(rows=[HEADER])
+    index.run(sheet).filter(frame('a@x.com'))
+    assert index.count(worksheet_key(sheet)) == 0
+
+def test_a_new_index_is_seeded_from_the_worksheet(tmp_path):
+    index = KeyIndex(str(tmp_path / 'keys.sqlite3'))
+    sheet = FakeWorksheet(rows=[HEADER, ['a@x.com', 'Ann'], [' B@X.com ', 'Bob'], ['', 'No Email']])
+    run = index.run(sheet)
+    kept = run.filter(frame('a@x.com', 'b@x.com', 'c@x.com'))
+    assert kept['Email'].tolist() == ['c@x.com']
+    assert (run.new, run.already_present) == (1, 2)
+
+def test_the_worksheet_is_read_only_once(tmp_path):
+    index = KeyIndex(str(tmp_path / 'keys.sqlite3'))
+    sheet = FakeWorksheet(rows=[HEADER, ['a@x.com', 'Ann']])
+    index.run(sheet)
+    index.run(sheet)
+    assert sheet.calls['get_all_values'] == 1
+    # Each worksheet is seeded on its own
+    other = FakeWorksheet('Other', rows=[HEADER], sheet_id=1)
+    index.run(other)
+    assert index.count(worksheet_key(other)) == 0
+
+def test_a_recreated_worksheet_is_read_afresh(tmp_path):
+    index = KeyIndex(str(tmp_path / 'keys.sqlite3'))
+    run = index.run(FakeWorksheet('Store_1', rows=[HEADER], sheet_id=1))
+    run.filter(frame('a@x.com'))
+    run.commit()
+    # Deleted and created again under the same title, it gets a new worksheet id
+    recreated = FakeWorksheet('Store_1', rows=[HEADER], sheet_id=2)
+    assert index.run(recreated).filter(frame('a@x.com'))['Email'].tolist() == ['a@x.com']
+
+def test_reread_reads_the_worksheet_again(tmp_path):
+    index = KeyIndex(str(tmp_path / 'keys.sqlite3'))
+    sheet = FakeWorksheet(rows=[HEADER, ['a@x.com', 'Ann'], ['b@x.com', 'Bob']])
+    index.run(sheet)
+    # b@x.com is removed from the sheet by hand
+    sheet.rows = sheet.rows[:2]
+    assert index.run(sheet).filter(frame('b@x.com'))['Email'].tolist() == []
+    run = index.run(sheet, reread=True)
+    assert run.filter(frame('a@x.com', 'b@x.com'))['Email'].tolist() == ['b@x.com']
+    assert sheet.calls['get_all_values'] == 2
+
+def test_worksheet_without_the_key_column(tmp_path):
+    index = KeyIndex(str(tmp_path / 'keys.sqlite3'))
+    for sheet in [FakeWorksheet(), FakeWorksheet(rows=[['Name'], ['Ann']])]:
+        run = index.run(sheet, reread=True)
+        assert run.filter(frame('a@x.com'))['Email'].tolist() == ['a@x.com']
+        assert index.is_seeded(worksheet_key(sheet))
@@ -0,0 +1,42 @@
+import pandas as pd
+import pytest
+
+from jobs import JobCancelled
+from metrics import span, track_run
+from partitions import partition_frame, write_partitions
+
+def frame():
+    return pd.DataFrame({'Store': [12.0, 7, None, 12, ''], 'Email': list('abcde')})
+
+def test_partitions_share_a_title_value():
+    partitions = partition_frame(frame(), 'Store')
+    assert [(value, rows['Email'].tolist()) for value, rows in partitions] == [
+        ('12', ['a', 'd']), ('7', ['b']), ('Unknown', ['c', 'e'])]
+
+def test_spans_inside_each_write_join_the_run():
+    def write(value, rows):
+        with span('append', rows=len(rows)):
+            return value
+
+    with track_run('test', report=False) as run:
+        reports = write_partitions(partition_frame(frame(), 'Store'), write, workers=3)
+    assert [report['result'] for report in reports] == ['12', '7', 'Unknown']
+    stages = {stage['stage']: stage for stage in run.stages()}
+    assert (stages['append']['calls'], stages['append']['rows']) == (3, 5)
+    assert run._open == []
+
+def test_a_failed_partition_does_not_stop_the_others():
+    def write(value, rows):
+        if value == '7':
+            raise ValueError("quota")
+        return len(rows)
+
+    reports = write_partitions(partition_frame(frame(), 'Store'), write)
+    assert [(report['result'], report['error']) for report in reports] == [(2, None), (None, 'quota'), (2, None)]
+
+def test_a_cancelled_job_stops_the_writes():
+    def write(value, rows):
+        raise JobCancelled()
+
+    with pytest.raises(JobCancelled):
+        write_partitions(partition_frame(frame(), 'Store'), write)
@@ -0,0 +1,73 @@
+import time
+
+import pandas as pd
+import pytest
+
+import sheet_sync
+import upload
+from sheet_sync import plan_sync, row_hashes, row_keys, write_report
+from sinks import FakeWorksheet
+
+HEADERS = ['Key', 'Value']
+
+@pytest.fixture(autouse=True)
+def local_state(tmp_path, monkeypatch):
+    monkeypatch.setattr(sheet_sync, 'SNAPSHOT_DIR', str(tmp_path / 'snapshots'))
+    monkeypatch.setattr(upload, 'JOURNAL_DIR', str(tmp_path / 'journals'))
+    monkeypatch.setattr(upload, 'backoff_delay', lambda attempt: 0)
+
+def frame(keys, tag=''):
+    return pd.DataFrame({'Key': [f'k{key}' for key in keys], 'Value': [f'v{key}{tag}' for key in keys]})
+
+def snapshot_of(df):
+    return pd.DataFrame({'key': row_keys(df['Key']), 'hash': row_hashes(df)})
+
+def apply_plan(old, new):
+    """The sheet's rows after writing plan_sync's changes over old's rows."""
+    writes, layout, counts = plan_sync(snapshot_of(old), row_keys(new['Key']), row_hashes(new))
+    rows = old.values.tolist()
+    rows.extend([None] * (len(layout) - len(rows)))
+    for position, index in writes.items():
+        rows[position] = new.values.tolist()[index]
+    return sorted(rows[:len(layout)]), counts
+
+@pytest.mark.parametrize('new_keys', [
+    range(10),
+    range(5),
+    range(5, 15),
+    [0, 2, 4, 6, 8, 10, 11],
+    [9, 1, 20],
+    [],
+])
+def test_plan_leaves_exactly_the_new_rows(new_keys):
+    old = frame(range(10))
+    new = frame(new_keys, tag='-new')
+    rows, counts = apply_plan(old, new)
+    assert rows == sorted(new.values.tolist())
+    assert counts['deleted'] == len(set(range(10)) - set(new_keys))
+
+def test_many_deletions_at_the_bottom_plan_quickly():
+    old = frame(range(200_000))
+    new = old.iloc[:150_000]
+    start = time.perf_counter()
+    writes, layout, counts = plan_sync(snapshot_of(old), row_keys(new['Key']), row_hashes(new))
+    assert time.perf_counter() - start < 5
+    assert (writes, len(layout), counts['deleted']) == ({}, 150_000, 50_000)
+
+def test_second_write_only_sends_the_changes():
+    sheet = FakeWorksheet(rows=[['stale']])
+    assert write_report(sheet, frame(range(5)), HEADERS, 'Key') is None
+    counts = write_report(sheet, frame([0, 1, 3, 4, 5]), HEADERS, 'Key')
+    assert (counts['inserted'], counts['deleted']) == (1, 1)
+    assert sorted(sheet.rows[1:]) == sorted(frame([0, 1, 3, 4, 5]).values.tolist())
+
+def test_a_full_rewrite_retries_the_header():
+    sheet = FakeWorksheet(rows=[['stale']], failures={('batch_update', 1): 503})
+    write_report(sheet, frame(range(3)), HEADERS, 'Key')
+    assert sheet.rows == [HEADERS] + frame(range(3)).values.tolist()
+    assert sheet.calls['batch_update'] == 2
+
+def test_a_full_rewrite_does_not_repeat_a_batch_whose_reply_was_lost():
+    sheet = FakeWorksheet(rows=[['stale']], lost_replies={('append_rows', 1): 503})
+    write_report(sheet, frame(range(3)), HEADERS, 'Key')
+    assert sheet.rows == [HEADERS] + frame(range(3)).values.tolist()
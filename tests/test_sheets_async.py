@@ -0,0 +1,167 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from types import SimpleNamespace
+
+import pytest
+from gspread.exceptions import APIError
+
+import upload
+from benchmarks.sheets_api import SheetsAPIStandIn
+from sheets import SheetsPool
+from sheets_async import AsyncSheetsClient, SheetsRequestError, open_worksheets
+from upload import UploadJournal, next_row_after, upload_rows
+
+HEADERS = ['Email', 'First Name']
+KEY = 'key'
+
+def make_rows(count, tag='row'):
+    return [[f'{tag}{i}@example.com', f'Name{i}'] for i in range(count)]
+
+@pytest.fixture
+def api():
+    api = SheetsAPIStandIn()
+    api.add_spreadsheet(KEY, {'Existing': [HEADERS]})
+    return api
+
+def run(api, work, max_concurrency=4):
+    """Run work(client) against the stand-in; returns its result and the statuses that were retried."""
+    retries = []
+
+    async def main(url):
+        async with AsyncSheetsClient(lambda: 'token', url, max_concurrency,
+                                     on_retry=lambda error, attempt, delay: retries.append(error.status),
+                                     sleep=lambda delay: asyncio.sleep(0)) as client:
+            return await work(client)
+
+    with api as url:
+        return asyncio.run(main(url)), retries
+
+def test_opens_existing_and_creates_missing_worksheets(api):
+    titles = ['Existing', 'New 1', "O'Brien"]
+    found, _ = run(api, lambda client: open_worksheets(client, KEY, titles, headers=HEADERS))
+    assert list(found) == titles
+    assert found['Existing']['sheetId'] == 1
+    assert api.rows(KEY, 'New 1') == [HEADERS]
+    assert api.rows(KEY, "O'Brien") == [HEADERS]
+
+def test_without_headers_missing_worksheets_are_left_out(api):
+    found, _ = run(api, lambda client: open_worksheets(client, KEY, ['Existing', 'Missing']))
+    assert list(found) == ['Existing']
+    assert list(api.spreadsheets[KEY]) == ['Existing']
+
+def test_requests_in_flight_keep_to_the_cap(api):
+    api.latency = 0.02
+    titles = [f'Store_{n}' for n in range(12)]
+    run(api, lambda client: open_worksheets(client, KEY, titles, headers=HEADERS), max_concurrency=3)
+    assert api.max_in_flight == 3
+    assert api.connections <= 3
+
+def test_appends_continue_below_the_last_batch(api):
+    rows = make_rows(25)
+
+    async def append(client):
+        next_row = None
+        for start in range(0, len(rows), 10):
+            response = await client.append_rows(KEY, 'Existing', rows[start:start + 10], next_row)
+            next_row = next_row_after(response, next_row)
+        return next_row
+
+    next_row, _ = run(api, append)
+    assert next_row == 27
+    assert api.rows(KEY, 'Existing') == [HEADERS] + rows
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_transient_errors_are_retried(api, status):
+    # The first request lists the worksheets
+    api.failures = {1: status, 2: status}
+    found, retries = run(api, lambda client: open_worksheets(client, KEY, ['Existing']))
+    assert list(found) == ['Existing']
+    assert retries == [status, status]
+
+def test_client_errors_are_not_retried(api):
+    with pytest.raises(SheetsRequestError) as error:
+        run(api, lambda client: client.row_values(KEY, 'Missing', 1))
+    assert error.value.status == 400
+    assert api.requests == 1
+
+def test_a_created_worksheet_is_not_added_twice(api):
+    # addSheet goes through but its reply is lost; the worksheets are listed again instead of resending it
+    api.lost_replies = {2: 503}
+    found, retries = run(api, lambda client: open_worksheets(client, KEY, ['New'], headers=HEADERS))
+    assert retries == [503]
+    assert found['New']['title'] == 'New'
+    assert api.rows(KEY, 'New') == [HEADERS]
+
+def test_a_worksheet_that_was_not_created_is_added_again(api):
+    api.failures = {2: 503}
+    found, _ = run(api, lambda client: open_worksheets(client, KEY, ['New'], headers=HEADERS))
+    assert found['New']['title'] == 'New'
+    assert api.requests == 5
+
+def test_an_applied_append_is_not_sent_again(api):
+    rows = make_rows(10)
+    api.lost_replies = {1: 500}
+    response, retries = run(api, lambda client: client.append_rows(KEY, 'Existing', rows, start_row=2))
+    assert (next_row_after(response), retries) == (12, [500])
+    assert api.rows(KEY, 'Existing') == [HEADERS] + rows
+
+def test_an_append_that_was_not_applied_is_sent_again(api):
+    rows = make_rows(10)
+    api.failures = {1: 500}
+    response, _ = run(api, lambda client: client.append_rows(KEY, 'Existing', rows, start_row=2))
+    assert next_row_after(response) == 12
+    assert api.rows(KEY, 'Existing') == [HEADERS] + rows
+
+def test_an_unpinned_append_is_only_retried_after_a_429(api):
+    rows = make_rows(10)
+    api.failures = {1: 429}
+    api.lost_replies = {2: 503}
+    with pytest.raises(SheetsRequestError) as error:
+        run(api, lambda client: client.append_rows(KEY, 'Existing', rows))
+    assert error.value.status == 503
+    assert api.rows(KEY, 'Existing') == [HEADERS] + rows
+
+def connect():
+    """A stand-in for an authorized gspread client: a valid token, and spreadsheets that are only an id."""
+    return SimpleNamespace(auth=SimpleNamespace(valid=True, token='token'),
+                           open_by_key=lambda key: SimpleNamespace(client=None, id=key))
+
+def test_pool_opens_worksheets_through_the_async_client(api):
+    with api as url:
+        pool = SheetsPool(connect, url, max_concurrency=2)
+        worksheets = pool.worksheets(KEY, ['Existing', 'New'], headers=HEADERS)
+        assert [worksheet.title for worksheet in worksheets] == ['Existing', 'New']
+        # Opened worksheets are cached
+        assert pool.worksheets(KEY, ['Existing', 'New'], headers=HEADERS) == worksheets
+    assert api.requests == 3
+    assert api.rows(KEY, 'New') == [HEADERS]
+
+def test_uploads_to_pooled_worksheets_go_through_the_async_client(api, tmp_path, monkeypatch):
+    monkeypatch.setattr(upload, 'JOURNAL_DIR', str(tmp_path))
+    monkeypatch.setattr(upload, 'backoff_delay', lambda attempt: 0)
+    rows = {title: make_rows(25, tag=title) for title in ['Store_1', 'Store_2', 'Store_3']}
+    # Requests 2-7 create the worksheets; of the appends after them one is rate limited, and
+    # the reply to one of the last is lost after its rows are written
+    api.failures = {12: 429}
+    api.lost_replies = {16: 503}
+    with api as url:
+        pool = SheetsPool(connect, url, max_concurrency=3)
+        worksheets = pool.worksheets(KEY, list(rows), headers=HEADERS)
+        with ThreadPoolExecutor(3) as threads:
+            results = list(threads.map(lambda worksheet: upload_rows(worksheet, [rows[worksheet.title]], 10),
+                                       worksheets))
+    assert results == [(25, 0, 3)] * 3
+    for title, written in rows.items():
+        assert api.rows(KEY, title) == [HEADERS] + written
+    # One list, six writes to create the worksheets, nine appends, one retry and one row read
+    assert api.requests == 18
+    assert api.max_in_flight <= 3
+
+def test_pooled_worksheets_fail_like_gspread(api, tmp_path, monkeypatch):
+    monkeypatch.setattr(upload, 'JOURNAL_DIR', str(tmp_path))
+    with api as url:
+        worksheet, = SheetsPool(connect, url).worksheets(KEY, ['Existing'])
+        api.spreadsheets[KEY].pop('Existing')
+        with pytest.raises(APIError) as error:
+            upload_rows(worksheet, [make_rows(5)], 10)
+    assert error.value.response.status_code == 400
@@ -0,0 +1,72 @@
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from text_kernels import (
+    extract_first_name, extract_first_names, format_name, format_names, normalize_email, normalize_emails
+)
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+NAMES = [
+    'john smith', '  MARY   anne ', "o'neil", 'mary-jane DOE', 'jOsÉ garcía', 'straße', 'a\x1cb', '',
+    'van der berg', np.nan, None,
+]
+FULL_NAMES = ['SMITH, john', 'garcia,  maria ', 'Nguyen', ' kim ', 'Łukasz, nowak', 'a,b,c', ',', '', np.nan, None]
+EMAILS = [' John.Smith@Example.COM', 'mary@example.com ', 'JOSÉ@Example.com', '', np.nan, None]
+
+# Object columns, Arrow-backed strings (compact mode's high-cardinality text) and categoricals
+DTYPES = [object, 'string[pyarrow]', 'category']
+
+def as_plain(series):
+    """Values as Python objects with every kind of missing value as None, for comparing across dtypes."""
+    return [None if pd.isna(value) else value for value in series.astype(object)]
+
+@pytest.mark.parametrize('dtype', DTYPES)
+def test_format_names_matches_format_name(dtype):
+    series = pd.Series(NAMES, dtype=dtype)
+    expected = pd.Series(NAMES, dtype=object).apply(format_name)
+    assert as_plain(format_names(series)) == as_plain(expected)
+
+@pytest.mark.parametrize('dtype', DTYPES)
+def test_extract_first_names_matches_extract_first_name(dtype):
+    series = pd.Series(FULL_NAMES, dtype=dtype)
+    expected = pd.Series(FULL_NAMES, dtype=object).apply(extract_first_name)
+    assert as_plain(extract_first_names(series)) == as_plain(expected)
+
+@pytest.mark.parametrize('dtype', DTYPES)
+def test_normalize_emails_matches_str_methods(dtype):
+    series = pd.Series(EMAILS, dtype=dtype)
+    expected = pd.Series(EMAILS, dtype=object).str.lower().str.strip()
+    assert as_plain(normalize_emails(series)) == as_plain(expected)
+    assert as_plain(normalize_emails(series)) == as_plain(pd.Series(EMAILS, dtype=object).apply(normalize_email))
+
+def test_format_names_matches_str_methods_on_ascii():
+    series = pd.Series(['john smith', '  MARY   anne ', 'van der BERG'])
+    expected = series.str.split().apply(lambda words: ' '.join(pd.Series(words).str.capitalize()))
+    assert format_names(series).tolist() == expected.tolist()
+    assert format_names(series.astype('string[pyarrow]')).tolist() == expected.tolist()
+
+def test_object_input_stays_object():
+    result = format_names(pd.Series(['john smith', None]))
+    assert result.dtype == object
+    assert result.tolist() == ['John Smith', None]
+
+def test_arrow_input_stays_in_arrow():
+    result = extract_first_names(pd.Series(['SMITH, john', None], dtype='string[pyarrow]'))
+    assert 'pyarrow' in str(result.dtype)
+    assert result.tolist() == ['John', '']
+
+def test_all_missing_column():
+    series = pd.Series([np.nan, np.nan])
+    assert as_plain(format_names(series)) == as_plain(series.apply(format_name))
+    assert extract_first_names(series).tolist() == ['', '']
+
+def test_loading_the_processes_does_not_import_arrow():
+    # pandas may load pyarrow itself, so block it and check the processes still import
+    code = "import sys; sys.modules['pyarrow'] = None; import processes"
+    subprocess.run([sys.executable, '-c', code], cwd=ROOT, check=True)
@@ -0,0 +1,127 @@
+import pytest
+from gspread.exceptions import APIError
+
+from sinks import FakeWorksheet
+from upload import UploadJournal, upload_rows
+
+HEADER = ['Email', 'First Name']
+
+def make_rows(count, tag='row'):
+    return [[f'{tag}{i}@example.com', f'Name{i}'] for i in range(count)]
+
+def upload(sheet, journal_path, rows, **options):
+    """One run of the upload, reading the journal from disk as a fresh run would."""
+    options.setdefault('sleep', lambda delay: None)
+    return upload_rows(sheet, [rows], batch_size=10, journal=UploadJournal(str(journal_path)), **options)
+
+def test_uploads_in_batches_and_removes_the_journal(tmp_path):
+    sheet = FakeWorksheet(rows=[HEADER])
+    rows = make_rows(35)
+    assert upload(sheet, tmp_path / 'journal.json', rows) == (35, 0, 4)
+    assert sheet.rows == [HEADER] + rows
+    assert sheet.calls['append_rows'] == 4
+    assert not (tmp_path / 'journal.json').exists()
+
+def test_resumes_after_a_failure_without_duplicate_batches(tmp_path):
+    # The third batch is refused for good, so the run stops after two
+    sheet = FakeWorksheet(rows=[HEADER], failures={('append_rows', 3): 400})
+    rows = make_rows(35)
+    with pytest.raises(APIError):
+        upload(sheet, tmp_path / 'journal.json', rows)
+    assert sheet.rows == [HEADER] + rows[:20]
+    assert len(UploadJournal(str(tmp_path / 'journal.json')).batches) == 2
+
+    uploaded, skipped, batch_count = upload(sheet, tmp_path / 'journal.json', rows)
+    assert (uploaded, skipped, batch_count) == (15, 20, 4)
+    assert sheet.rows == [HEADER] + rows
+    assert not (tmp_path / 'journal.json').exists()
+
+def test_resumed_batches_are_pinned_below_the_last_written_row(tmp_path):
+    sheet = FakeWorksheet(rows=[HEADER], failures={('append_rows', 2): 400})
+    rows = make_rows(20)
+    with pytest.raises(APIError):
+        upload(sheet, tmp_path / 'journal.json', rows)
+    assert UploadJournal(str(tmp_path / 'journal.json')).next_row == 12
+    upload(sheet, tmp_path / 'journal.json', rows)
+    assert sheet.rows == [HEADER] + rows
+
+def test_a_stop_between_batches_resumes_from_the_next_batch(tmp_path):
+    sheet = FakeWorksheet(rows=[HEADER])
+    rows = make_rows(30)
+    seen = []
+
+    def stop_after_two(row_count):
+        seen.append(row_count)
+        if len(seen) == 2:
+            raise KeyboardInterrupt
+
+    with pytest.raises(KeyboardInterrupt):
+        upload(sheet, tmp_path / 'journal.json', rows, on_batch=stop_after_two)
+    assert upload(sheet, tmp_path / 'journal.json', rows) == (10, 20, 3)
+    assert sheet.rows == [HEADER] + rows
+
+def test_different_data_starts_a_new_upload(tmp_path):
+    sheet = FakeWorksheet(rows=[HEADER], failures={('append_rows', 2): 400})
+    with pytest.raises(APIError):
+        upload(sheet, tmp_path / 'journal.json', make_rows(20))
+    other = make_rows(20, tag='other')
+    assert upload(sheet, tmp_path / 'journal.json', other) == (20, 0, 2)
+    assert sheet.rows == [HEADER] + make_rows(20)[:10] + other
+
+@pytest.mark.parametrize('status', [429, 503])
+def test_transient_errors_are_retried(tmp_path, status):
+    sheet = FakeWorksheet(rows=[HEADER], failures={('append_rows', 2): status, ('append_rows', 3): status})
+    rows = make_rows(30)
+    retries = []
+    delays = []
+    result = upload(sheet, tmp_path / 'journal.json', rows,
+                    on_retry=lambda error, attempt, delay: retries.append((error.response.status_code, attempt)),
+                    sleep=delays.append)
+    assert result == (30, 0, 3)
+    assert retries == [(status, 1), (status, 2)]
+    assert len(delays) == 2
+    assert sheet.rows == [HEADER] + rows
+
+def test_client_errors_are_not_retried(tmp_path):
+    sheet = FakeWorksheet(rows=[HEADER], failures={('append_rows', 1): 400})
+    retries = []
+    with pytest.raises(APIError):
+        upload(sheet, tmp_path / 'journal.json', make_rows(10), on_retry=lambda *args: retries.append(args))
+    assert retries == []
+    assert sheet.calls['append_rows'] == 1
+
+def test_gives_up_after_the_last_attempt(tmp_path):
+    failures = {('append_rows', call): 429 for call in range(1, 7)}
+    sheet = FakeWorksheet(rows=[HEADER], failures=failures)
+    with pytest.raises(APIError):
+        upload(sheet, tmp_path / 'journal.json', make_rows(10))
+    assert sheet.calls['append_rows'] == 6
+    assert sheet.rows == [HEADER]
+
+def test_a_written_batch_whose_reply_was_lost_is_not_sent_again(tmp_path):
+    sheet = FakeWorksheet(rows=[HEADER], lost_replies={('append_rows', 2): 503})
+    rows = make_rows(30)
+    assert upload(sheet, tmp_path / 'journal.json', rows) == (30, 0, 3)
+    assert sheet.rows == [HEADER] + rows
+    assert sheet.calls['append_rows'] == 3
+
+def test_a_batch_that_was_not_written_is_sent_again_after_checking(tmp_path):
+    sheet = FakeWorksheet(rows=[HEADER], failures={('append_rows', 2): 503})
+    rows = make_rows(30)
+    assert upload(sheet, tmp_path / 'journal.json', rows) == (30, 0, 3)
+    assert sheet.rows == [HEADER] + rows
+    assert sheet.calls['row_values'] == 1
+
+def test_the_first_batch_is_only_sent_again_after_a_429(tmp_path):
+    # Without a row to check, a lost reply can't be told apart from a failed append
+    sheet = FakeWorksheet(rows=[HEADER], lost_replies={('append_rows', 1): 503})
+    with pytest.raises(APIError):
+        upload(sheet, tmp_path / 'journal.json', make_rows(10))
+    assert sheet.rows == [HEADER] + make_rows(10)
+    assert sheet.calls['append_rows'] == 1
+
+def test_a_known_start_row_pins_the_first_batch(tmp_path):
+    sheet = FakeWorksheet(rows=[HEADER], lost_replies={('append_rows', 1): 503})
+    rows = make_rows(10)
+    assert upload(sheet, tmp_path / 'journal.json', rows, start_row=2) == (10, 0, 1)
+    assert sheet.rows == [HEADER] + rows
@@ -0,0 +1,65 @@
+import io
+from datetime import datetime
+
+import pandas as pd
+import pytest
+from openpyxl import Workbook
+from openpyxl.utils.datetime import CALENDAR_MAC_1904
+
+from xlsx_reader import read_xlsx
+
+def workbook(rows, date1904=False):
+    book = Workbook()
+    if date1904:
+        book.epoch = CALENDAR_MAC_1904
+    sheet = book.active
+    for row in rows:
+        sheet.append(row)
+    buffer = io.BytesIO()
+    book.save(buffer)
+    return buffer.getvalue()
+
+def assert_matches_read_excel(data, has_headers=True, usecols=None, nrows=None):
+    expected = pd.read_excel(io.BytesIO(data), header=0 if has_headers else None, usecols=usecols, nrows=nrows)
+    actual = read_xlsx(data, has_headers, usecols=usecols, nrows=nrows)
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False)
+    return actual
+
+EXPORT = [
+    ['Email', 'First Name', 'Joined', 'Active', 'Store'],
+    ['ann@example.com', 'Ann', datetime(2024, 1, 5, 9, 30), True, 12],
+    ['bob@example.com', 'Bob', datetime(2023, 12, 31), None, 7.5],
+    ['N/A', 'NULL', None, False, None],
+    ['cy@example.com', 'nan', datetime(1999, 2, 28), True, 3],
+]
+
+@pytest.mark.parametrize('date1904', [False, True])
+def test_dates_booleans_with_gaps_and_na_strings(date1904):
+    frame = assert_matches_read_excel(workbook(EXPORT, date1904=date1904))
+    assert frame['Joined'].iloc[0] == pd.Timestamp(2024, 1, 5, 9, 30)
+    assert frame['Email'].isna().tolist() == [False, False, True, False]
+
+@pytest.mark.parametrize('header', [
+    ['a', 'a', 'a.1'],
+    ['a', None, 'a', ''],
+    ['Name', 'Name', 'Name', 'Name.1'],
+])
+def test_duplicate_and_blank_headers(header):
+    rows = [header, list(range(len(header))), list(range(10, 10 + len(header)))]
+    assert_matches_read_excel(workbook(rows))
+
+def test_usecols_keeps_the_named_columns():
+    frame = assert_matches_read_excel(workbook(EXPORT), usecols=['Email', 'Store'])
+    assert list(frame.columns) == ['Email', 'Store']
+
+@pytest.mark.parametrize('nrows', [0, 1, 3, 10])
+def test_nrows(nrows):
+    assert_matches_read_excel(workbook(EXPORT), nrows=nrows)
+
+def test_files_without_headers():
+    frame = assert_matches_read_excel(workbook(EXPORT[1:]), has_headers=False)
+    assert list(frame.columns) == [0, 1, 2, 3, 4]
+    assert_matches_read_excel(workbook(EXPORT[1:]), has_headers=False, nrows=2)
+
+def test_trailing_empty_rows_are_dropped():
+    assert_matches_read_excel(workbook(EXPORT[:3] + [[None] * 5, [None] * 5]))
@@ -0,0 +1,152 @@
+import numpy as np
+import pandas as pd
+
+# Python's str.split()/strip() treat these ASCII separators as whitespace, Arrow's ASCII kernels don't
+_PY_ONLY_WHITESPACE = '[\x1c-\x1f]'
+_PY_ONLY_WHITESPACE_BYTES = b'\x1c\x1d\x1e\x1f'
+
+def format_name(name):
+    """Format name to capitalize only the first letter of each word."""
+    if pd.isna(name):
+        return name
+    # Split the name into words and capitalize only the first letter
+    return ' '.join(word.lower().capitalize() for word in str(name).split())
+
+def extract_first_name(full_name):
+    """Extract first name from 'Last, First' format or return the name if it's a single name."""
+    if isinstance(full_name, str):
+        if ',' in full_name:
+            return full_name.split(',')[1].strip().title()
+        else:
+            # Handle single name (no comma)
+            return full_name.strip().title()
+    return ""
+
+def normalize_email(email):
+    """Lowercase and trim an email address, passing missing values through as NaN."""
+    if isinstance(email, str):
+        return email.lower().strip()
+    return np.nan
+
+def _needs_scalar_path(strings):
+    """Return a mask of non-null strings the ASCII kernels can't reproduce exactly, or None if there are none."""
+    import pyarrow.compute as pc
+
+    data = strings.buffers()[2]
+    raw = data.to_pybytes() if data is not None else b''
+    # Whole-buffer scans settle the common cases without per-row work
+    all_ascii = raw.isascii()
+    has_separators = any(byte in raw for byte in _PY_ONLY_WHITESPACE_BYTES)
+    if all_ascii and not has_separators:
+        return None
+
+    unsafe = None
+    if not all_ascii:
+        unsafe = pc.invert(pc.string_is_ascii(strings))
+    if has_separators:
+        separators = pc.match_substring_regex(strings, _PY_ONLY_WHITESPACE)
+        unsafe = separators if unsafe is None else pc.or_(unsafe, separators)
+    return unsafe.fill_null(False).to_numpy(zero_copy_only=False)
+
+def map_categories(series, mapper, missing):
+    """Apply mapper, a function of an object Series, to a categorical Series's categories only.
+
+    Each distinct value is mapped once and the results are spread over the rows by their
+    category codes; missing is the result for missing values. The result is categorical
+    again, so a low-cardinality column stays compact through a transform.
+    """
+    categories = pd.Series(series.cat.categories.to_numpy(dtype=object))
+    mapped = np.append(mapper(categories).to_numpy(dtype=object), np.array([missing], dtype=object))
+    mapped_codes, uniques = pd.factorize(mapped)
+    # Missing rows have code -1, which picks the result appended for them last
+    codes = mapped_codes[series.cat.codes.to_numpy()]
+    return pd.Series(pd.Categorical.from_codes(codes, uniques), index=series.index, name=series.name)
+
+def _map_text(series, kernel, scalar, null_result=None):
+    """Apply an Arrow kernel to plain-ASCII strings and the scalar function to everything else.
+
+    The Arrow kernels reproduce the scalar functions exactly on ASCII text; non-ASCII
+    strings and missing values are patched in with the scalar function itself, so the
+    result is identical to series.apply(scalar). Arrow-backed string columns stay in
+    Arrow end to end, categoricals are mapped once per category and stay categorical,
+    and object columns come back as object columns. null_result is what scalar returns
+    for missing values (None keeps them missing).
+    """
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return map_categories(
+            series, lambda categories: _map_text(categories, kernel, scalar, null_result), scalar(None)
+        )
+    # Imported here so importing the kernels doesn't load Arrow before a column is transformed
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    arrow_backed = isinstance(series.dtype, pd.ArrowDtype) or getattr(series.dtype, 'storage', None) == 'pyarrow'
+    try:
+        # string[pyarrow] columns hand over large_string, which some of the kernels have no variant for
+        strings = pa.array(series, type=pa.string(), from_pandas=True).cast(pa.string())
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Mixed or non-text columns are rare enough to keep on the per-row path
+        return series.apply(scalar)
+
+    result = kernel(strings)
+    unsafe = _needs_scalar_path(strings)
+
+    if arrow_backed:
+        if null_result is not None:
+            result = result.fill_null(null_result)
+        if unsafe is not None and unsafe.any():
+            patched = [scalar(value) for value in strings.filter(pa.array(unsafe)).to_pylist()]
+            result = pc.replace_with_mask(result, pa.array(unsafe), pa.array(patched, type=pa.string()))
+        return pd.Series(pd.arrays.ArrowExtensionArray(result), index=series.index, name=series.name)
+
+    values = series.to_numpy(dtype=object)
+    out = result.to_numpy(zero_copy_only=False)
+    redo = strings.is_null().to_numpy(zero_copy_only=False)
+    if unsafe is not None:
+        redo |= unsafe
+    redo = np.flatnonzero(redo)
+    if len(redo):
+        out[redo] = [scalar(value) for value in values[redo]]
+
+    series = pd.Series(out, index=series.index, name=series.name)
+    # Only an all-missing column can infer to something other than object, as apply() would
+    return series.infer_objects() if len(redo) == len(out) else series
+
+def _capitalize_words(strings):
+    """Arrow equivalent of ' '.join(word.lower().capitalize() for word in s.split())."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    words = pc.ascii_split_whitespace(pc.ascii_trim_whitespace(strings))
+    # Offsets index into the child values, so capitalize those rather than a flattened copy
+    capitalized = pc.ascii_capitalize(words.values)
+    rebuilt = pa.ListArray.from_arrays(words.offsets, capitalized, mask=words.is_null())
+    return pc.binary_join(rebuilt, ' ')
+
+def _first_name(strings):
+    """Arrow equivalent of extract_first_name for strings."""
+    import pyarrow.compute as pc
+
+    # Prefix comma-free names with a comma so split(',')[1] is the whole name for them too
+    has_comma = pc.match_substring(strings, ',')
+    prefixed = pc.if_else(has_comma, strings, pc.binary_join_element_wise(',', strings, ''))
+    second = pc.list_element(pc.split_pattern(prefixed, ',', max_splits=2), 1)
+    return pc.ascii_title(pc.ascii_trim_whitespace(second))
+
+def _email(strings):
+    """Arrow equivalent of normalize_email for strings."""
+    import pyarrow.compute as pc
+
+    return pc.ascii_trim_whitespace(pc.ascii_lower(strings))
+
+def format_names(series):
+    """Vectorized format_name over a Series."""
+    return _map_text(series, _capitalize_words, format_name)
+
+def extract_first_names(series):
+    """Vectorized extract_first_name over a Series."""
+    return _map_text(series, _first_name, extract_first_name, null_result="")
+
+def normalize_emails(series):
+    """Vectorized normalize_email over a Series."""
+    return _map_text(series, _email, normalize_email)
@@ -0,0 +1,125 @@
+import pandas as pd
+
+from center_hours import next_open_dates
+from date_inference import parse_dates
+from metrics import span
+from text_kernels import extract_first_names, format_names, map_categories, normalize_emails
+
+# Facility code → full center name mapping
+FACILITY_MAPPING = {
+    'OLX': 'MELROSE',
+    'OLW': 'PARKCHESTER',
+    'OLL': 'HOWARD_BEACH',
+    'OLK': 'BROWNSVILLE',
+    'OLJ': 'JAMAICA',
+    'OLF': 'FLATBUSH',
+    'OLB': 'CLINTON_HILL',
+    'HPF': 'FT_PIERCE',
+    'OLH': 'EASTHARLEM',
+    'OLG': 'FORDHAM',
+}
+
+def compile_transform(outputs):
+    """Compile an output spec into a transform over only the mapped columns.
+
+    outputs lists (header, column argument, kernel) triples; the transform builds each
+    output column in one vectorized pass over its mapped input column, applying the
+    kernel when there is one, and takes the column mapping as keyword arguments.
+    """
+    def transform(df, **columns):
+        with span('transform', rows=len(df)):
+            return pd.DataFrame({
+                header: df[columns[argument]] if kernel is None else kernel(df[columns[argument]])
+                for header, argument, kernel in outputs
+            })
+    return transform
+
+def transform_certo_market_visits(df, name_col, email_col, phone_col, reg_date_col, first_order_col, spent_col, date_formats=(None, None)):
+    """Build the Certo Market Visits Report output frame from the mapped columns.
+
+    date_formats holds the registration and first order date formats; None infers them from df.
+    """
+    with span('transform', rows=len(df)):
+        reg_dates = parse_dates(df[reg_date_col], date_formats[0])[0]
+        first_order_dates = parse_dates(df[first_order_col], date_formats[1])[0]
+        # Convert dates to string format before creating DataFrame
+        return pd.DataFrame({
+            'Name': format_names(df[name_col]),
+            'Email': normalize_emails(df[email_col]),
+            'Phone': df[phone_col],
+            'Registered Date': reg_dates.dt.strftime('%Y-%m-%d'),
+            'First Order Date': first_order_dates.dt.strftime('%Y-%m-%d'),
+            'Spent $': df[spent_col]
+        })
+
+
+def get_center_name(facility_code):
+    """Get full center name from facility code."""
+    if pd.isna(facility_code):
+        return "UNKNOWN"
+    return FACILITY_MAPPING.get(facility_code.strip().upper(), "UNKNOWN")
+
+def get_center_names(facility_codes):
+    """Get full center names for a whole Series of facility codes."""
+    if isinstance(facility_codes.dtype, pd.CategoricalDtype):
+        return map_categories(facility_codes, get_center_names, "UNKNOWN")
+    return facility_codes.astype(str).str.strip().str.upper().map(FACILITY_MAPPING).fillna("UNKNOWN")
+
+def schedule_donations(df, donor_name_col, facility_col, weekmasks, donor_account_col=None, donor_phone_col=None):
+    """Build the donation schedule output frame; df's 'Donation Date' column must already be parsed."""
+    df['Donor Name'] = df[donor_name_col]
+    df['Facility'] = df[facility_col]
+    # Add donor account and phone if provided
+    if donor_account_col:
+        df['Donor Account'] = df[donor_account_col]
+    if donor_phone_col:
+        df['Donor Phone'] = df[donor_phone_col]
+    df['First_Name'] = extract_first_names(df['Donor Name'])
+    df['Center_Name'] = get_center_names(df['Facility'])
+    
+    df['Next_Donation_Date'] = next_open_dates(
+        df['Donation Date'],
+        df['Center_Name'].str.replace(" ", "_").str.upper(),
+        weekmasks
+    )
+    
+    # Convert date.date to string to avoid serialization issues
+    df['Date_to_Send'] = df['Next_Donation_Date'].dt.strftime('%Y-%m-%d')
+    
+    # Create the output dataframe with all necessary columns
+    output_columns = ['Donor Name', 'First_Name']
+    
+    # Add optional columns if they exist
+    if 'Donor Account' in df.columns:
+        output_columns.append('Donor Account')
+    if 'Donor Phone' in df.columns:
+        output_columns.append('Donor Phone')
+        
+    # Add remaining columns
+    output_columns.extend(['Facility', 'Center_Name', 'Donation Date', 
+                          'Next_Donation_Date', 'Date_to_Send'])
+    
+    # Output for Google Sheet
+    return df[output_columns]
+
+def filter_new_donors(df, donor_status_col):
+    """Keep only the donors whose status is NEW, in any case."""
+    with span('filter_new_donors', rows=len(df)):
+        return df[df[donor_status_col].str.upper() == 'NEW']
+
+def transform_donations(df, donor_name_col, donation_date_col, facility_col, donor_account_col=None,
+                        donor_phone_col=None, donor_status_col=None, weekmasks=None):
+    """Build the donation schedule from a raw export: keep NEW donors, parse the dates and schedule.
+
+    weekmasks are the compiled center hours; without them every follow-up falls back to
+    the minimum gap after the donation.
+    """
+    if donor_status_col:
+        df = filter_new_donors(df, donor_status_col)
+    df = df.copy(deep=False)
+    with span('parse_dates', rows=len(df)):
+        df['Donation Date'] = parse_dates(df[donation_date_col])[0]
+    with span('schedule', rows=len(df)):
+        return schedule_donations(
+            df, donor_name_col, facility_col, weekmasks or {}, donor_account_col, donor_phone_col
+        )
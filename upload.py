@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import random
+import re
+import time
+
+from metrics import span
+from settings import CACHE_DIR, UPLOAD_BATCH_SIZE
+
+# Statuses worth retrying: rate limiting and server-side failures
+RETRYABLE_STATUSES = {408, 429, 500, 502, 503, 504}
+
+# Statuses the API answers before doing anything, so even an append can be sent again
+REJECTED_STATUSES = {429}
+
+# Attempts per batch, and the backoff ceiling in seconds between them
+MAX_ATTEMPTS = 6
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 32.0
+
+JOURNAL_DIR = os.path.join(CACHE_DIR, 'upload_journals')
+
+def is_transient_error(error):
+    """Whether an append failure is worth retrying."""
+    # Imported here so the app starts without the HTTP client libraries
+    import requests
+    from gspread.exceptions import APIError
+    if isinstance(error, APIError):
+        return getattr(error.response, 'status_code', None) in RETRYABLE_STATUSES
+    return isinstance(error, (requests.exceptions.ConnectionError, requests.exceptions.Timeout))
+
+def backoff_delay(attempt, base=BACKOFF_BASE, cap=BACKOFF_MAX):
+    """Full-jitter exponential backoff: a random delay up to base * 2**attempt, capped."""
+    return random.uniform(0, min(cap, base * 2 ** attempt))
+
+def with_retries(call, attempts=MAX_ATTEMPTS, sleep=time.sleep, on_retry=None, idempotent=True, applied=None):
+    """Run call(), retrying transient failures with jittered exponential backoff.
+
+    A call that isn't idempotent, such as an append, may have been applied when it fails
+    with a server error or a dropped connection, so it is only sent again after a 429 or
+    once applied() returns None. If applied() returns anything else, the call went
+    through and that is returned instead.
+    """
+    check = False
+    for attempt in range(attempts):
+        if check:
+            result = applied()
+            if result is not None:
+                return result
+        try:
+            return call()
+        except Exception as e:
+            rejected = getattr(getattr(e, 'response', None), 'status_code', None) in REJECTED_STATUSES
+            if attempt == attempts - 1 or not is_transient_error(e) or not (idempotent or rejected or applied):
+                raise
+            check = not idempotent and not rejected
+            delay = backoff_delay(attempt)
+            if on_retry is not None:
+                on_retry(e, attempt + 1, delay)
+            sleep(delay)
+
+def append_rows_to_sheet(worksheet, rows, start_row=None):
+    """Append rows below the existing data without downloading the sheet.
+
+    Without start_row the Sheets append call finds the end of the table at A1 itself.
+    Returns the row after the last one written, so later appends in the same run can
+    be pinned directly below it.
+    """
+    response = worksheet.append_rows(
+        rows,
+        value_input_option='RAW',
+        insert_data_option='INSERT_ROWS',
+        table_range=f'A{start_row}' if start_row else 'A1'
+    )
+    return next_row_after(response, start_row)
+
+def next_row_after(response, start_row=None):
+    """The row below the range an append response says it wrote, or start_row if it doesn't say."""
+    # updatedRange looks like "'Sheet'!A101:F150"
+    updated_range = (response or {}).get('updates', {}).get('updatedRange', '')
+    match = re.search(r'(\d+)$', updated_range)
+    return int(match.group(1)) + 1 if match else start_row
+
+def rows_written_at(worksheet, rows, start_row):
+    """After an append pinned to start_row failed without a reply: the row below its rows if they were written, else None."""
+    if any(cell != '' for cell in worksheet.row_values(start_row)):
+        return start_row + len(rows)
+    return None
+
+def batch_hash(rows):
+    """Fingerprint a batch of rows so a resumed run can recognise it."""
+    payload = json.dumps(rows, default=str, separators=(',', ':')).encode('utf-8')
+    return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+def iter_batches(blocks, batch_size):
+    """Regroup blocks of rows (e.g. one per chunk) into batches of batch_size rows."""
+    pending = []
+    for rows in blocks:
+        pending.extend(rows)
+        while len(pending) >= batch_size:
+            yield pending[:batch_size]
+            pending = pending[batch_size:]
+    if pending:
+        yield pending
+
+class UploadJournal:
+    """On-disk record of the batches of an upload that Google Sheets has accepted.
+
+    There is one journal per worksheet. It holds the hash of every committed batch, in
+    order, and the row below the last one written. A run whose leading batches match the
+    journal skips them; a run with different data starts a new journal.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.batches = []
+        self.next_row = None
+        try:
+            with open(path, encoding='utf-8') as f:
+                entry = json.load(f)
+            self.batches = entry['batches']
+            self.next_row = entry['next_row']
+        except (OSError, ValueError, KeyError):
+            pass
+
+    @classmethod
+    def for_worksheet(cls, worksheet):
+        """Open the journal for a worksheet, keyed by spreadsheet and worksheet id."""
+        spreadsheet_id = getattr(getattr(worksheet, 'spreadsheet', None), 'id', 'local')
+        return cls(os.path.join(JOURNAL_DIR, f"{spreadsheet_id}_{worksheet.id}.json"))
+
+    def is_committed(self, index, digest):
+        """Whether batch number index of this run was already committed with the same content."""
+        return index < len(self.batches) and self.batches[index] == digest
+
+    def restart(self, index):
+        """Forget every batch from index on, because this run's data differs from the journal's."""
+        if index == 0:
+            self.next_row = None
+        del self.batches[index:]
+
+    def record(self, digest, next_row):
+        """Record a committed batch; the journal is written before the next batch is sent."""
+        self.batches.append(digest)
+        self.next_row = next_row
+        self._save()
+
+    def discard(self):
+        """Delete the journal, after a complete upload or when the worksheet is rewritten."""
+        self.batches = []
+        self.next_row = None
+        try:
+            os.remove(self.path)
+        except OSError:
+            pass
+
+    def _save(self):
+        """Write the journal atomically."""
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'batches': self.batches, 'next_row': self.next_row}, f)
+        os.replace(temp_path, self.path)
+
+def upload_rows(worksheet, blocks, batch_size=UPLOAD_BATCH_SIZE, journal=None, sleep=time.sleep, on_retry=None,
+                on_batch=None, start_row=None):
+    """Append blocks of rows to a worksheet in batches, resuming after an earlier failed run.
+
+    Each batch is retried on transient errors and recorded in the worksheet's journal once
+    accepted; batches the journal already holds are skipped. Batches after the first are
+    pinned below the last one, so after a failure without a reply the row they would
+    start at is read before sending them again. The first batch is pinned to start_row
+    when the caller knows where the data ends; otherwise it is only sent again after a
+    429. on_batch(row_count) is called after each batch is recorded, so an exception it
+    raises stops the upload at a point the next run resumes from. The journal is removed
+    when the upload completes. Returns (uploaded_rows, skipped_rows, batch_count); a
+    batch that still fails raises, leaving the journal for the next run.
+    """
+    journal = journal or UploadJournal.for_worksheet(worksheet)
+    uploaded = 0
+    skipped = 0
+    index = -1
+    next_row = journal.next_row
+    resuming = True
+    for index, rows in enumerate(iter_batches(blocks, batch_size)):
+        digest = batch_hash(rows)
+        if resuming and journal.is_committed(index, digest):
+            skipped += len(rows)
+            continue
+        if resuming:
+            # From here on this run sends everything
+            resuming = False
+            journal.restart(index)
+            next_row = journal.next_row or start_row
+
+        with span('append_rows', rows=len(rows)):
+            next_row = with_retries(
+                lambda: append_rows_to_sheet(worksheet, rows, next_row), sleep=sleep, on_retry=on_retry,
+                idempotent=False, applied=(lambda: rows_written_at(worksheet, rows, next_row)) if next_row else None
+            )
+        journal.record(digest, next_row)
+        uploaded += len(rows)
+        if on_batch is not None:
+            on_batch(len(rows))
+
+    journal.discard()
+    return uploaded, skipped, index + 1
@@ -1,80 +1,302 @@
+import json
+import os
+import time
+
 import pandas as pd
-import gspread
 import streamlit as st
-from oauth2client.service_account import ServiceAccountCredentials
+from settings import COMPACT_FRAMES, OUTPUT_SINK
+from sheets import SheetsPool, authorize, is_stale_handle_error
+from sinks import make_sink
+from jobs import JOBS, JobCancelled
+from metrics import span
+from serialize import iter_row_batches
+from upload import upload_rows
+from ingest import (
+    PARSE_CACHE, CHUNK_SIZE, file_bytes, content_hash, parse_bytes, iter_chunks,
+    sniff_dialect, describe_dialect, name_headerless_columns, mapped_usecols
+)
+
+# Rows parsed up front for the preview and column mapping
+PREVIEW_ROWS = 100
+
+# Seconds between refreshes of a page while its job runs
+JOB_POLL_SECONDS = 1.0
 
-def format_name(name):
-    """Format name to capitalize only the first letter of each word."""
-    if pd.isna(name):
-        return name
-    # Split the name into words and capitalize only the first letter
-    return ' '.join(word.lower().capitalize() for word in str(name).split())
+# Progress counters a job reports, as the page words them
+PROGRESS_LABELS = {
+    'rows_transformed': "rows processed",
+    'batches_uploaded': "batches uploaded",
+    'rows_uploaded': "rows uploaded",
+}
 
-def read_file(file, has_headers):
-    """Read file based on its extension."""
+def read_file(file, has_headers, delimiter=None, usecols=None, nrows=None, compact=COMPACT_FRAMES):
+    """Read file based on its extension, reusing the parse from a previous rerun when possible.
+
+    With compact the frame is stored in compact dtypes, which also shrinks the parse cache.
+    """
     try:
-        if file.name.endswith('.csv'):
-            return pd.read_csv(file, header=0 if has_headers else None)
-        elif file.name.endswith('.xlsx'):
-            return pd.read_excel(file, header=0 if has_headers else None)
-        elif file.name.endswith('.txt'):
-            # First try comma separator
-            try:
-                df = pd.read_csv(file, sep=',', header=0 if has_headers else None)
-                # Check if we got more than one column
-                if len(df.columns) > 1:
-                    return df
-            except:
-                pass
-            
-            # If comma didn't work, try tab separator
-            return pd.read_csv(file, sep='\t', header=0 if has_headers else None)
-        else:
-            raise ValueError("Unsupported file format. Please upload CSV, XLSX, or TXT file.")
+        with span('read_file') as parse_span:
+            data = file_bytes(file)
+            # The extension picks the reader (CSV, sniffed TXT, XLSX), so the same bytes parse differently per type
+            reader = os.path.splitext(file.name)[1].lower()
+            key = (
+                content_hash(data), reader, has_headers, delimiter, tuple(usecols) if usecols else None, nrows, compact
+            )
+            df = PARSE_CACHE.get(key)
+            if df is None:
+                df = parse_bytes(data, file.name, has_headers, delimiter, usecols=usecols, nrows=nrows, compact=compact)
+                PARSE_CACHE.put(key, df)
+            parse_span.rows = len(df)
+        # Hand out a shallow copy so callers adding or renaming columns don't touch the cached frame
+        return df.copy(deep=False)
     except Exception as e:
         raise ValueError(f"Error reading file: {str(e)}")
 
-def save_to_gsheets(df, worksheet):
+def detect_txt_dialect(file):
+    """Sniff the dialect of a .txt upload, returning it with a human-readable description."""
+    dialect = sniff_dialect(file_bytes(file))
+    return dialect, describe_dialect(dialect)
+
+def read_file_chunks(file, has_headers, delimiter=None, chunksize=CHUNK_SIZE, usecols=None, compact=COMPACT_FRAMES):
+    """Read a CSV/TXT file lazily in fixed-size chunks."""
+    data = file_bytes(file)
+    chunks = iter_chunks(data, file.name, has_headers, delimiter, chunksize, usecols=usecols, compact=compact)
+    while True:
+        # Time only the parsing; the caller's work on each chunk happens between the reads
+        with span('read_file') as parse_span:
+            chunk = next(chunks, None)
+            parse_span.rows = 0 if chunk is None else len(chunk)
+        if chunk is None:
+            return
+        if not has_headers:
+            chunk = name_headerless_columns(chunk)
+        yield chunk
+
+class UploadSource:
+    """An uploaded file read in two phases.
+
+    preview() parses only the header and the first rows for display and column mapping;
+    load() and chunks() read every row but only the columns that were mapped.
+    """
+
+    def __init__(self, file, has_headers, streaming=False):
+        self.file = file
+        self.has_headers = has_headers
+        self.streaming = streaming
+
+    def preview(self, nrows=PREVIEW_ROWS):
+        """Read the header and the first nrows rows."""
+        df = read_file(self.file, self.has_headers, nrows=nrows)
+        return df if self.has_headers else name_headerless_columns(df)
+
+    def load(self, columns):
+        """Read the whole file, limited to the given (mapped) columns."""
+        df = read_file(self.file, self.has_headers, usecols=self._usecols(columns))
+        return df if self.has_headers else name_headerless_columns(df)
+
+    def chunks(self, columns, chunksize=CHUNK_SIZE):
+        """Read the whole file in chunks, limited to the given (mapped) columns."""
+        return read_file_chunks(self.file, self.has_headers, chunksize=chunksize, usecols=self._usecols(columns))
+
+    def _usecols(self, columns):
+        return mapped_usecols(columns, self.has_headers)
+
+def find_column_by_pattern(columns, patterns):
+    """Find the index of a column that best matches the given patterns."""
+    # Try exact match first
+    for pattern in patterns:
+        for i, col in enumerate(columns):
+            if str(col).lower() == pattern:
+                return i
+    
+    # Then try contains match
+    for pattern in patterns:
+        for i, col in enumerate(columns):
+            if pattern in str(col).lower():
+                return i
+    
+    # Return first column as default
+    return 0
+
+def upload_callbacks(job):
+    """Return upload on_retry and on_batch callbacks reporting retries and progress through job.
+
+    on_batch is also where a cancelled job stops. Without a job both are None.
+    """
+    if job is None:
+        return None, None
+
+    def on_retry(error, attempt, delay):
+        job.note('warning', f"⚠️ Google Sheets didn't accept a batch ({str(error)}). Retrying in {delay:.1f}s (attempt {attempt})...")
+
+    def on_batch(row_count):
+        job.advance(batches_uploaded=1, rows_uploaded=row_count)
+
+    return on_retry, on_batch
+
+def save_to_gsheets(df, worksheet, dedupe=None, job=None):
     """Append dataframe to Google Sheets."""
+    return save_chunks_to_gsheets([df], worksheet, dedupe, job)
+
+def save_chunks_to_gsheets(chunks, worksheet, dedupe=None, job=None):
+    """Append processed chunks to Google Sheets in batches, resuming an interrupted upload.
+
+    With dedupe (a key_index.DedupeRun), only rows with new keys are uploaded and the
+    keys are recorded once the upload succeeds. Progress and retries are reported through
+    job when given. Returns a summary (total_rows, chunk_count, skipped and the dedupe
+    counts) so callers can report the result without keeping the processed data around;
+    a failed upload raises ValueError with a message for the user.
+    """
+    total_rows = 0
+    chunk_count = 0
+    on_retry, on_batch = upload_callbacks(job)
+
+    def blocks():
+        nonlocal total_rows, chunk_count
+        for chunk in chunks:
+            total_rows += len(chunk)
+            chunk_count += 1
+            if job is not None:
+                job.advance(rows_transformed=len(chunk))
+            if dedupe is not None:
+                chunk = dedupe.filter(chunk)
+            # Serialize in bounded batches rather than copying the whole chunk into lists
+            yield from iter_row_batches(chunk)
+
     try:
-        # Get the last row with data
-        last_row = len(worksheet.get_all_values())
-        
-        # Replace NaN values with empty strings
-        df_clean = df.fillna('')
-        
-        # Append new records starting from the next row
-        worksheet.append_rows(
-            df_clean.values.tolist(),
-            value_input_option='RAW',
-            insert_data_option='INSERT_ROWS',
-            table_range=f'A{last_row + 1}'
-        )
-        return True
+        uploaded, skipped, batch_count = upload_rows(worksheet, blocks(), on_retry=on_retry, on_batch=on_batch)
+    except JobCancelled:
+        raise
     except Exception as e:
-        st.error(f"Error saving to Google Sheets: {str(e)}")
-        return False
+        if is_stale_handle_error(e):
+            # Nothing was written; look the worksheet up again on the next run
+            SINK.forget_worksheet(worksheet)
+            raise ValueError(f"Error saving to Google Sheets: the worksheet was deleted or renamed ({str(e)}). Please try again.") from e
+        raise ValueError(f"Error saving to Google Sheets: {str(e)}. Processing the same file again resumes the upload.") from e
+
+    if skipped and job is not None:
+        job.note('info', f"ℹ️ Resumed an interrupted upload: {skipped} rows were already saved and skipped.")
+    summary = {'total_rows': total_rows, 'chunk_count': chunk_count, 'skipped': skipped, 'dedupe': None}
+    if dedupe is not None:
+        dedupe.commit()
+        summary['dedupe'] = {
+            'new': dedupe.new, 'duplicate_in_file': dedupe.duplicate_in_file, 'already_present': dedupe.already_present,
+        }
+    return summary
+
+def show_dedupe_summary(counts):
+    """Show how many rows were new, repeated within the file or already in the sheet."""
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.metric("New Rows Uploaded", counts['new'])
+    with col2:
+        st.metric("Duplicates in File", counts['duplicate_in_file'])
+    with col3:
+        st.metric("Already in Sheet", counts['already_present'])
+
+def show_stream_summary(total_rows, chunk_count, worksheet_name):
+    """Show the result of a streamed upload."""
+    st.success(f"✅ Data successfully processed and saved to {worksheet_name}!")
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.metric("Total Records", total_rows)
+    with col2:
+        st.metric("Chunks Uploaded", chunk_count)
+
+def start_job(process, work, *args, **kwargs):
+    """Run work(job, *args, **kwargs) on the shared job runner as this session's current job.
+
+    Jobs writing to the same worksheet run one after another, across sessions.
+    """
+    exclusive = (process.spreadsheet_key, process.worksheet_name)
+    st.session_state['job_id'] = JOBS.submit(process.label, work, *args, exclusive=exclusive, **kwargs)
+
+def job_running():
+    """Whether this session's current job is still queued or running (its page disables Process Data meanwhile)."""
+    job = JOBS.get(st.session_state.get('job_id'))
+    return job is not None and not job.finished
+
+def show_job(show_result):
+    """Show this session's current job: its messages and progress while it runs, then its result.
+
+    While the job runs the page reruns every JOB_POLL_SECONDS to refresh the progress.
+    The work itself runs on the job runner, so the script thread is free in between and
+    changing a widget neither stops nor repeats it. show_result renders a finished job's
+    result.
+    """
+    job = JOBS.get(st.session_state.get('job_id'))
+    if job is None:
+        return
+    status, progress, notes = job.snapshot()
+    for level, text in notes:
+        getattr(st, level)(text)
+
+    if status in ('queued', 'running'):
+        counts = ", ".join(
+            f"{progress[name]:,} {label}" for name, label in PROGRESS_LABELS.items() if name in progress
+        )
+        if job.cancel_requested:
+            st.info("⏹️ Cancelling...")
+        else:
+            st.info(f"⏳ {job.label} is {status}{': ' + counts if counts else '...'}")
+            st.button("Cancel", key=f"cancel_{job.id}", on_click=job.cancel)
+        time.sleep(JOB_POLL_SECONDS)
+        st.rerun()
+
+    if status == 'done':
+        show_result(job.result)
+    elif status == 'cancelled':
+        st.warning("⏹️ Cancelled. Processing the same file again finishes the upload.")
+    else:
+        st.error(f"❌ {str(job.error)}")
+    if job.run is not None:
+        show_run_metrics(job.run)
+
+def show_run_metrics(run):
+    """Show an expandable per-stage timing breakdown of a run, with a JSON export."""
+    stages = run.stages()
+    if not stages:
+        return
+    with st.expander(f"⏱️ Timing breakdown ({run.seconds:.1f}s)"):
+        table = pd.DataFrame(stages)
+        # Time spent outside any stage: messages, previews and other UI work
+        other = run.seconds - table['seconds'].sum()
+        if other > 0:
+            table = pd.concat([table, pd.DataFrame([{'stage': '(other)', 'seconds': other}])], ignore_index=True)
+        table['share'] = (100 * table['seconds'] / run.seconds).round(1) if run.seconds else None
+        columns = ['stage', 'seconds', 'share', 'calls', 'rows', 'rows_per_second', 'peak_mb', 'max_rss_mb']
+        table = table[[col for col in columns if table[col].notna().any()]]
+        st.dataframe(table.rename(columns={
+            'stage': 'Stage', 'seconds': 'Seconds', 'share': '% of Run', 'calls': 'Calls', 'rows': 'Rows',
+            'rows_per_second': 'Rows/s', 'peak_mb': 'Peak MB', 'max_rss_mb': 'Max RSS MB',
+        }).round(3), hide_index=True)
+        st.download_button(
+            "Download metrics (JSON)",
+            json.dumps(run.as_dict(), indent=2, default=str),
+            file_name=f"{run.process.lower().replace(' ', '_')}_{run.started:%Y%m%d_%H%M%S}_metrics.json",
+            mime="application/json",
+        )
 
 def get_google_sheets_connection():
     """Setup Google Sheets connection."""
-    scope = ['https://spreadsheets.google.com/feeds',
-            'https://www.googleapis.com/auth/drive']
-    credentials_dict = {
-        "type": "service_account",
-        "project_id": "third-hangout-387516",
-        "private_key_id": st.secrets["private_key_id"],
-        "private_key": st.secrets["google_credentials"],
-        "client_email": "apollo-miner@third-hangout-387516.iam.gserviceaccount.com",
-        "client_id": "114223947184571105588",
-        "auth_uri": "https://accounts.google.com/o/oauth2/auth",
-        "token_uri": "https://oauth2.googleapis.com/token",
-        "auth_provider_x509_cert_url": "https://www.googleapis.com/oauth2/v1/certs",
-        "client_x509_cert_url": "https://www.googleapis.com/robot/v1/metadata/x509/apollo-miner%40third-hangout-387516.iam.gserviceaccount.com",
-        "universe_domain": "googleapis.com"
-    }
-    
-    credentials = ServiceAccountCredentials.from_json_keyfile_dict(credentials_dict, scope)
-    return gspread.authorize(credentials)
+    return authorize(st.secrets["private_key_id"], st.secrets["google_credentials"])
+
+# Shared across reruns, so the client is authorized and each worksheet looked up only once
+SHEETS = SheetsPool(get_google_sheets_connection)
+
+# Where every process writes: Google Sheets unless HARVESTING_OUTPUT_SINK picks a local backend
+SINK = make_sink(OUTPUT_SINK, SHEETS)
+
+def open_worksheet(spreadsheet_key, worksheet_name, headers=None):
+    """Get a worksheet from the output sink, creating it with headers when given and missing."""
+    with span('open_worksheet'):
+        return SINK.worksheet(spreadsheet_key, worksheet_name, headers=headers)
+
+def open_worksheets(spreadsheet_key, worksheet_names, headers=None):
+    """Get several worksheets from the output sink at once, creating the missing ones with headers when given."""
+    with span('open_worksheets'):
+        return SINK.worksheets(spreadsheet_key, worksheet_names, headers=headers)
 
 def clear_session_state():
     """Clear all session state variables except password_correct."""
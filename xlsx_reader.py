@@ -0,0 +1,313 @@
+import functools
+import io
+import posixpath
+import zipfile
+from xml.etree.ElementTree import XMLParser, iterparse, parse
+
+import numpy as np
+import pandas as pd
+from openpyxl.styles.numbers import BUILTIN_FORMATS, is_date_format
+from openpyxl.utils.datetime import CALENDAR_MAC_1904, CALENDAR_WINDOWS_1900, from_excel
+
+MAIN_NS = '{http://schemas.openxmlformats.org/spreadsheetml/2006/main}'
+REL_NS = '{http://schemas.openxmlformats.org/officeDocument/2006/relationships}'
+PACKAGE_REL_NS = '{http://schemas.openxmlformats.org/package/2006/relationships}'
+
+ROW_TAG = f'{MAIN_NS}row'
+CELL_TAG = f'{MAIN_NS}c'
+VALUE_TAG = f'{MAIN_NS}v'
+TEXT_TAG = f'{MAIN_NS}t'
+INLINE_TAG = f'{MAIN_NS}is'
+PHONETIC_TAG = f'{MAIN_NS}rPh'
+
+# Cell texts pd.read_excel reads as missing by default (its documented na_values list),
+# kept here rather than imported from pandas internals
+NA_STRINGS = {
+    '', '#N/A', '#N/A N/A', '#NA', '-1.#IND', '-1.#QNAN', '-NaN', '-nan', '1.#IND', '1.#QNAN',
+    '<NA>', 'N/A', 'NA', 'NULL', 'NaN', 'None', 'n/a', 'nan', 'null',
+}
+
+# Bytes of sheet XML handed to the parser at a time
+READ_BLOCK_SIZE = 256 * 1024
+
+def _first_sheet_path(archive):
+    """Return the archive path of the first worksheet and whether the workbook uses the 1904 epoch."""
+    workbook = parse(archive.open('xl/workbook.xml')).getroot()
+    properties = workbook.find(f'{MAIN_NS}workbookPr')
+    date1904 = properties is not None and properties.get('date1904') in ('1', 'true')
+
+    sheet = workbook.find(f'{MAIN_NS}sheets/{MAIN_NS}sheet')
+    rel_id = sheet.get(f'{REL_NS}id')
+    rels = parse(archive.open('xl/_rels/workbook.xml.rels')).getroot()
+    for rel in rels.iter(f'{PACKAGE_REL_NS}Relationship'):
+        if rel.get('Id') == rel_id:
+            target = rel.get('Target')
+            if target.startswith('/'):
+                return target.lstrip('/'), date1904
+            return posixpath.normpath(posixpath.join('xl', target)), date1904
+    raise ValueError("Workbook has no readable worksheet.")
+
+def _shared_strings(archive):
+    """Load the shared string table, joining rich-text runs and skipping phonetic hints."""
+    if 'xl/sharedStrings.xml' not in archive.namelist():
+        return []
+
+    strings = []
+    for _, elem in iterparse(archive.open('xl/sharedStrings.xml')):
+        if elem.tag == f'{MAIN_NS}si':
+            phonetic = {id(t) for rph in elem.iter(PHONETIC_TAG) for t in rph.iter(TEXT_TAG)}
+            strings.append(''.join(t.text or '' for t in elem.iter(TEXT_TAG) if id(t) not in phonetic))
+            elem.clear()
+    return strings
+
+def _date_styles(archive):
+    """Return the indexes of cell styles whose number format is a date."""
+    if 'xl/styles.xml' not in archive.namelist():
+        return set()
+
+    styles = parse(archive.open('xl/styles.xml')).getroot()
+    formats = dict(BUILTIN_FORMATS)
+    for fmt in styles.iter(f'{MAIN_NS}numFmt'):
+        formats[int(fmt.get('numFmtId'))] = fmt.get('formatCode')
+
+    cell_xfs = styles.find(f'{MAIN_NS}cellXfs')
+    if cell_xfs is None:
+        return set()
+    return {
+        i for i, xf in enumerate(cell_xfs.iter(f'{MAIN_NS}xf'))
+        if is_date_format(formats.get(int(xf.get('numFmtId', 0)), 'General'))
+    }
+
+@functools.lru_cache(maxsize=None)
+def _letters_index(letters):
+    """Convert column letters such as 'AB' into a zero-based column index."""
+    index = 0
+    for letter in letters:
+        index = index * 26 + ord(letter) - 64
+    return index - 1
+
+def _column_index(ref):
+    """Convert a cell reference such as 'AB12' into a zero-based column index."""
+    return _letters_index(ref.rstrip('0123456789'))
+
+class _SheetTarget:
+    """XMLParser target that turns sheet XML into {column index: value} row dicts.
+
+    Parser callbacks go straight to these methods without building Element objects,
+    and cells outside self.columns (all cells when None) are skipped unconverted.
+    """
+
+    def __init__(self, shared, date_styles, epoch):
+        self.shared = shared
+        self.date_styles = date_styles
+        self.epoch = epoch
+        self.columns = None
+        self.rows = []
+        self._next_row = 1
+        self._row = None
+        self._next_col = 0
+        self._col = None
+        self._type = None
+        self._style = None
+        self._parts = None
+        self._in_inline = False
+        self._in_phonetic = False
+
+    def start(self, tag, attrib):
+        if tag == CELL_TAG:
+            ref = attrib.get('r')
+            col = _column_index(ref) if ref else self._next_col
+            self._next_col = col + 1
+            self._parts = None
+            if self.columns is None or col in self.columns:
+                self._col = col
+                self._type = attrib.get('t', 'n')
+                self._style = attrib.get('s')
+            else:
+                self._col = None
+        elif tag == VALUE_TAG:
+            if self._col is not None:
+                self._parts = []
+        elif tag == TEXT_TAG:
+            if self._col is not None and self._in_inline and not self._in_phonetic:
+                if self._parts is None:
+                    self._parts = []
+        elif tag == ROW_TAG:
+            row_number = int(attrib.get('r', self._next_row))
+            while self._next_row < row_number:
+                self.rows.append({})
+                self._next_row += 1
+            self._next_row = row_number + 1
+            self._row = {}
+            self._next_col = 0
+        elif tag == INLINE_TAG:
+            self._in_inline = True
+        elif tag == PHONETIC_TAG:
+            self._in_phonetic = True
+
+    def data(self, text):
+        if self._parts is not None and not self._in_phonetic:
+            self._parts.append(text)
+
+    def end(self, tag):
+        if tag == CELL_TAG:
+            if self._col is not None and self._parts is not None:
+                value = self._convert(''.join(self._parts))
+                if value is not None:
+                    self._row[self._col] = value
+            self._col = None
+            self._parts = None
+        elif tag == ROW_TAG:
+            self.rows.append(self._row)
+        elif tag == INLINE_TAG:
+            self._in_inline = False
+        elif tag == PHONETIC_TAG:
+            self._in_phonetic = False
+
+    def _convert(self, raw):
+        """Convert a cell's raw text according to its type and style."""
+        cell_type = self._type
+        if cell_type == 'inlineStr' or cell_type == 'str':
+            return raw
+        # Formulas without a cached result read as empty, as with data_only=True
+        if not raw:
+            return None
+        if cell_type == 's':
+            return self.shared[int(raw)]
+        if cell_type == 'n':
+            number = float(raw)
+            if self._style is not None and int(self._style) in self.date_styles:
+                return from_excel(number, self.epoch)
+            # pd.read_excel turns integral floats into ints
+            return int(number) if number.is_integer() else number
+        if cell_type == 'b':
+            return raw == '1'
+        if cell_type == 'e':
+            return None
+        return raw
+
+    def close(self):
+        pass
+
+def _iter_rows(stream, target, block_size=READ_BLOCK_SIZE):
+    """Feed the sheet XML to the parser in blocks, yielding rows as they complete."""
+    parser = XMLParser(target=target)
+    while True:
+        block = stream.read(block_size)
+        if not block:
+            break
+        parser.feed(block)
+        if target.rows:
+            rows, target.rows = target.rows, []
+            yield from rows
+    parser.close()
+    yield from target.rows
+
+def _column_names(header_row, width, has_headers):
+    """Name columns the way pd.read_excel does (Unnamed: i, de-duplicated with .1, .2, ...).
+
+    Like pandas, a suffix is skipped when the header already has a column of that name,
+    so 'a, a, a.1' gives 'a, a.2, a.1' and every column keeps its own name.
+    """
+    if not has_headers:
+        return list(range(width))
+
+    names = []
+    unnamed = []
+    for i in range(width):
+        value = header_row.get(i)
+        if value is None or value == '':
+            names.append(f"Unnamed: {i}")
+            unnamed.append(i)
+        else:
+            names.append(value)
+
+    header = set(names)
+    counts = {}
+    # Named columns are numbered before unnamed ones, as pandas does
+    for i in [i for i in range(width) if i not in unnamed] + unnamed:
+        original = name = names[i]
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[original] = count + 1
+            name = f"{original}.{count}"
+            count = count + 1 if name in header else counts.get(name, 0)
+        names[i] = name
+        counts[name] = count + 1
+    return names
+
+def _finish_column(values):
+    """Build a Series, applying pd.read_excel's NA strings and numeric inference."""
+    series = pd.Series(values, dtype=object if not values else None)
+    if series.dtype == object:
+        series = series.where(series.notna() & ~series.isin(NA_STRINGS), np.nan)
+        inferred = pd.api.types.infer_dtype(series, skipna=True)
+        if inferred in ('string', 'mixed-integer', 'mixed-integer-float'):
+            try:
+                series = pd.to_numeric(series)
+            except (ValueError, TypeError):
+                pass
+        elif inferred == 'boolean' and series.isna().any():
+            # Booleans with gaps come back as 1.0/0.0/NaN from pd.read_excel
+            series = series.astype(float)
+        series = series.infer_objects()
+    return series
+
+def read_xlsx(data, has_headers, usecols=None, nrows=None):
+    """Read the first sheet of an XLSX file by streaming its XML.
+
+    Cells are parsed straight out of the sheet XML without building openpyxl's workbook
+    object model, and only the columns named in usecols (all columns
+    when None) are converted. nrows limits the number of data rows read, which keeps
+    previews cheap on large workbooks. The result matches pd.read_excel(header=0/None).
+    """
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        path, date1904 = _first_sheet_path(archive)
+        epoch = CALENDAR_MAC_1904 if date1904 else CALENDAR_WINDOWS_1900
+        target = _SheetTarget(_shared_strings(archive), _date_styles(archive), epoch)
+        rows = _iter_rows(archive.open(path), target)
+
+        header_row = {}
+        if has_headers:
+            header_row = next(rows, None)
+            if header_row is None:
+                return pd.DataFrame()
+        header_width = max(header_row, default=-1) + 1
+
+        if usecols is not None:
+            names = _column_names(header_row, header_width, has_headers)
+            wanted = set(usecols)
+            selected = [i for i, name in enumerate(names) if name in wanted]
+            # From here on only the mapped columns are converted
+            target.columns = set(selected)
+        else:
+            selected = None
+
+        records = []
+        width = header_width
+        last_with_data = -1
+        for row in rows:
+            if nrows is not None and len(records) >= nrows:
+                break
+            if selected is None:
+                records.append(row)
+                if row:
+                    width = max(width, max(row) + 1)
+            else:
+                records.append([row.get(i) for i in selected])
+            if row:
+                last_with_data = len(records) - 1
+
+    # Trim trailing empty rows like pd.read_excel
+    del records[last_with_data + 1:]
+
+    if selected is None:
+        selected = list(range(width))
+        names = _column_names(header_row, width, has_headers)
+        columns = [[row.get(i) for row in records] for i in selected]
+    elif len(selected) == 1:
+        columns = [[row[0] for row in records]]
+    else:
+        columns = [list(values) for values in zip(*records)] if records else [[] for _ in selected]
+
+    return pd.DataFrame({names[i]: _finish_column(values) for i, values in zip(selected, columns)})